@@ -0,0 +1,83 @@
+# benchmarks/codec_benchmark.py
+#
+# Compares the original JSON (+ base64 for binary payloads) wire format with the
+# binary codec: encode/decode throughput and bytes on the wire per message.
+#
+#   python benchmarks/codec_benchmark.py [--seconds 1.0]
+
+import os
+import sys
+import time
+import argparse
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from messaging.message import Message
+from messaging.heartbeat import Heartbeat
+from messaging.codec import json_codec, binary_codec
+
+
+def legacy_payloads():
+    """Messages as they are built today: binary data is base64-encoded into the content."""
+    audio = os.urandom(32000)  # 1 s of 16 kHz int16 audio
+    return {
+        "heartbeat": Heartbeat(sender="sound_emitter", module_name="sound_emitter", status="operational", dying=False).to_dict(),
+        "distance": Message(sender="ultrasonic_sensor", content={"sensor_channel": "ultrasonic_data", "value": 42.5}).to_dict(),
+        "audio_32k": Message(sender="microphone", content={"pcm": Message.encode_binary_data(audio), "rate": 16000}).to_dict(),
+    }, audio
+
+
+def binary_payloads(audio):
+    payloads, _ = legacy_payloads()
+    payloads["audio_32k"] = Message(sender="microphone", content={"pcm": audio, "rate": 16000}).to_dict()
+    return payloads
+
+
+def rate(function, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(50):
+            function()
+        count += 50
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=1.0, help="Measurement time per case.")
+    args = parser.parse_args()
+
+    legacy, audio = legacy_payloads()
+    binary = binary_payloads(audio)
+
+    print(f"{'payload':<12} {'codec':<8} {'bytes':>8} {'encode/s':>12} {'decode/s':>12}")
+    for name in legacy:
+        cases = [
+            ("json", json_codec, legacy[name],
+             # The JSON path also has to base64 the raw audio on encode and back on decode
+             (lambda: Message.encode_binary_data(audio)) if name == "audio_32k" else None,
+             (lambda: Message.decode_binary_data(legacy[name]["content"]["pcm"])) if name == "audio_32k" else None),
+            ("binary", binary_codec, binary[name], None, None),
+        ]
+        for label, codec, payload, extra_encode, extra_decode in cases:
+            frame = codec.encode(payload)
+
+            def encode():
+                if extra_encode:
+                    extra_encode()
+                codec.encode(payload)
+
+            def decode():
+                codec.decode(frame)
+                if extra_decode:
+                    extra_decode()
+
+            size = len(frame.encode()) if isinstance(frame, str) else len(frame)
+            print(f"{name:<12} {label:<8} {size:>8} {rate(encode, args.seconds):>12,.0f} {rate(decode, args.seconds):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
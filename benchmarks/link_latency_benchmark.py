@@ -0,0 +1,63 @@
+# benchmarks/link_latency_benchmark.py
+#
+# One-way latency of a module link on the same host: loopback WebSocket versus the
+# shared-memory ring. Producer and consumer share a process so both read the same clock.
+#
+#   python benchmarks/link_latency_benchmark.py [--messages 2000]
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from messaging.module_link_client import ModuleLinkClient
+from messaging.module_link_server import ModuleLinkServer
+
+
+async def measure(transport, port, messages):
+    server = ModuleLinkServer(host="127.0.0.1", port=port)
+    await server.start()
+    latencies = []
+    arrived = asyncio.Event()
+
+    async def on_message(payload):
+        latencies.append(time.perf_counter_ns() - payload["sent_ns"])
+        arrived.set()
+
+    client = ModuleLinkClient(f"ws://127.0.0.1:{port}", on_message, transport=transport)
+    task = asyncio.create_task(client.run())
+    while not server.clients or (transport == "auto" and not server.shm_clients):
+        await asyncio.sleep(0.01)
+
+    for _ in range(messages):
+        arrived.clear()
+        await server.broadcast({"sensor_channel": "ultrasonic_data", "value": 42.5, "sent_ns": time.perf_counter_ns()})
+        await arrived.wait()
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await server.stop()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'transport':<10} {'p50 us':>8} {'p99 us':>8}")
+    for label, transport, port in (("websocket", "websocket", 9190), ("shm", "auto", 9191)):
+        latencies = sorted(asyncio.run(measure(transport, port, args.messages)))
+        p50 = statistics.median(latencies) / 1000
+        p99 = latencies[int(len(latencies) * 0.99)] / 1000
+        print(f"{label:<10} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/module_host_benchmark.py
+#
+# Memory and startup cost of running N modules as N launcher processes versus one
+# module host process (launcher.py --modules). The benchmark module imports what real
+# modules import (numpy, websockets, the messaging stack) but needs no hardware.
+#
+#   python benchmarks/module_host_benchmark.py [--modules 4]
+#
+# Resident memory is read from /proc (Linux, e.g. a Raspberry Pi) or psutil if installed.
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+benchmarks_path = os.path.abspath(os.path.dirname(__file__))
+src_path = os.path.abspath(os.path.join(benchmarks_path, "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+from modules.module import Module
+
+MODULE_PATH = "module_host_benchmark.BenchModule"
+
+
+class BenchModule(Module):
+    def __init__(self, index=0, **kwargs):
+        super().__init__(name=f"bench_{index}")
+
+    async def start(self):
+        import numpy  # noqa: F401  Typical heavy imports of a sensor module
+        import websockets  # noqa: F401
+        from messaging.module_link_server import ModuleLinkServer  # noqa: F401
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return float("nan")
+
+
+def launch(arguments):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([src_path, benchmarks_path]), PYTHONUNBUFFERED="1")
+    return subprocess.Popen([sys.executable, os.path.join(src_path, "launcher.py")] + arguments,
+                            cwd=src_path, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def wait_started(process, expected):
+    started = 0
+    for line in process.stdout:
+        if "started" in line:
+            started += 1
+            if started >= expected:
+                return
+
+
+def measure(label, processes, started_per_process):
+    began = time.perf_counter()
+    for process in processes:
+        wait_started(process, started_per_process)
+    elapsed = time.perf_counter() - began
+    time.sleep(0.5)
+    memory = sum(rss_mb(process.pid) for process in processes)
+    for process in processes:
+        process.terminate()
+        process.wait()
+    print(f"{label:<22} {len(processes):>9} {memory:>12.1f} {elapsed:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modules", type=int, default=4)
+    args = parser.parse_args()
+    specs = [{"module": MODULE_PATH, "params": {"index": i}} for i in range(args.modules)]
+
+    print(f"{'mode':<22} {'processes':>9} {'total RSS MB':>12} {'startup s':>12}")
+    measure("process per module",
+            [launch(["--module", spec["module"], "--params", json.dumps(spec["params"])]) for spec in specs], 1)
+    # One line per module plus the host summary
+    measure("module host", [launch(["--modules", json.dumps(specs), "--host-name", "bench"])], args.modules + 1)
+
+
+if __name__ == "__main__":
+    main()
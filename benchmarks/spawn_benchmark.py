@@ -0,0 +1,76 @@
+# benchmarks/spawn_benchmark.py
+#
+# Module (re)start time: a cold launcher process (fresh interpreter plus imports, as the
+# agent did before) versus a fork from a pre-warmed zygote (zygote.py). Time is measured
+# from the spawn call until the launcher reports the module started.
+#
+#   python benchmarks/spawn_benchmark.py [--runs 10]
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+benchmarks_path = os.path.abspath(os.path.dirname(__file__))
+src_path = os.path.abspath(os.path.join(benchmarks_path, "..", "src"))
+if src_path not in sys.path:
+    sys.path.insert(0, src_path)
+
+import zygote
+from module_host_benchmark import MODULE_PATH
+
+ARGS = ["--module", MODULE_PATH]
+ENV = dict(os.environ, PYTHONPATH=os.pathsep.join([src_path, benchmarks_path]), PYTHONUNBUFFERED="1")
+
+
+def until_started(process):
+    for line in process.stdout:
+        if "started" in line:
+            return
+    raise RuntimeError(f"launcher exited with {process.wait()} before starting")
+
+
+def cold_spawn():
+    return subprocess.Popen([sys.executable, os.path.join(src_path, "launcher.py")] + ARGS,
+                            cwd=src_path, env=ENV, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def measure(spawn, runs):
+    timings = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        process = spawn()
+        until_started(process)
+        timings.append((time.perf_counter() - began) * 1000)
+        process.terminate()
+        process.wait()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    if not zygote.SUPPORTED:
+        sys.exit("zygote spawning needs os.fork and Unix sockets")
+
+    began = time.perf_counter()
+    warm = zygote.Zygote(cwd=src_path, env=ENV).start()
+    warm_spawn = lambda: warm.spawn(ARGS, cwd=src_path, env=ENV, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True)
+    measure(warm_spawn, 1)
+    print(f"zygote start-up (preload + first spawn): {(time.perf_counter() - began) * 1000:.0f} ms")
+
+    results = {"cold (new interpreter)": measure(cold_spawn, args.runs),
+               "warm (zygote fork)": measure(warm_spawn, args.runs)}
+    warm.stop()
+
+    print(f"{'spawn':<24} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for label, timings in results.items():
+        print(f"{label:<24} {statistics.median(timings):>10.1f} {min(timings):>10.1f} {max(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
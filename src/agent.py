@@ -18,27 +18,55 @@ import shlex
 import os
 import json
 import socket
+import functools
+import websockets
 from pathlib import Path
-from vibes import VibeSender, VibeListener
+from vibes import VibeSender, VibeListener, ClockSync
+from liveness import Liveness
+from config_watcher import ConfigWatcher, spawn_units, diff_units, live_params
+import zygote
+from messaging import tracing
+from messaging.receiver import Receiver
+from messaging.sender import Sender
+from messaging.message import Message
+from messaging.lifecycle import READY, FAILED, UPDATED, REJECTED
 
 class Agent:
     HEARTBEAT_TIMEOUT = 10  # seconds
-    HEARTBEAT_CHECK_INTERVAL = 2  # seconds
+    HEARTBEAT_PRECISION = 0.5  # seconds; a missed heartbeat is reported at most this late
+    HEARTBEAT_SLACK = 1.5  # A heartbeat announcing the next in `interval` s is missed after interval * slack + precision
+    READY_TIMEOUT = 30  # seconds a module waits for its upstreams before starting anyway
+    UPDATE_TIMEOUT = 5  # seconds to wait for a module to confirm a live params update before restarting it
+    STOP_TIMEOUT = 5  # seconds a stopped module gets to exit before it is killed
 
-    def __init__(self, config_path, is_primary=False):
+    def __init__(self, config_path, is_primary=False, gcc_workers=None):
         self.config_path = config_path
         self.is_primary = is_primary
+        self.gcc_workers = gcc_workers
         self.device_name = None
         self.ip_self = self.get_own_ip()
         self.config = {}
         self.modules = {}
         self.connected_devices = {}
-        self.last_heartbeats = {}
+        self.module_names = {}  # { module name in heartbeats: module class path }
         self.start_time = time.time()
+        self.clock_sync = None  # ClockSync, once the vibe system runs
+        self.vibes = None  # VibeListener: the cluster state table, once the vibe system runs
+        self.streams = {}  # { module class path: { stream name: endpoint URL } } served by this device's modules
+        self._last_streams = {}  # The streams a module announced ready with, to re-advertise once it recovers
         self.gcc_process = None
+        self.zygote = None  # Pre-warmed fork server for this device's modules
+        self.boot_timeline = {}  # { module class path or "GCC": {"spawned": s, "ready": s, ...} }, seconds since start_time
+        self._ready = {}  # { module class path: asyncio.Event set once its lifecycle is ready or failed }
+        self._updates = {}  # { module class path: Future resolved by its updated/rejected lifecycle }
+        self.control_sender = None  # Sender for control/<module> and clock/<device> messages, once one is needed
         self.agent_processes = []
         self.load_config()
         self.setup_environment()
+        liveness = self.config.get('liveness', {})
+        self.liveness = Liveness(timeout=liveness.get('timeout', self.HEARTBEAT_TIMEOUT),
+                                 precision=liveness.get('precision', self.HEARTBEAT_PRECISION),
+                                 on_missed=self.on_heartbeat_missed, on_recovered=self.on_heartbeat_recovered)
 
     def get_own_ip(self):
         try:
@@ -67,8 +95,42 @@ class Agent:
             log("Agent", "Warning: Primary agent recommended on Linux or Windows.")
         log("Agent", f"Running on {system} at {self.ip_self}")
 
-    def start_gcc_server(self):
+    @property
+    def federated(self):
+        """Non-primary agents run a device-local GCC bridged to the primary one."""
+        return bool(self.config.get('global_channel', {}).get('federation', False))
+
+    @property
+    def channel_url(self):
+        """The GCC that modules on this device connect to; always loopback when we run it ourselves."""
+        channel = self.config.get('global_channel', {})
+        if self.is_primary:
+            return f"ws://127.0.0.1:{channel.get('port', 9000)}"
+        if self.federated:
+            return f"ws://127.0.0.1:{channel.get('local_port', 9001)}"
+        return channel.get('url')
+
+    def start_gcc_server(self, workers=None):
         log("Agent", "Starting GCC server...")
+        channel = self.config.get('global_channel', {})
+        workers = workers or self.gcc_workers or channel.get('workers', 1)
+        self.gcc_process = self._launch_gcc([
+            "--host", str(channel.get('host', '0.0.0.0')),
+            "--port", str(channel.get('port', 9000)),
+            "--workers", str(workers)
+        ])
+
+    def start_local_gcc(self):
+        """Run a loopback-only GCC for this device's modules, bridged to the primary GCC."""
+        channel = self.config.get('global_channel', {})
+        log("Agent", f"Starting device-local GCC bridged to {channel.get('url')}...")
+        self.gcc_process = self._launch_gcc([
+            "--host", "127.0.0.1",
+            "--port", str(channel.get('local_port', 9001)),
+            "--upstream", channel['url']
+        ])
+
+    def _launch_gcc(self, args):
         try:
             gcc_script = os.path.join(os.path.dirname(__file__), 'gcc.py')
 
@@ -80,61 +142,335 @@ class Agent:
                 python_exe = "python3"
 
             log("Agent", f"Using Python executable: {python_exe}")
-            self.gcc_process = subprocess.Popen([
-                python_exe, gcc_script
-            ], cwd=os.path.dirname(__file__))
+            process = subprocess.Popen([python_exe, gcc_script] + args, cwd=os.path.dirname(__file__))
 
-            if self.gcc_process is not None:
-                log("Agent", f"GCC subprocess launched: PID={self.gcc_process.pid}")
+            if process is not None:
+                log("Agent", f"GCC subprocess launched: PID={process.pid}")
             else:
                 log_error("Agent", "GCC launch failed: subprocess returned None")
+            return process
         except Exception as e:
             log_error("Agent", f"Failed to start GCC: {e}")
-            self.gcc_process = None
+            return None
 
     async def start(self):
         log("Agent", f"Starting agent (is_primary={self.is_primary})...")
         if self.is_primary:
             self.start_gcc_server()
+        elif self.federated:
+            self.start_local_gcc()
+        if self.gcc_process is not None:
+            await self.wait_for_gcc()
+        self.watch_channel()
+        asyncio.create_task(self.liveness.run())
 
-        await self.spawn_local_modules()
-
+        # Everything starts at once; modules with `depends_on` wait for their upstreams' readiness
         if self.is_primary:
-            await self.launch_remote_agents()
+            await asyncio.gather(self.spawn_local_modules(), self.launch_remote_agents())
+        else:
+            await self.spawn_local_modules()
+        asyncio.create_task(self.report_boot_timeline())
 
-        await self.start_vibe_system()
-        asyncio.create_task(self.monitor_heartbeats())
+        asyncio.create_task(self.start_vibe_system())
+        asyncio.create_task(ConfigWatcher(self.config_path, self.reload_config).run())
 
         log("Agent", "System operational.")
 
     async def spawn_local_modules(self):
         log("Agent", "Spawning local modules...")
+        spawns = []
         for device_name, device_info in self.config.get('devices', {}).items():
             if device_info.get('ip') == self.ip_self:
-                for module in device_info.get('modules', []):
-                    await self.spawn_module(module['module'], module.get('params', {}))
+                if device_info.get('zygote', True) and device_info.get('modules'):
+                    self.start_zygote()
+        # Modules with the same `host:` share one process
+        await asyncio.gather(*(self.spawn_unit(key, modules) for key, modules in spawn_units(self.config, self.ip_self).items()))
+
+    async def spawn_unit(self, key, modules):
+        if key[0] == "host":
+            await self.spawn_module_host(key[1], modules)
+        else:
+            await self.spawn_module(modules[0]['module'], modules[0].get('params', {}), modules[0].get('depends_on', []))
+
+    async def reload_config(self, config):
+        """Apply a changed config: only the spawn units (module or module host) of this device that changed are touched."""
+        old_config, old_units = self.config, spawn_units(self.config, self.ip_self)
+        self.config, self.devices = config, config.get('devices', {})
+        new_units = spawn_units(config, self.ip_self)
+        added, removed, changed = diff_units(old_units, new_units)
+        if old_config.get('global_channel') != config.get('global_channel'):
+            log_error("Agent", "global_channel changed: restart the agents to apply it")
+        if not (added or removed or changed):
+            log("Agent", "Config reloaded: no module changes on this device")
+            return
+        log("Agent", f"Config reloaded: {len(added)} added, {len(removed)} removed, {len(changed)} changed")
+        if added and self.zygote is None:
+            self.start_zygote()
+        await asyncio.gather(*(self.stop_unit(old_units[key]) for key in removed))
+        await asyncio.gather(*(self.spawn_unit(key, new_units[key]) for key in added),
+                             *(self.update_unit(key, old_units[key], new_units[key]) for key in changed))
+
+    async def update_unit(self, key, old_modules, new_modules):
+        """Push new params to the running modules when that is all that changed, else restart the unit."""
+        updates = live_params(old_modules, new_modules)
+        if updates is not None and await self.update_params(updates):
+            return
+        log("Agent", f"Restarting {key[1]}")
+        await self.stop_unit(old_modules)
+        await self.spawn_unit(key, new_modules)
+
+    async def update_params(self, updates):
+        """Publish new params on control/<module>; True if every module applied them live."""
+        if not self.channel_url:
+            return False
+        if self.control_sender is None:
+            self.control_sender = Sender(self.channel_url, tag="Agent")
+        loop = asyncio.get_running_loop()
+        for path, params in updates.items():
+            self._updates[path] = loop.create_future()
+            content = {"action": "update_params", "params": self._module_params(params), "issued_at": time.time()}
+            await self.control_sender.publish(f"control/{path}", Message(sender="agent", content=content, msg_type="control"))
+        try:
+            results = await asyncio.wait_for(asyncio.gather(*(self._updates[path] for path in updates)), self.UPDATE_TIMEOUT)
+        except asyncio.TimeoutError:
+            log_error("Agent", f"No answer to live update of {', '.join(updates)}")
+            return False
+        finally:
+            for path in updates:
+                self._updates.pop(path, None)
+        for path, (state, error) in zip(updates, results):
+            if state == UPDATED:
+                log("Agent", f"Updated {path} live")
+            else:
+                log("Agent", f"{path} needs a restart: {error}")
+        return all(state == UPDATED for state, error in results)
+
+    async def stop_unit(self, modules):
+        """Terminate the process of a spawn unit and forget its modules."""
+        paths = [module['module'] for module in modules]
+        for process in {self.modules[path] for path in paths if path in self.modules}:
+            await self._terminate(process)
+        for path in paths:
+            self.modules.pop(path, None)
+            self._ready.pop(path, None)
+            self.streams.pop(path, None)
+            self._last_streams.pop(path, None)
+            self.liveness.forget(path)
+        log("Agent", f"Stopped {', '.join(paths)}")
+
+    async def _terminate(self, process):
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            if asyncio.iscoroutinefunction(process.wait):
+                await asyncio.wait_for(process.wait(), self.STOP_TIMEOUT)
+            else:
+                await asyncio.get_running_loop().run_in_executor(None, process.wait, self.STOP_TIMEOUT)
+        except (asyncio.TimeoutError, subprocess.TimeoutExpired):
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+    def expected_modules(self):
+        """Modules whose readiness this agent reports: the whole cluster on the primary, else this device's."""
+        return [module['module']
+                for device_info in self.devices.values()
+                if self.is_primary or device_info.get('ip') == self.ip_self
+                for module in device_info.get('modules', [])]
+
+    def resolve_dependency(self, name):
+        """`depends_on` entries are module class paths or just class names."""
+        paths = [module['module'] for device_info in self.devices.values() for module in device_info.get('modules', [])]
+        if name in paths:
+            return name
+        matches = [path for path in paths if path.rsplit('.', 1)[-1] == name]
+        if len(matches) != 1:
+            log_error("Agent", f"Cannot resolve dependency '{name}' ({len(matches)} matching modules); ignoring it")
+            return None
+        return matches[0]
+
+    def _ready_event(self, module_class_path):
+        if module_class_path not in self._ready:
+            self._ready[module_class_path] = asyncio.Event()
+        return self._ready[module_class_path]
+
+    async def wait_ready(self, module_class_paths, timeout=None):
+        """Wait until every module has reported ready (or failed), at most `timeout` seconds."""
+        timeout = self.READY_TIMEOUT if timeout is None else timeout
+        events = [self._ready_event(path) for path in module_class_paths]
+        try:
+            await asyncio.wait_for(asyncio.gather(*(event.wait() for event in events)), timeout)
+        except asyncio.TimeoutError:
+            missing = [path for path, event in zip(module_class_paths, events) if not event.is_set()]
+            log_error("Agent", f"Not ready after {timeout}s: {', '.join(missing)}; starting dependents anyway")
+
+    async def _wait_for_upstreams(self, module_class_paths, depends_on):
+        upstreams = {self.resolve_dependency(name) for name in depends_on} - {None} - set(module_class_paths)
+        if not upstreams:
+            return
+        log("Agent", f"{', '.join(module_class_paths)} waits for {', '.join(sorted(upstreams))}")
+        for path in module_class_paths:
+            self.boot_timeline.setdefault(path, {})["waited_for"] = sorted(upstreams)
+        await self.wait_ready(sorted(upstreams))
+
+    def watch_channel(self):
+        """Follow modules' lifecycle messages (retained by the GCC, so earlier ones are replayed) and heartbeats."""
+        if not self.channel_url:
+            return
+        receiver = Receiver(self.channel_url, self.on_channel_message, topics=["lifecycle/*", "heartbeat/*"])
+        asyncio.create_task(receiver.run())
 
-    async def spawn_module(self, module_class_path, params):
+    async def on_channel_message(self, data):
+        if data.get("type") == "heartbeat":
+            self.on_heartbeat(data)
+        elif data.get("type") == "lifecycle":
+            await self.on_lifecycle(data)
+
+    def on_heartbeat(self, data):
+        content = data.get("content", {})
+        name = content.get("module_name") or data.get("sender")
+        module = self.module_names.get(name, name)
+        details = {key: content[key] for key in ("last_function", "error", "connected") if key in content}
+        # Modules on a heartbeat scheduler say when the next one is due, so a silent one is caught sooner
+        timeout = content["interval"] * self.HEARTBEAT_SLACK + self.liveness.precision if content.get("interval") else None
+        self.liveness.beat(module, content.get("status", "unknown"), dying=content.get("dying", False),
+                           timeout=timeout, **details)
+        if content.get("dying"):
+            self.streams.pop(module, None)
+            self._last_streams.pop(module, None)
+            log_error("Agent", f"Module {module} is shutting down: {content.get('error') or content.get('status')}")
+
+    def on_heartbeat_missed(self, module, entry):
+        log_error("Agent", f"WARNING: Module {module} missed heartbeat!")
+        self.streams.pop(module, None)  # Don't send peers to an endpoint that may be gone
+
+    def on_heartbeat_recovered(self, module, entry):
+        log("Agent", f"Module {module} is sending heartbeats again.")
+        if module in self._last_streams:
+            self.streams[module] = self._last_streams[module]
+
+    async def on_lifecycle(self, data):
+        content = data.get("content", {})
+        path, state = content.get("module"), content.get("state")
+        if state in (UPDATED, REJECTED):
+            update = self._updates.get(path)
+            if update is not None and not update.done():
+                update.set_result((state, content.get("error")))
+            return
+        if path is None or state not in (READY, FAILED):
+            return
+        if content.get("name"):
+            self.module_names[content["name"]] = path
+        if state == READY and content.get("streams") and path in self.modules:
+            self.streams[path] = self._last_streams[path] = content["streams"]  # Ours to advertise in the vibes
+        elif state == FAILED:
+            self.streams.pop(path, None)
+            self._last_streams.pop(path, None)
+        event = self._ready_event(path)
+        if event.is_set():
+            return
+        entry = self.boot_timeline.setdefault(path, {})
+        entry.update(ready=time.time() - self.start_time, state=state, device=content.get("device"))
+        if "spawned" not in entry and content.get("launched_at"):
+            # Launched by another device's agent: put its clock on ours when we can
+            launched_at = content["launched_at"]
+            if self.clock_sync is not None and content.get("device"):
+                launched_at = self.clock_sync.to_local(content["device"], launched_at)
+            entry["spawned"] = launched_at - self.start_time
+        if state == FAILED:
+            log_error("Agent", f"Module {path} failed to start: {content.get('error')}")
+            self.liveness.beat(path, "error", dying=True, error=content.get("error"))
+        event.set()
+
+    async def wait_for_gcc(self, timeout=10):
+        """Poll the GCC's port until it accepts connections, so modules connect on their first try."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                async with websockets.connect(self.channel_url, open_timeout=1):
+                    pass
+                self.boot_timeline["GCC"] = {"ready": time.time() - self.start_time, "state": READY}
+                return True
+            except (OSError, asyncio.TimeoutError, websockets.InvalidHandshake):
+                await asyncio.sleep(0.05)
+        log_error("Agent", f"GCC not accepting connections on {self.channel_url} after {timeout}s")
+        return False
+
+    async def report_boot_timeline(self):
+        await self.wait_ready(self.expected_modules(), timeout=self.READY_TIMEOUT * 2)
+        log("Agent", "Boot timeline (seconds since agent start):")
+        for name, entry in sorted(self.boot_timeline.items(), key=lambda item: item[1].get("ready", float("inf"))):
+            steps = [f"spawned {entry['spawned']:.2f}"] if "spawned" in entry else []
+            if entry.get("waited_for"):
+                steps.append(f"after {', '.join(p.rsplit('.', 1)[-1] for p in entry['waited_for'])}")
+            steps.append(f"{entry.get('state', READY)} {entry['ready']:.2f}" if "ready" in entry else "not ready")
+            where = f" on {entry['device']}" if entry.get("device") else ""
+            log("Agent", f"{name.rsplit('.', 1)[-1]}{where}: {', '.join(steps)}")
+        finished = [entry["ready"] for entry in self.boot_timeline.values() if "ready" in entry]
+        if finished:
+            log("Agent", f"Cluster up in {max(finished):.2f}s")
+
+    def _module_params(self, params):
+        if self.federated and 'global_channel_url' in params:
+            # Keep intra-device traffic on loopback; the local GCC bridges what the rest of the cluster wants
+            params = dict(params, global_channel_url=self.channel_url)
+        return params
+
+    async def spawn_module(self, module_class_path, params, depends_on=()):
+        params = self._module_params(params)
+        await self._wait_for_upstreams([module_class_path], depends_on)
+        await self._launch_modules([module_class_path], ["--module", module_class_path, "--params", json.dumps(params)])
+
+    async def spawn_module_host(self, host_name, modules):
+        """Run several modules in one launcher process (see launcher.ModuleHost)."""
+        specs = [{"module": m['module'], "params": self._module_params(m.get('params', {}))} for m in modules]
+        paths = [spec["module"] for spec in specs]
+        await self._wait_for_upstreams(paths, [name for m in modules for name in m.get('depends_on', [])])
+        await self._launch_modules(paths, ["--modules", json.dumps(specs), "--host-name", host_name])
+
+    def _module_env(self):
+        env = os.environ.copy()
+        src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        env["PYTHONPATH"] = src_path
+        return env
+
+    def start_zygote(self):
+        """Keep a pre-forked process with the heavy imports done, so module spawns skip interpreter start-up."""
+        if self.zygote is not None or not zygote.SUPPORTED:
+            return
+        log("Agent", "Starting module zygote...")
+        self.zygote = zygote.Zygote(python="python", cwd=os.path.dirname(__file__), env=self._module_env()).start()
+
+    async def _launch_modules(self, module_class_paths, launcher_args):
         launcher_script = os.path.join(os.path.dirname(__file__), 'launcher.py')
-        command = [
-            "python",
-            launcher_script,
-            "--module", module_class_path,
-            "--params", json.dumps(params)
-        ]
-        log("Agent", f"Launching module with command: {' '.join(shlex.quote(arg) for arg in command)}")
+        command = ["python", launcher_script] + launcher_args
         try:
-            env = os.environ.copy()
-            src_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-            env["PYTHONPATH"] = src_path
-            process = subprocess.Popen(command, cwd=os.path.dirname(__file__), env=env)
-            self.modules[module_class_path] = process
-            self.last_heartbeats[module_class_path] = (time.time(), 'unknown')
+            env = self._module_env()
+            process = None
+            began = time.perf_counter()
+            if self.zygote is not None and self.zygote.running:
+                try:
+                    # The first spawn waits for the zygote's preload; keep the loop free meanwhile
+                    spawn = functools.partial(self.zygote.spawn, launcher_args, cwd=os.path.dirname(__file__), env=env)
+                    process = await asyncio.get_running_loop().run_in_executor(None, spawn)
+                    log("Agent", f"Forked {', '.join(module_class_paths)} from zygote: PID={process.pid} "
+                                 f"({(time.perf_counter() - began) * 1000:.0f} ms)")
+                except zygote.ZygoteError as e:
+                    log_error("Agent", f"Zygote spawn failed, launching cold: {e}")
+            if process is None:
+                log("Agent", f"Launching module with command: {' '.join(shlex.quote(arg) for arg in command)}")
+                process = await asyncio.create_subprocess_exec(*command, cwd=os.path.dirname(__file__), env=env)
+            for module_class_path in module_class_paths:
+                self.modules[module_class_path] = process
+                self.liveness.expect(module_class_path, grace=self.READY_TIMEOUT)  # Boot time before the first beat
+                self.boot_timeline.setdefault(module_class_path, {})["spawned"] = time.time() - self.start_time
         except Exception as e:
-            log_error("Agent", f"Failed to launch module {module_class_path}: {e}")
+            log_error("Agent", f"Failed to launch {', '.join(module_class_paths)}: {e}")
 
     async def launch_remote_agents(self):
         log("Agent", "Launching remote agents...")
+        launches = []
         for device_name, device_info in self.devices.items():
             if device_info.get('ip') != self.ip_self:
                 ip = device_info['ip']
@@ -147,37 +483,67 @@ class Agent:
                 ssh_user = device_info.get('ssh_user', 'gbrouwer')  # Default fallback
                 ssh_command = ["ssh", f"{ssh_user}@{device_info['ip']}", remote_command]
                 log("Agent", f"Launching remote agent on {ip} with tmux...")
-                try:
-                    proc = subprocess.Popen(ssh_command)
-                    self.agent_processes.append(proc)
-                except Exception as e:
-                    log_error("Agent", f"Failed to launch remote agent on {ip}: {e}")
+                launches.append(self._launch_remote_agent(ip, ssh_command))
+        await asyncio.gather(*launches)
+
+    async def _launch_remote_agent(self, ip, ssh_command):
+        try:
+            proc = await asyncio.create_subprocess_exec(*ssh_command)
+            self.agent_processes.append(proc)
+        except Exception as e:
+            log_error("Agent", f"Failed to launch remote agent on {ip}: {e}")
 
     async def start_vibe_system(self):
         log("Agent", "Starting Vibe system...")
-        vibe_sender = VibeSender(platform.node(), self.get_health_snapshot)
-        vibe_listener = VibeListener()
-        await asyncio.gather(vibe_sender.start(), vibe_listener.start())
+        vibe_sender = VibeSender(platform.node(), self.get_health_snapshot, start_time=self.start_time,
+                                 get_streams_callback=self.advertised_streams)
+        self.vibes = VibeListener()
+        self.clock_sync = ClockSync(platform.node(), lambda: self.vibes.addresses)
+        # Cross-device hops in traces collected by this process are put on our clock
+        tracing.collector.clock_offset = lambda device: self.clock_offsets().get(device)
+        await asyncio.gather(vibe_sender.start(), self.vibes.start(), self.clock_sync.start(),
+                             self.share_clock_offsets())
 
-    def get_health_snapshot(self):
-        return {module: status for module, (timestamp, status) in self.last_heartbeats.items()} | {"start_time": self.start_time}
+    def clock_offsets(self):
+        """{ peer device: seconds to add to its timestamps to put them on our clock }"""
+        return {peer: -self.clock_sync.offset(peer) for peer in self.clock_sync.samples}
 
-    async def monitor_heartbeats(self):
-        log("Agent", "Heartbeat monitor started.")
+    async def share_clock_offsets(self):
+        """
+        Traces are finished in the module processes, so they need the offsets too: publish
+        them on the retained clock/<device> topic, which the launcher follows for them.
+        """
+        if not self.channel_url:
+            return
+        if self.control_sender is None:
+            self.control_sender = Sender(self.channel_url, tag="Agent")
         while True:
-            current_time = time.time()
-            for module_name, (last_time, status) in self.last_heartbeats.items():
-                if current_time - last_time > self.HEARTBEAT_TIMEOUT:
-                    log_error("Agent", f"WARNING: Module {module_name} missed heartbeat!")
-            await asyncio.sleep(self.HEARTBEAT_CHECK_INTERVAL)
+            await asyncio.sleep(self.clock_sync.interval)
+            content = {"device": tracing.device, "offsets": self.clock_offsets()}
+            await self.control_sender.publish(tracing.clock_topic(), Message(sender="agent", content=content, msg_type="clock"))
+
+    def get_health_snapshot(self):
+        return {module: entry["status"] for module, entry in self.liveness.modules.items()}
+
+    def advertised_streams(self):
+        return {stream: url for streams in self.streams.values() for stream, url in streams.items()}
+
+    def liveness_snapshot(self, state=None):
+        """The liveness table: per module its state (alive, missed, dead), status, last_seen, age, beats and misses."""
+        return self.liveness.snapshot(state)
 
     async def stop(self):
         log("Agent", "Shutting down...")
-        for module, process in self.modules.items():
-            if process.poll() is None:
-                process.terminate()
+        for process in set(self.modules.values()):
+            if process.returncode is None:
+                try:
+                    process.terminate()
+                except ProcessLookupError:
+                    pass
         if self.gcc_process and self.gcc_process.poll() is None:
             self.gcc_process.terminate()
+        if self.zygote is not None:
+            self.zygote.stop()
         await asyncio.sleep(2)
 
 
@@ -185,9 +551,14 @@ async def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", required=True, help="Path to config file.")
     parser.add_argument("--primary", action="store_true", help="Run as primary agent.")
+    parser.add_argument("--gcc-workers", type=int, help="Number of GCC broker processes (overrides global_channel.workers).")
+    parser.add_argument("--trace-sample", type=float,
+                        help="Fraction of messages to trace end to end (passed to every process launched).")
     args = parser.parse_args()
+    if args.trace_sample is not None:
+        os.environ["CATDOG_TRACE_SAMPLE"] = str(args.trace_sample)
 
-    agent = Agent(config_path=args.config, is_primary=args.primary)
+    agent = Agent(config_path=args.config, is_primary=args.primary, gcc_workers=args.gcc_workers)
     await agent.start()
 
     try:
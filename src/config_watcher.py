@@ -0,0 +1,139 @@
+# config_watcher.py
+
+from log import log, log_error
+import asyncio
+import hashlib
+import os
+import sys
+import yaml
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+
+
+def _inotify(directory):
+    """An inotify fd watching `directory` for written/replaced files, or None where inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        # Watch the directory: editors often save by writing a new file and renaming it over the old one
+        if libc.inotify_add_watch(fd, os.fsencode(directory), IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class ConfigWatcher:
+    """
+    Calls `on_change(config)` with the parsed YAML whenever the file's content changes.
+    Uses inotify on Linux and polls the file every `interval` seconds elsewhere.
+    A file that fails to parse, or is not a mapping, is reported and otherwise ignored until
+    it is fixed. An error in `on_change` is logged and does not stop the watcher.
+    """
+
+    def __init__(self, path, on_change, interval=1.0, settle=0.2):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.interval = interval
+        self.settle = settle  # Let an editor finish writing before reading
+        self.digest = self._digest()
+
+    def _digest(self):
+        try:
+            with open(self.path, "rb") as file:
+                return hashlib.sha1(file.read()).hexdigest()
+        except OSError:
+            return None
+
+    async def run(self):
+        fd = _inotify(os.path.dirname(self.path))
+        log("Agent", f"Watching {self.path} for changes ({'inotify' if fd is not None else 'polling'})")
+        if fd is None:
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.check()
+
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        loop.add_reader(fd, changed.set)
+        try:
+            while True:
+                await changed.wait()
+                await asyncio.sleep(self.settle)
+                changed.clear()
+                try:
+                    while os.read(fd, 4096):
+                        pass  # Any event in the directory means: compare the file's content
+                except BlockingIOError:
+                    pass
+                await self.check()
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+
+    async def check(self):
+        digest = self._digest()
+        if digest is None or digest == self.digest:
+            return
+        try:
+            with open(self.path, "r") as file:
+                config = yaml.safe_load(file)
+        except (OSError, yaml.YAMLError) as e:
+            log_error("Agent", f"Ignoring unreadable config change: {e}")
+            return
+        if not isinstance(config, dict):
+            # An empty file (None) or a bare list or scalar: most likely caught mid-write
+            log_error("Agent", f"Ignoring config change: expected a mapping, got {type(config).__name__}")
+            return
+        self.digest = digest
+        try:
+            await self.on_change(config)
+        except Exception as e:
+            log_error("Agent", f"Applying the changed config failed: {e}")
+
+
+def spawn_units(config, ip):
+    """
+    The processes a device's agent runs, keyed ("module", class path) or ("host", host name),
+    each with its module entries from the config.
+    """
+    units = {}
+    for device_info in (config or {}).get('devices', {}).values():
+        if device_info.get('ip') == ip:
+            for module in device_info.get('modules', []):
+                key = ("host", module['host']) if module.get('host') else ("module", module['module'])
+                units.setdefault(key, []).append(module)
+    return units
+
+
+def diff_units(old, new):
+    """Returns (added, removed, changed) unit keys between two spawn_units() results."""
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    changed = [key for key in new if key in old and new[key] != old[key]]
+    return added, removed, changed
+
+
+def live_params(old_modules, new_modules):
+    """
+    {class path: new params} when a unit changed only in module params (a candidate for a live
+    update), or None when modules were added, removed, reordered or changed in anything else.
+    """
+    if [m['module'] for m in old_modules] != [m['module'] for m in new_modules]:
+        return None
+    updates = {}
+    for old, new in zip(old_modules, new_modules):
+        if {k: v for k, v in old.items() if k != 'params'} != {k: v for k, v in new.items() if k != 'params'}:
+            return None
+        if old.get('params', {}) != new.get('params', {}):
+            updates[new['module']] = new.get('params', {})
+    return updates
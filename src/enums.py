@@ -8,4 +8,9 @@ class HeartbeatStatus(Enum):
 
 class ConnectionStatus(Enum):
     CONNECTED = "connected"
-    LOST = "connection_lost"
\ No newline at end of file
+    LOST = "connection_lost"
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = "drop-oldest"
+    DROP_NEWEST = "drop-newest"
+    DISCONNECT = "disconnect"
@@ -1,38 +1,327 @@
 # gcc.py
 
 from log import log, log_error
+from enums import OverflowPolicy
+from messaging.topics import TopicIndex
+from messaging.outbound_queue import OutboundQueue
+from messaging.retained_cache import RetainedCache
+from messaging.shard_bus import ShardBus
+from messaging.bridge import Bridge, interest_for
+from messaging.codec import EncodedMessage, codec_for, decode_frame, select_subprotocol
+from messaging import tracing
 import websockets
+import multiprocessing
+import argparse
 import asyncio
+import socket
 
-connected_clients = set()
+HOST = "0.0.0.0"
+PORT = 9000
+QUEUE_SIZE = 256
+OVERFLOW_POLICY = OverflowPolicy.DROP_OLDEST
+STATS_INTERVAL = 30  # seconds
+RETAIN_TTL = 60  # seconds
+RETAIN_MAX_ENTRIES = 1024
+BATCH_SIZE = 64         # Frames coalesced per WAN write on federation links
+BATCH_LINGER = 0.005    # seconds
+VERBOSE = False
+
+connected_clients = {}      # { websocket: OutboundQueue }
+legacy_clients = set()      # Clients that never subscribed: they still get every frame
+topic_index = TopicIndex()
+retained = RetainedCache(ttl=RETAIN_TTL, max_entries=RETAIN_MAX_ENTRIES)
+shard_bus = None            # ShardBus when running as one of several worker processes
+bridge_clients = {}         # { websocket: interest last sent } for device GCCs bridged to us
+bridge = None               # Bridge to the primary GCC when running as a device-local GCC
 
 async def gcc_handler(websocket):
     log("GCC", f"New client connected: {websocket.remote_address}")
-    connected_clients.add(websocket)
+    queue = OutboundQueue(websocket, maxsize=QUEUE_SIZE, policy=OVERFLOW_POLICY, tag="GCC",
+                          codec=codec_for(websocket.subprotocol))
+    connected_clients[websocket] = queue
+    legacy_clients.add(websocket)
+    interest_changed()
+    queue.start()
     try:
         async for message in websocket:
-            log("GCC", f"Message received: {message}")
-            await broadcast(message)
+            if VERBOSE:
+                log("GCC", f"Message received: {message}")
+            await handle_frame(websocket, message)
     except websockets.ConnectionClosed:
         log("GCC", f"Client disconnected: {websocket.remote_address}")
     finally:
-        connected_clients.remove(websocket)
+        forget_client(websocket)
+        await queue.close()
+
+def forget_client(websocket):
+    connected_clients.pop(websocket, None)
+    legacy_clients.discard(websocket)
+    bridge_clients.pop(websocket, None)
+    topic_index.remove(websocket)
+    interest_changed()
+
+def interest_changed():
+    """Propagate which topics our clients want: to the other shards, to bridged GCCs and upstream."""
+    if shard_bus is not None:
+        shard_bus.advertise_interest(topic_index.all_patterns(), bool(legacy_clients))
+    remote = shard_bus.remote_patterns() if shard_bus is not None else set()
+    for client, sent in list(bridge_clients.items()):
+        interest = interest_for(topic_index, connected_clients, legacy_clients, exclude=client, extra_patterns=remote)
+        if interest != sent:
+            bridge_clients[client] = interest
+            queue = connected_clients[client]
+            queue.put(queue.codec.encode({"type": "interest", "topics": sorted(interest)}))
+    if bridge is not None:
+        # Legacy clients get everything published on this device, but only what others subscribed to from upstream
+        remote = shard_bus.remote_patterns(include_legacy=False) if shard_bus is not None else set()
+        bridge.set_local_interest(interest_for(topic_index, connected_clients, legacy_clients,
+                                               extra_patterns=remote, include_legacy=False))
+
+async def handle_frame(websocket, frame):
+    try:
+        data = decode_frame(frame)
+    except (ValueError, TypeError):
+        data = None
+    message = EncodedMessage(data=data, frame=frame)
+    if not isinstance(data, dict):
+        broadcast(message)
+        return
+    await handle_message(websocket, message)
+
+async def handle_message(websocket, message):
+    data = message.data
+    kind = data.get("type")
+    if kind == "subscribe":
+        legacy_clients.discard(websocket)
+        topic_index.register(websocket)
+        if "overflow_policy" in data or "queue_size" in data:
+            configure_queue(websocket, data)
+        patterns = [p for p in data.get("topics", []) if p not in topic_index.patterns(websocket)]
+        for pattern in patterns:
+            topic_index.subscribe(websocket, pattern)
+        interest_changed()
+        log("GCC", f"{websocket.remote_address} subscribed to {data.get('topics', [])}")
+        await replay_retained(websocket, patterns)
+    elif kind == "unsubscribe":
+        for pattern in data.get("topics", []):
+            topic_index.unsubscribe(websocket, pattern)
+        interest_changed()
+    elif kind == "bridge":
+        # A device-local GCC: batch its link and tell it which topics our side wants
+        legacy_clients.discard(websocket)
+        topic_index.register(websocket)
+        bridge_clients[websocket] = None
+        queue = connected_clients[websocket]
+        queue.batch_size, queue.linger = BATCH_SIZE, BATCH_LINGER
+        log("GCC", f"Bridge connected from {websocket.remote_address}")
+        interest_changed()
+    elif kind == "batch":
+        for item in data.get("messages", []):
+            if isinstance(item, dict):
+                await handle_message(websocket, EncodedMessage(data=item))
+    elif data.get("topic"):
+        retained.put(untraced(data), message.size())
+        publish(data["topic"], traced(message), origin=websocket)
+    else:
+        broadcast(traced(message))
+
+def configure_queue(websocket, data):
+    """A client may ask for its own overflow policy and queue size when it subscribes; the CLI values are the defaults."""
+    queue = connected_clients.get(websocket)
+    if queue is None:
+        return
+    try:
+        policy = OverflowPolicy(data.get("overflow_policy", queue.policy.value))
+        maxsize = int(data.get("queue_size", queue.maxsize))
+        if maxsize < 1:
+            raise ValueError(f"queue size must be positive, not {maxsize}")
+    except (TypeError, ValueError) as e:
+        log_error("GCC", f"Ignoring queue options of {websocket.remote_address}: {e}")
+        return
+    queue.resize(maxsize, policy)
+    log("GCC", f"{websocket.remote_address} uses a {maxsize} frame queue, overflow policy: {policy.value}")
+
+def traced(message):
+    """Add the GCC hop to a message sampled for tracing; only those few get re-encoded."""
+    if "trace" not in message.data:
+        return message
+    return EncodedMessage(data=tracing.stamp(message.data, "gcc"))
+
+def untraced(data):
+    # A replayed value is not the traced delivery, so the retained copy drops the trace
+    if "trace" not in data:
+        return data
+    return {key: value for key, value in data.items() if key != "trace"}
+
+async def replay_retained(websocket, patterns):
+    """Send a late joiner the last retained value of every matching topic in one batched frame."""
+    if not patterns:
+        return
+    snapshot = retained.snapshot(patterns)
+    if shard_bus is not None:
+        snapshot = merge_snapshots(snapshot + await shard_bus.collect_snapshots(patterns))
+    queue = connected_clients.get(websocket)
+    if snapshot and queue is not None:
+        queue.put(queue.codec.encode({"type": "batch", "retained": True, "messages": snapshot}))
+        log("GCC", f"Replayed {len(snapshot)} retained messages to {websocket.remote_address}")
+
+def merge_snapshots(messages):
+    """Keep the newest message per (sender, topic) when several shards retained one."""
+    newest = {}
+    for message in messages:
+        key = (message.get("sender"), message.get("topic"))
+        if key not in newest or message.get("timestamp", 0) >= newest[key].get("timestamp", 0):
+            newest[key] = message
+    return list(newest.values())
+
+def publish(topic, message, origin=None):
+    """Deliver a frame to local subscribers of its topic and relay it to shards and upstream if wanted there."""
+    # A bridged GCC already delivered the frame on its side, so never echo it back
+    deliver_topic(topic, message, exclude=origin if origin in bridge_clients else None)
+    if shard_bus is not None:
+        shard_bus.relay_publish(topic, message.original)
+    if bridge is not None and bridge.wants(topic):
+        bridge.forward(message)
+
+def from_upstream(topic, message):
+    """Frames from the primary GCC: retain and deliver locally, but never send them back up."""
+    retained.put(untraced(message.data), message.size())
+    deliver_topic(topic, message)
+
+def from_shard(topic, frame):
+    deliver_topic(topic, EncodedMessage(frame=frame))
+
+def broadcast(message):
+    """Frames without a topic keep the old behaviour, but only for clients that never subscribed."""
+    deliver_legacy(message)
+    if shard_bus is not None:
+        shard_bus.relay_broadcast(message.original)
 
-async def broadcast(message):
-    dead_clients = set()
-    for client in connected_clients:
+def deliver_topic(topic, message, exclude=None):
+    clients = topic_index.match(topic) | legacy_clients
+    clients.discard(exclude)
+    deliver(clients, message)
+
+def deliver_legacy(message):
+    deliver(legacy_clients, message)
+
+def from_shard_broadcast(frame):
+    deliver_legacy(EncodedMessage(frame=frame))
+
+def deliver(clients, message):
+    """Hand the frame to each client's outbound queue; never waits on a client's socket."""
+    dead_clients = []
+    for client in clients:
+        queue = connected_clients.get(client)
+        if queue is None:
+            continue
         try:
-            await client.send(message)
-        except websockets.ConnectionClosed:
-            dead_clients.add(client)
-    connected_clients.difference_update(dead_clients)
-
-async def main():
-    log("GCC", "Starting Global Communication Channel on ws://0.0.0.0:9000/global")
-    log("GCC", f"Serving with: {gcc_handler}")
-    log("GCC", f"Args: {gcc_handler.__code__.co_varnames[:gcc_handler.__code__.co_argcount]}")
-    async with websockets.serve(gcc_handler, "0.0.0.0", 9000):
+            frame = message.frame(queue.codec)  # Encoded once per codec, shared by all its clients
+        except ValueError:
+            frame = message.original            # Not decodable: pass it through untouched
+        queue.put(frame)
+        if queue.closed:
+            dead_clients.append(client)
+    for client in dead_clients:
+        forget_client(client)
+
+def client_stats():
+    """Queue depth and drop counters for every connected client."""
+    return [queue.stats() for queue in connected_clients.values()]
+
+async def report_stats(interval=STATS_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        retained.evict_expired()
+        for stats in client_stats():
+            if stats["dropped"] or stats["depth"]:
+                log("GCC", f"Client {stats['client']}: depth={stats['depth']} "
+                           f"high_watermark={stats['high_watermark']} dropped={stats['dropped']}")
+        if shard_bus is not None and shard_bus.dropped:
+            log_error("GCC", f"Shard {shard_bus.shard_id} dropped {shard_bus.dropped} relayed frames")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=HOST, help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=PORT, help="Port to listen on.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of broker processes sharing the port.")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Outbound frames buffered per client.")
+    parser.add_argument("--overflow-policy", default=OVERFLOW_POLICY.value,
+                        choices=[policy.value for policy in OverflowPolicy],
+                        help="What to do when a client's outbound queue is full.")
+    parser.add_argument("--retain-ttl", type=float, default=RETAIN_TTL, help="Seconds a retained last value stays valid.")
+    parser.add_argument("--retain-max-entries", type=int, default=RETAIN_MAX_ENTRIES, help="Retained (sender, topic) entries to keep.")
+    parser.add_argument("--upstream", help="Primary GCC to bridge this device-local GCC to (federation).")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Frames coalesced per write on bridge links.")
+    parser.add_argument("--batch-linger", type=float, default=BATCH_LINGER, help="Seconds to wait for a bridge batch to fill.")
+    parser.add_argument("--verbose", action="store_true", help="Log every frame (slow).")
+    return parser.parse_args(argv)
+
+def configure(args):
+    global QUEUE_SIZE, OVERFLOW_POLICY, VERBOSE, BATCH_SIZE, BATCH_LINGER, retained
+    QUEUE_SIZE = args.queue_size
+    BATCH_SIZE = args.batch_size
+    BATCH_LINGER = args.batch_linger
+    OVERFLOW_POLICY = OverflowPolicy(args.overflow_policy)
+    VERBOSE = args.verbose
+    retained = RetainedCache(ttl=args.retain_ttl, max_entries=args.retain_max_entries)
+
+def supports_sharding():
+    return hasattr(socket, "SO_REUSEPORT") and hasattr(socket, "AF_UNIX")
+
+async def serve(host, port, shard_id=0, shard_count=1, upstream=None):
+    global shard_bus, bridge
+    if shard_count > 1:
+        shard_bus = ShardBus(shard_id, shard_count, port,
+                             on_publish=from_shard,
+                             on_broadcast=from_shard_broadcast,
+                             snapshot_provider=lambda patterns: retained.snapshot(patterns),
+                             on_interest_changed=interest_changed)
+        await shard_bus.start()
+        log("GCC", f"Shard {shard_id + 1}/{shard_count} starting on ws://{host}:{port}")
+    else:
+        log("GCC", f"Starting Global Communication Channel on ws://{host}:{port}/global")
+    log("GCC", f"Per-client queue: {QUEUE_SIZE} frames, overflow policy: {OVERFLOW_POLICY.value}")
+    if upstream:
+        # Each shard bridges its own clients; frames from upstream are delivered locally only
+        bridge = Bridge(upstream, on_message=from_upstream, batch_size=BATCH_SIZE, linger=BATCH_LINGER)
+        asyncio.create_task(bridge.run())
+    async with websockets.serve(gcc_handler, host, port, select_subprotocol=select_subprotocol, reuse_port=shard_count > 1):
+        asyncio.create_task(report_stats())
         await asyncio.Future()
 
+def run_shard(shard_id, args):
+    configure(args)
+    try:
+        asyncio.run(serve(args.host, args.port, shard_id, args.workers, args.upstream))
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    args = parse_args()
+    configure(args)
+    if args.workers > 1 and not supports_sharding():
+        log_error("GCC", "Sharded mode needs SO_REUSEPORT and Unix sockets; falling back to a single process.")
+        args.workers = 1
+    if args.workers == 1:
+        asyncio.run(serve(args.host, args.port, upstream=args.upstream))
+        return
+
+    shards = [
+        multiprocessing.Process(target=run_shard, args=(shard_id, args), name=f"gcc-shard-{shard_id}")
+        for shard_id in range(args.workers)
+    ]
+    for shard in shards:
+        shard.start()
+    try:
+        for shard in shards:
+            shard.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for shard in shards:
+            if shard.is_alive():
+                shard.terminate()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -1,41 +1,242 @@
 # launcher.py
 
+import sys
+import startup_profile
+if "--profile-startup" in sys.argv:
+    startup_profile.start()  # Before anything else is imported, so those imports are timed too
+
 from log import log, log_error
+from enums import HeartbeatStatus
+from messaging.lifecycle import Lifecycle, READY, FAILED, UPDATED, REJECTED
 import argparse
 import asyncio
+import contextvars
 import json
-import sys
+import time
 import importlib
 
-async def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--module", required=True, help="Full class path of the module to launch.")
-    parser.add_argument("--params", required=False, help="JSON-encoded parameters for the module.")
-    args = parser.parse_args()
-
-    module_class_path = args.module
-    params = json.loads(args.params) if args.params else {}
+# Class path of the module whose code is running; inherited by every task it creates
+current_module = contextvars.ContextVar("current_module", default=None)
 
+def load_module(module_class_path, params):
     module_path, class_name = module_class_path.rsplit('.', 1)
-    log("Launcher", module_path)
-    log("Launcher", class_name)
-
-    try:
+    with startup_profile.phase(module_class_path, "import"):
         imported_module = importlib.import_module(module_path)
         ModuleClass = getattr(imported_module, class_name)
+    with startup_profile.phase(module_class_path, "__init__"):
+        return ModuleClass(**params)
+
+async def boot_and_start(module_class_path, module):
+    if hasattr(module, 'boot'):
+        with startup_profile.phase(module_class_path, "boot"):
+            await module.boot()
+    with startup_profile.phase(module_class_path, "start"):
+        await module.start()
+    startup_profile.operational(module_class_path)
+
+def send_heartbeats(module):
+    """Hand a module with a sender to this process's heartbeat scheduler."""
+    if hasattr(module, "heartbeat") and getattr(module, "sender", None) is not None:
+        from modules.heartbeat_scheduler import shared_scheduler
+        shared_scheduler().add(module)
+
+def report_startup(path=None):
+    """With --profile-startup: log where the time to operational went (and write it as JSON to `path`)."""
+    for line in startup_profile.finish(path):
+        log("Launcher", line)
+
+def lifecycle_sender(params_list, tag):
+    """A Sender to the Global Channel of the first module that has one, for lifecycle (and heartbeat) messages."""
+    urls = [params.get("global_channel_url") for params in params_list]
+    url = next((url for url in urls if url), None)
+    if url is None:
+        return None
+    from messaging.sender import Sender
+    sender = Sender(url, tag=tag)
+    sender.start()
+    return sender
+
+def announce(sender, module_class_path, state, launched_at, error=None, module=None):
+    """Tell the agent (and anyone waiting on this module) how its boot went."""
+    if sender is None:
+        return
+    streams = module.streams() if state == READY and hasattr(module, "streams") else None
+    message = Lifecycle(module_class_path, state, launched_at, error=error, name=getattr(module, "name", None),
+                        streams=streams)
+    sender.publish_nowait(message.topic, message)
+
+def follow_control(sender, modules, params, launched_at):
+    """
+    Apply new params that a config reload pushes on control/<module class path>. The outcome
+    goes back as an updated or rejected lifecycle message; rejected means the agent restarts us.
+    """
+    if sender is None:
+        return None
+    from messaging.receiver import Receiver
+
+    async def on_control(data):
+        path = data.get("topic", "").split("/", 1)[-1]
+        content = data.get("content", {})
+        if path not in modules or content.get("action") != "update_params" or content.get("issued_at", 0) < launched_at:
+            return  # Not ours, or a retained update from before this process started
+        new, current = content.get("params", {}), params[path]
+        changed = {key: value for key, value in new.items() if current.get(key) != value}
+        try:
+            removed = set(current) - set(new)
+            if removed:
+                raise ValueError(f"restart needed to remove {', '.join(sorted(removed))}")
+            if not hasattr(modules[path], "update_params"):
+                raise ValueError("module does not support live updates")
+            modules[path].update_params(changed)
+        except Exception as e:
+            log("Launcher", f"Cannot update {path} live: {e}")
+            announce(sender, path, REJECTED, launched_at, error=str(e), module=modules[path])
+            return
+        params[path] = new
+        log("Launcher", f"Updated {path} live: {', '.join(sorted(changed)) or 'no changes'}")
+        announce(sender, path, UPDATED, launched_at, module=modules[path])
+
+    receiver = Receiver(sender.global_channel_url, on_control, topics=[f"control/{path}" for path in modules])
+    asyncio.create_task(receiver.run())
+    return receiver
+
+def follow_clock(sender):
+    """
+    Put the hops that traces picked up on other devices on this device's clock, with the
+    offsets our agent publishes on clock/<device>. Only needed when tracing is on.
+    """
+    from messaging import tracing
+    if sender is None or not tracing.sample_rate:
+        return None
+    from messaging.receiver import Receiver
 
-        module_instance = ModuleClass(**params)
+    async def on_clock(data):
+        tracing.use_clock_offsets(data.get("content", {}).get("offsets", {}))
 
-        if hasattr(module_instance, 'boot'):
-            await module_instance.boot()
-        await module_instance.start()
+    receiver = Receiver(sender.global_channel_url, on_clock, topics=[tracing.clock_topic()])
+    asyncio.create_task(receiver.run())
+    return receiver
+
+async def run_single(module_class_path, params, profile_path=None):
+    class_name = module_class_path.rsplit('.', 1)[1]
+    launched_at = time.time()
+    sender = lifecycle_sender([params], tag="Launcher")
+    module_instance = None
+    try:
+        module_instance = load_module(module_class_path, params)
+        if getattr(module_instance, "sender", None) is None and hasattr(module_instance, "send_heartbeat"):
+            module_instance.sender = sender
+
+        await boot_and_start(module_class_path, module_instance)
 
         log("Launcher", f"{class_name} started. Running indefinitely...")
-        while True:
-            await asyncio.sleep(1)
+        announce(sender, module_class_path, READY, launched_at, module=module_instance)
+        follow_control(sender, {module_class_path: module_instance}, {module_class_path: params}, launched_at)
+        follow_clock(sender)
+        report_startup(profile_path)
+        send_heartbeats(module_instance)
+        await asyncio.Event().wait()  # The module's own tasks (and its heartbeats) run until we are stopped
     except Exception as e:
         log_error("Launcher", f"Module {class_name} crashed with exception: {e}")
+        announce(sender, module_class_path, FAILED, launched_at, error=str(e), module=module_instance)
+        if sender is not None:
+            await sender.close(timeout=5)
         sys.exit(1)
 
+
+class ModuleHost:
+    """
+    Runs several modules in one process and event loop, sharing its imports and
+    its Global Channel connection. Every module runs in its own task: a module that
+    fails to load, boot or start (or whose tasks crash later) is reported with a
+    dying heartbeat and its error, and the other modules keep running.
+    Heartbeats are sent per module, as if each had its own process, but go out
+    together in one frame per tick (see HeartbeatScheduler).
+    """
+
+    def __init__(self, specs, name="module-host", profile_path=None):
+        self.specs = specs      # [ {"module": class path, "params": {...}} ]
+        self.name = name
+        self.modules = {}       # { class path: module instance }
+        self.crashed = {}       # { class path: error message }
+        self.sender = None
+        self.launched_at = time.time()
+        self.profile_path = profile_path
+
+    async def run(self):
+        asyncio.get_running_loop().set_task_factory(self._task_factory)
+        self.sender = lifecycle_sender([spec.get("params", {}) for spec in self.specs], tag=f"Host:{self.name}")
+        await asyncio.gather(*(self._run_module(spec) for spec in self.specs))
+        running = [path for path in self.modules if path not in self.crashed]
+        log("Launcher", f"Module host {self.name}: {len(running)} of {len(self.specs)} modules started")
+        if not running:
+            sys.exit(1)
+        follow_control(self.sender, {path: self.modules[path] for path in running},
+                       {spec["module"]: spec.get("params", {}) for spec in self.specs},
+                       self.launched_at)
+        follow_clock(self.sender)
+        report_startup(self.profile_path)
+
+        for module in self.modules.values():
+            send_heartbeats(module)  # Crashed modules send their dying heartbeat and are dropped
+        await asyncio.Event().wait()
+
+    def _task_factory(self, loop, coro, **kwargs):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        owner = current_module.get()
+        if owner is not None:
+            task.add_done_callback(lambda done: self._task_done(owner, done))
+        return task
+
+    def _task_done(self, path, task):
+        if not task.cancelled() and task.exception() is not None and path not in self.crashed:
+            self._mark_crashed(path, task.exception())
+
+    async def _run_module(self, spec):
+        path = spec["module"]
+        current_module.set(path)
+        try:
+            module = load_module(path, spec.get("params", {}))
+            self.modules[path] = module
+            if getattr(module, "sender", None) is None and hasattr(module, "send_heartbeat"):
+                module.sender = self.sender
+            await boot_and_start(path, module)
+            log("Launcher", f"{path.rsplit('.', 1)[1]} started in host {self.name}")
+            announce(self.sender, path, READY, self.launched_at, module=module)
+        except Exception as e:
+            self._mark_crashed(path, e)
+
+    def _mark_crashed(self, path, error):
+        log_error("Launcher", f"Module {path} crashed with exception: {error}")
+        self.crashed[path] = str(error)
+        module = self.modules.get(path)
+        announce(self.sender, path, FAILED, self.launched_at, error=str(error), module=module)
+        if module is not None and hasattr(module, "set_status"):
+            module.error_info = str(error)
+            module.alive = False
+            module.set_status(HeartbeatStatus.ERROR)
+            if getattr(module, "heartbeats", None) is not None:
+                module.heartbeats.changed(module)  # Send the dying heartbeat now
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", help="Full class path of the module to launch.")
+    parser.add_argument("--params", required=False, help="JSON-encoded parameters for the module.")
+    parser.add_argument("--modules", help="Module host mode: JSON list of {\"module\": ..., \"params\": {...}} to run in this process.")
+    parser.add_argument("--host-name", default="module-host", help="Name of the module host (for logs).")
+    parser.add_argument("--profile-startup", nargs="?", const="", metavar="JSON_PATH",
+                        help="Report import and boot phase timings once started (optionally also as JSON).")
+    args = parser.parse_args()
+    if args.profile_startup is not None:
+        startup_profile.start()  # Already running when forked from a zygote
+
+    if args.modules:
+        await ModuleHost(json.loads(args.modules), name=args.host_name, profile_path=args.profile_startup).run()
+    elif args.module:
+        await run_single(args.module, json.loads(args.params) if args.params else {}, profile_path=args.profile_startup)
+    else:
+        parser.error("one of --module or --modules is required")
+
 if __name__ == "__main__":
     asyncio.run(main())
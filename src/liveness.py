@@ -0,0 +1,128 @@
+# liveness.py
+
+from log import log
+import asyncio
+import time
+
+ALIVE = "alive"
+MISSED = "missed"   # No heartbeat before the deadline; back to alive on the next one
+DEAD = "dead"       # Sent its final (dying) heartbeat
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: keys with a deadline, bucketed by tick. schedule() and cancel()
+    are O(1); advance() only visits the slots whose ticks passed since the last call.
+    Keys fire at most one tick late. Deadlines further out than one rotation
+    (slots * tick seconds) stay in their slot until their round comes.
+    """
+
+    def __init__(self, tick=0.5, slots=256, now=None):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]  # { key: deadline }
+        self.where = {}  # { key: slot index }
+        self.current = int((time.time() if now is None else now) / tick)
+
+    def __len__(self):
+        return len(self.where)
+
+    def schedule(self, key, deadline):
+        self.cancel(key)
+        index = max(int(deadline / self.tick), self.current) % len(self.slots)
+        self.slots[index][key] = deadline
+        self.where[key] = index
+
+    def cancel(self, key):
+        index = self.where.pop(key, None)
+        if index is not None:
+            del self.slots[index][key]
+
+    def advance(self, now):
+        """Remove and return the keys whose deadline is <= now."""
+        target = int(now / self.tick)
+        expired = []
+        for tick in range(self.current, self.current + min(target - self.current + 1, len(self.slots))):
+            slot = self.slots[tick % len(self.slots)]
+            for key in [key for key, deadline in slot.items() if deadline <= now]:
+                del slot[key]
+                del self.where[key]
+                expired.append(key)
+        self.current = max(self.current, target)
+        return expired
+
+
+class Liveness:
+    """
+    Heartbeat deadlines for any number of modules. A heartbeat pushes the module's
+    deadline `timeout` seconds out (or its own, shorter, timeout); a missed deadline is reported once (on_missed),
+    at most `precision` seconds late, and a later heartbeat reports the recovery.
+    Both are O(1) per module thanks to the timing wheel.
+    """
+
+    def __init__(self, timeout=10.0, precision=0.5, on_missed=None, on_recovered=None, clock=time.time):
+        self.timeout = timeout
+        self.precision = precision
+        self.on_missed = on_missed
+        self.on_recovered = on_recovered
+        self.clock = clock
+        self.wheel = TimingWheel(tick=precision, slots=max(64, int(timeout / precision) * 2), now=clock())
+        self.modules = {}  # { module: {"state", "status", "last_seen", "deadline", "beats", "misses", ...} }
+
+    def expect(self, module, grace=0.0):
+        """Start tracking a module that has not sent a heartbeat yet (e.g. just spawned)."""
+        now = self.clock()
+        entry = self.modules.setdefault(module, {"state": ALIVE, "status": "unknown", "last_seen": None,
+                                                 "beats": 0, "misses": 0})
+        self._schedule(module, entry, now + self.timeout + grace)
+
+    def beat(self, module, status, dying=False, timeout=None, **details):
+        now = self.clock()
+        entry = self.modules.setdefault(module, {"state": ALIVE, "status": status, "last_seen": None,
+                                                 "beats": 0, "misses": 0})
+        recovered = entry["state"] == MISSED
+        entry.update(details, status=status, last_seen=now, beats=entry["beats"] + 1)
+        if dying:
+            entry.update(state=DEAD, deadline=None)
+            self.wheel.cancel(module)
+            return
+        entry["state"] = ALIVE
+        self._schedule(module, entry, now + min(self.timeout, timeout or self.timeout))
+        if recovered and self.on_recovered:
+            self.on_recovered(module, entry)
+
+    def forget(self, module):
+        self.wheel.cancel(module)
+        self.modules.pop(module, None)
+
+    def _schedule(self, module, entry, deadline):
+        entry["deadline"] = deadline
+        self.wheel.schedule(module, deadline)
+
+    def check(self):
+        """Mark modules whose deadline passed; returns them."""
+        missed = []
+        for module in self.wheel.advance(self.clock()):
+            entry = self.modules[module]
+            entry.update(state=MISSED, deadline=None, misses=entry["misses"] + 1)
+            missed.append(module)
+            if self.on_missed:
+                self.on_missed(module, entry)
+        return missed
+
+    async def run(self):
+        log("Agent", f"Liveness tracking started (timeout {self.timeout}s, precision {self.precision}s).")
+        while True:
+            self.check()
+            await asyncio.sleep(self.precision)
+
+    def snapshot(self, state=None):
+        """A copy of the liveness table, optionally only modules in `state` (alive, missed or dead)."""
+        now = self.clock()
+        return {
+            module: dict(entry, age=None if entry["last_seen"] is None else now - entry["last_seen"])
+            for module, entry in self.modules.items()
+            if state is None or entry["state"] == state
+        }
+
+    def get(self, module):
+        return self.snapshot().get(module)
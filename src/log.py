@@ -1,11 +1,9 @@
-import platform
-import inspect
+import socket
 from datetime import datetime
-from pathlib import Path
 from colorama import Fore, Style, init
 init(autoreset=True)
 
-DEVICE_NAME = platform.node()
+DEVICE_NAME = socket.gethostname()  # Same as platform.node(), without importing platform
 DEVICE_ALIAS = (
     "PC" if DEVICE_NAME == "GeForce-Watertoren" else
     "Raspberry" if DEVICE_NAME == "MrsRainbow" else
@@ -0,0 +1,109 @@
+# src/messaging/bridge.py
+
+import asyncio
+import random
+import websockets
+from enums import OverflowPolicy
+from log import log, log_error
+from messaging.outbound_queue import OutboundQueue
+from messaging.topics import TopicIndex, MULTI_WILDCARD
+from messaging.codec import SUBPROTOCOLS, EncodedMessage, codec_for, decode_frame
+
+class Bridge:
+    """
+    Federation link from a device-local GCC to the primary GCC.
+    Upstream is subscribed to exactly the patterns the local clients want, and
+    local frames are forwarded only if the primary advertised a matching
+    subscriber. Frames going upstream are batched.
+    """
+
+    def __init__(self, upstream_url, on_message, batch_size=64, linger=0.005, queue_size=1024):
+        self.upstream_url = upstream_url
+        self.on_message = on_message        # (topic, EncodedMessage) -> None, for frames coming from upstream
+        self.batch_size = batch_size
+        self.linger = linger
+        self.queue_size = queue_size
+        self.tag = "GCC-Bridge"
+        self.queue = None
+        self.local_interest = set()         # Patterns we are subscribed to upstream
+        self._remote_interest = TopicIndex()
+        self._remote_patterns = set()
+
+    def wants(self, topic):
+        """True if some client of the primary subscribed to this topic."""
+        return bool(self._remote_patterns) and bool(self._remote_interest.match(topic))
+
+    def forward(self, message):
+        if self.queue is not None and not self.queue.closed:
+            self.queue.put(message.frame(self.queue.codec))
+
+    def set_local_interest(self, patterns):
+        patterns = set(patterns)
+        added, removed = patterns - self.local_interest, self.local_interest - patterns
+        self.local_interest = patterns
+        if added:
+            self._send_control("subscribe", added)
+        if removed:
+            self._send_control("unsubscribe", removed)
+
+    def _send_control(self, kind, patterns):
+        if self.queue is not None:
+            self.queue.put(self.queue.codec.encode({"type": kind, "topics": sorted(patterns)}))
+
+    async def run(self):
+        backoff = 1
+        while True:
+            try:
+                async with websockets.connect(self.upstream_url, subprotocols=SUBPROTOCOLS) as websocket:
+                    log(self.tag, f"Bridged to upstream GCC at {self.upstream_url} ({websocket.subprotocol or 'json'})")
+                    backoff = 1
+                    codec = codec_for(websocket.subprotocol)
+                    self.queue = OutboundQueue(websocket, maxsize=self.queue_size, policy=OverflowPolicy.DROP_OLDEST,
+                                               tag=self.tag, batch_size=self.batch_size, linger=self.linger, codec=codec)
+                    self.queue.put(codec.encode({"type": "bridge"}))
+                    if self.local_interest:
+                        self.queue.put(codec.encode({"type": "subscribe", "topics": sorted(self.local_interest)}))
+                    self.queue.start()
+                    async for frame in websocket:
+                        self._handle(EncodedMessage(data=decode_frame(frame), frame=frame))
+            except Exception as e:
+                log_error(self.tag, f"Upstream connection error: {e}")
+            finally:
+                if self.queue is not None:
+                    await self.queue.close()
+                    self.queue = None
+                self._set_remote_interest([])
+            await asyncio.sleep(backoff * (0.5 + random.random()))
+            backoff = min(backoff * 2, 30)
+
+    def _handle(self, message):
+        data = message.data
+        kind = data.get("type")
+        if kind == "interest":
+            self._set_remote_interest(data.get("topics", []))
+        elif kind == "batch":
+            for item in data.get("messages", []):
+                self._handle(EncodedMessage(data=item))
+        elif data.get("topic"):
+            self.on_message(data["topic"], message)
+
+    def _set_remote_interest(self, patterns):
+        self._remote_interest = TopicIndex()
+        self._remote_patterns = set(patterns)
+        for pattern in patterns:
+            self._remote_interest.subscribe("upstream", pattern)
+
+
+def interest_for(topic_index, clients, legacy_clients, exclude=None, extra_patterns=(), include_legacy=True):
+    """
+    Union of the patterns of `clients` (minus `exclude`); '#' if any legacy client wants everything.
+    With include_legacy=False legacy clients are left out: the upstream subscription of a device
+    GCC, which must not pull the primary's whole traffic because one old module never subscribed.
+    """
+    patterns = set(extra_patterns)
+    for client in clients:
+        if client is not exclude:
+            patterns |= topic_index.patterns(client)
+    if include_legacy and any(client is not exclude for client in legacy_clients):
+        patterns = {MULTI_WILDCARD}
+    return patterns
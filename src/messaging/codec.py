@@ -0,0 +1,235 @@
+# src/messaging/codec.py
+
+import base64
+import json
+import struct
+import threading
+
+JSON = "catdog.json"
+BINARY = "catdog.bin.v1"
+SUBPROTOCOLS = [BINARY, JSON]   # Preference order offered by clients and servers
+
+MAGIC = b"CD"
+VERSION = 1
+FLAG_BATCH = 0x01
+HEADER = struct.Struct("!2sBBIH")    # magic, version, flags, json length, blob count
+BLOB_LENGTH = struct.Struct("!I")
+BLOB_KEY = "$blob"
+NDARRAY_KEY = "$ndarray"
+
+
+class CodecError(ValueError):
+    pass
+
+
+class JsonCodec:
+    """The original wire format: JSON text frames, bytes travel as base64 strings."""
+    name = JSON
+
+    def encode(self, obj):
+        return json.dumps(obj, default=_json_default)
+
+    def decode(self, frame):
+        return json.loads(frame)
+
+    def encode_parts(self, obj):
+        return [self.encode(obj)]
+
+    def join(self, frames):
+        # Frames are already JSON documents, so the batch can be built without re-encoding them
+        return '{"type": "batch", "messages": [' + ", ".join(frames) + "]}"
+
+
+class BinaryCodec:
+    """
+    Compact binary frames: a struct header, a JSON document for the structure and
+    the raw bytes of every bytes-like value appended as length-prefixed blobs.
+    Binary payloads are never base64-encoded, and the JSON part still uses the C encoder.
+    NumPy arrays travel as a small header (dtype, shape) plus their raw buffer and are
+    rebuilt with np.frombuffer on decode, so neither side copies the samples.
+    A payload without blobs is sent as its bare JSON document: the header would only cost
+    time, and small messages (heartbeats, sensor values) must not be slower than on JSON.
+    """
+    name = BINARY
+
+    def encode(self, obj):
+        return b"".join(self.encode_parts(obj))
+
+    def encode_parts(self, obj):
+        """Return the frame as a list of buffers; blobs are passed through without copying."""
+        blobs = _encoding.blobs = []
+        document = _compact_encoder.encode(obj).encode()
+        if not blobs:
+            return [document]
+        prefix = [HEADER.pack(MAGIC, VERSION, 0, len(document), len(blobs))]
+        prefix.extend(BLOB_LENGTH.pack(memoryview(blob).nbytes) for blob in blobs)
+        prefix.append(document)
+        return [b"".join(prefix)] + blobs
+
+    def decode(self, frame):
+        """Decode a frame; a truncated or corrupt one raises CodecError."""
+        try:
+            if frame[:2] != MAGIC:
+                return json.loads(str(frame, "utf-8"))  # A bare JSON document
+            return self._decode(memoryview(frame))
+        except CodecError:
+            raise
+        except (struct.error, IndexError, ValueError) as e:
+            raise CodecError(f"Malformed binary frame: {e}") from e
+
+    def _decode(self, view):
+        if view[:2] != MAGIC:
+            return json.loads(str(view, "utf-8"))
+        magic, version, flags, document_length, blob_count = self._read_header(view)
+        offset = HEADER.size + blob_count * BLOB_LENGTH.size
+        if len(view) < offset:
+            raise CodecError("Binary frame truncated in its blob lengths")
+        lengths = [BLOB_LENGTH.unpack_from(view, HEADER.size + i * BLOB_LENGTH.size)[0] for i in range(blob_count)]
+        if len(view) < offset + document_length + sum(lengths):
+            raise CodecError("Binary frame truncated")
+
+        if flags & FLAG_BATCH:
+            messages = []
+            for length in lengths:
+                messages.append(self._decode(view[offset:offset + length]))
+                offset += length
+            return {"type": "batch", "messages": messages}
+
+        document = bytes(view[offset:offset + document_length])
+        offset += document_length
+        if not blob_count:
+            return json.loads(document)
+
+        blobs = []
+        for length in lengths:
+            blobs.append(view[offset:offset + length])
+            offset += length
+
+        def object_hook(value):
+            if len(value) == 1:
+                if BLOB_KEY in value:
+                    return bytes(blobs[value[BLOB_KEY]])
+                if NDARRAY_KEY in value:
+                    return _array_from_buffer(blobs[value[NDARRAY_KEY]["blob"]], value[NDARRAY_KEY])
+            return value
+
+        return json.loads(document, object_hook=object_hook)
+
+    def join(self, frames):
+        header = HEADER.pack(MAGIC, VERSION, FLAG_BATCH, 0, len(frames))
+        lengths = b"".join(BLOB_LENGTH.pack(len(frame)) for frame in frames)
+        return b"".join([header, lengths] + list(frames))
+
+    @staticmethod
+    def _read_header(view):
+        if len(view) < HEADER.size:
+            raise CodecError("Frame too short for a binary header")
+        header = HEADER.unpack_from(view)
+        if header[0] != MAGIC or header[1] != VERSION:
+            raise CodecError(f"Unknown binary frame (magic={header[0]!r}, version={header[1]})")
+        return header
+
+
+def _is_ndarray(value):
+    # Duck-typed so that the codec does not import numpy unless arrays are actually used
+    return hasattr(value, "__array_interface__") and hasattr(value, "dtype")
+
+
+def _array_buffer(array):
+    if not array.flags.c_contiguous:
+        import numpy as np
+        array = np.ascontiguousarray(array)
+    return memoryview(array).cast("B")
+
+
+def _array_from_buffer(buffer, header):
+    import numpy as np
+    return np.frombuffer(buffer, dtype=np.dtype(header["dtype"])).reshape(header["shape"])
+
+
+def _blob_default(value):
+    # Collects the blobs of the frame being encoded on this thread (see BinaryCodec.encode_parts)
+    blobs = _encoding.blobs
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        blobs.append(value)
+        return {BLOB_KEY: len(blobs) - 1}
+    if _is_ndarray(value):
+        blobs.append(_array_buffer(value))
+        return {NDARRAY_KEY: {"dtype": value.dtype.str, "shape": list(value.shape), "blob": len(blobs) - 1}}
+    return _json_default(value)
+
+
+# Built once: json.dumps with non-default options constructs a new encoder on every call
+_encoding = threading.local()
+_compact_encoder = json.JSONEncoder(separators=(",", ":"), default=_blob_default)
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode("utf-8")
+    if _is_ndarray(value):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+json_codec = JsonCodec()
+binary_codec = BinaryCodec()
+CODECS = {JSON: json_codec, BINARY: binary_codec}
+
+
+def codec_for(subprotocol):
+    """Codec negotiated on a connection; clients that did not negotiate keep JSON."""
+    return CODECS.get(subprotocol, json_codec)
+
+
+def select_subprotocol(connection, subprotocols):
+    """Server-side negotiation: pick the best codec offered, keep clients that offer none on JSON."""
+    for name in SUBPROTOCOLS:
+        if name in subprotocols:
+            return name
+    return None
+
+
+def decode_frame(frame):
+    """Decode any frame: text frames are JSON, binary frames use the binary codec."""
+    if isinstance(frame, str):
+        return json_codec.decode(frame)
+    if bytes(frame[:2]) == MAGIC:
+        return binary_codec.decode(frame)
+    return json_codec.decode(frame)
+
+
+class EncodedMessage:
+    """
+    A message travelling through a broker: decoded once, encoded at most once per codec,
+    however many subscribers it is delivered to.
+    """
+    __slots__ = ("_data", "_frames")
+
+    def __init__(self, data=None, frame=None):
+        self._data = data
+        self._frames = {}
+        if frame is not None:
+            self._frames[JSON if isinstance(frame, str) else BINARY] = frame
+
+    @property
+    def original(self):
+        """The frame as it was received (or first encoded)."""
+        if not self._frames:
+            self._frames[JSON] = json_codec.encode(self._data)
+        return next(iter(self._frames.values()))
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = decode_frame(next(iter(self._frames.values())))
+        return self._data
+
+    def frame(self, codec):
+        frame = self._frames.get(codec.name)
+        if frame is None:
+            frame = self._frames[codec.name] = codec.encode(self.data)
+        return frame
+
+    def size(self):
+        return len(self.original)
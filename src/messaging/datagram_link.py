@@ -0,0 +1,344 @@
+# src/messaging/datagram_link.py
+
+import asyncio
+import ipaddress
+import random
+import socket
+import struct
+import time
+from urllib.parse import urlparse
+from messaging.codec import binary_codec, decode_frame
+from messaging.dispatcher import Dispatcher
+from messaging import tracing
+
+# Every datagram: magic, version, flags, session, sequence, fragment index, fragment count
+PACKET = struct.Struct("!2sBBHIHH")
+MAGIC = b"CL"
+VERSION = 1
+FLAG_CONTROL = 0x01             # Link control (hello/subscribe), not part of the sequenced stream
+
+DEFAULT_MTU = 1400              # Bytes per datagram, safely under a 1500-byte Ethernet/Wi-Fi MTU
+HELLO_INTERVAL = 2.0            # seconds between server hellos / client subscriptions
+CLIENT_TIMEOUT = 10.0           # Unicast clients that stop subscribing are forgotten
+MAX_WRITE_BUFFER = 256 * 1024   # Bytes queued in the socket before frames are dropped
+MAX_PARTIAL = 64                # Messages being reassembled at once
+MAX_SKIPPED = 1024              # Skipped sequences remembered, to tell a late arrival from a duplicate
+
+
+def is_multicast(host):
+    try:
+        return ipaddress.ip_address(host).is_multicast
+    except ValueError:
+        return False
+
+
+def fragment(session, sequence, frame, mtu, flags=0):
+    """Split an encoded frame into datagrams of at most `mtu` bytes."""
+    chunk = mtu - PACKET.size
+    view = memoryview(frame)
+    count = max(1, -(-len(view) // chunk))
+    if count > 0xFFFF:
+        raise ValueError(f"Frame of {len(view)} bytes needs more than 65535 fragments")
+    return [PACKET.pack(MAGIC, VERSION, flags, session, sequence, index, count) + view[index * chunk:(index + 1) * chunk]
+            for index in range(count)]
+
+
+class DatagramLinkServer(asyncio.DatagramProtocol):
+    """
+    ModuleLinkServer over UDP, for high-rate streams where a late reading is worth less
+    than a lost one. Messages are sequence-numbered and split into `mtu`-sized
+    datagrams. With a multicast `group` every frame is sent once to the group;
+    otherwise each unicast client subscribes (and keeps subscribing every few seconds).
+    Nothing is retransmitted, and frames are dropped rather than queued when the socket
+    backs up. Same API as ModuleLinkServer: start, broadcast, broadcast_array, conflate, stop.
+    """
+
+    def __init__(self, host="0.0.0.0", port=9100, group=None, mtu=DEFAULT_MTU, ttl=1, conflate=()):
+        self.host = host
+        self.port = port
+        self.group = group
+        self.mtu = mtu
+        self.ttl = ttl
+        self.conflated_channels = set(conflate)
+        self.session = random.getrandbits(16)
+        self.sequence = 0
+        self.sequences = {}  # { sensor_channel: last sequence number sent }, as in ModuleLinkServer
+        self.clients = {}    # { address: last subscription time } (unicast only)
+        self.transport = None
+        self.sent = 0
+        self.dropped = 0
+        self._hello_task = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        if self.group:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.ttl)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            if self.host not in ("0.0.0.0", ""):
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.host))
+            sock.setblocking(False)
+            self.transport, _ = await loop.create_datagram_endpoint(lambda: self, sock=sock)
+            print(f"[DatagramLinkServer] Sending to multicast udp://{self.group}:{self.port}")
+        else:
+            self.transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=(self.host, self.port))
+            self.port = self.transport.get_extra_info("sockname")[1]
+            print(f"[DatagramLinkServer] Starting on {self.endpoint}")
+        self._hello_task = asyncio.create_task(self._hello_loop())
+
+    @property
+    def endpoint(self):
+        return f"udp://{self.group or self.host}:{self.port}"
+
+    def datagram_received(self, data, addr):
+        if len(data) < PACKET.size:
+            return
+        magic, version, flags, *_ = PACKET.unpack_from(data)
+        if magic != MAGIC or not flags & FLAG_CONTROL:
+            return
+        try:
+            request = decode_frame(bytes(data[PACKET.size:]))
+        except ValueError:
+            return
+        if request.get("type") == "link_subscribe":
+            if addr not in self.clients:
+                print(f"[DatagramLinkServer] Client subscribed: {addr}")
+            self.clients[addr] = time.monotonic()
+            self._send_control(self._hello(), [addr])
+        elif request.get("type") == "link_unsubscribe":
+            self.clients.pop(addr, None)
+
+    async def _hello_loop(self):
+        while True:
+            await asyncio.sleep(HELLO_INTERVAL)
+            now = time.monotonic()
+            for addr, seen in list(self.clients.items()):
+                if now - seen > CLIENT_TIMEOUT:
+                    print(f"[DatagramLinkServer] Client timed out: {addr}")
+                    del self.clients[addr]
+            if self.group:
+                self._send_control(self._hello(), [(self.group, self.port)])
+
+    def _hello(self):
+        # Doubles as a liveness signal and tells clients which channels to conflate
+        return {"type": "link_hello", "conflate": sorted(self.conflated_channels)}
+
+    def _send_control(self, payload, targets):
+        for packet in fragment(self.session, 0, binary_codec.encode(payload), self.mtu, FLAG_CONTROL):
+            for target in targets:
+                self.transport.sendto(packet, target)
+
+    def _targets(self):
+        return [(self.group, self.port)] if self.group else list(self.clients)
+
+    def conflate(self, *channels):
+        """Switch channels to latest-value delivery (applied by clients, see DatagramLinkClient)."""
+        self.conflated_channels.update(channels)
+        self._send_control(self._hello(), self._targets())
+
+    async def broadcast(self, payload: dict, conflate=None):
+        """Send a message to all clients. `conflate` is accepted for API parity; UDP never queues."""
+        targets = self._targets()
+        if not targets or self.transport is None:
+            return
+        tracing.begin(payload, "link.send")
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        packets = fragment(self.session, self.sequence, binary_codec.encode(payload), self.mtu)
+        if self.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            self.dropped += 1
+            return
+        for packet in packets:
+            for target in targets:
+                self.transport.sendto(packet, target)
+        self.sent += 1
+
+    async def broadcast_array(self, sensor_channel, array, timestamp=None, **fields):
+        """Send a NumPy array with its sequence number and timestamp (fragmented to the MTU)."""
+        sequence = self.sequences.get(sensor_channel, -1) + 1
+        self.sequences[sensor_channel] = sequence
+        await self.broadcast(dict(fields,
+                                  sensor_channel=sensor_channel,
+                                  seq=sequence,
+                                  timestamp=timestamp if timestamp is not None else time.time(),
+                                  array=array))
+
+    async def stop(self):
+        if self._hello_task:
+            self._hello_task.cancel()
+        if self.transport:
+            self.transport.close()
+        print("[DatagramLinkServer] Server stopped.")
+
+
+class DatagramLinkClient(asyncio.DatagramProtocol):
+    """
+    Receives a DatagramLinkServer stream from udp://host:port (unicast) or
+    udp://group:port (multicast). Fragments are reassembled, and loss, reordering
+    and duplicates are counted from the sequence numbers.
+    With reorder_window=N, messages that arrive early are held back until the gap
+    before them is filled or N newer messages have arrived; a message arriving after
+    its gap was given up on is dropped, so the callback always sees increasing sequences.
+    Same constructor and run() as ModuleLinkClient.
+    """
+
+    def __init__(self, url, on_message_callback, parent_module=None, reorder_window=0, workers=1, queue_size=1024,
+                 interface="0.0.0.0"):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.multicast = is_multicast(self.host)
+        self.interface = interface
+        self.on_message_callback = on_message_callback
+        self.parent = parent_module
+        self.reorder_window = reorder_window
+        self.conflated_channels = set()
+        self.dispatcher = Dispatcher(on_message_callback, workers=workers, maxsize=queue_size,
+                                     key=lambda payload: payload.get("sensor_channel"), tag="DatagramLinkClient")
+        self.transport = None
+        self.last_hello = None
+
+        self._session = None
+        self._next_sequence = None
+        self._early = {}       # { sequence: payload } held back by the reorder window
+        self._skipped = {}     # { sequence: None } given up on by the reorder window, oldest first
+        self._partial = {}     # { (session, sequence): [fragment count, {index: bytes}] }
+
+        # Counters
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+        self.late = 0
+        self.duplicates = 0
+        self.incomplete = 0
+
+    def _open_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.multicast:
+            if hasattr(socket, "SO_REUSEPORT"):
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(("", self.port))
+            membership = socket.inet_aton(self.host) + socket.inet_aton(self.interface)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        else:
+            sock.bind((self.interface, 0))
+        sock.setblocking(False)
+        return sock
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, sock=self._open_socket())
+        print(f"[DatagramLinkClient] Listening to {self.url}")
+        self.dispatcher.start()
+        try:
+            while True:
+                if not self.multicast:
+                    self._send_control({"type": "link_subscribe"})
+                self._update_connection_status()
+                await asyncio.sleep(HELLO_INTERVAL)
+        finally:
+            if not self.multicast:
+                self._send_control({"type": "link_unsubscribe"})
+            self.transport.close()
+            await self.dispatcher.close()
+
+    def _send_control(self, payload):
+        for packet in fragment(0, 0, binary_codec.encode(payload), DEFAULT_MTU, FLAG_CONTROL):
+            self.transport.sendto(packet, (self.host, self.port))
+
+    def _update_connection_status(self):
+        if self.parent:
+            alive = self.last_hello is not None and time.monotonic() - self.last_hello < 3 * HELLO_INTERVAL
+            self.parent.connection_status = "connected" if alive else "disconnected"
+
+    def datagram_received(self, data, addr):
+        if len(data) < PACKET.size:
+            return
+        magic, version, flags, session, sequence, index, count = PACKET.unpack_from(data)
+        if magic != MAGIC or version != VERSION or index >= count:
+            return
+        body = data[PACKET.size:]
+        if count > 1:
+            body = self._reassemble(session, sequence, index, count, body)
+            if body is None:
+                return
+        try:
+            payload = decode_frame(body)
+        except ValueError:
+            return
+        if flags & FLAG_CONTROL:
+            if payload.get("type") == "link_hello":
+                self.last_hello = time.monotonic()
+                self.conflated_channels = set(payload.get("conflate", []))
+            return
+        self._sequenced(session, sequence, payload)
+
+    def _reassemble(self, session, sequence, index, count, body):
+        key = (session, sequence)
+        entry = self._partial.get(key)
+        if entry is None:
+            if len(self._partial) >= MAX_PARTIAL:
+                # Give up on the oldest message still missing fragments
+                del self._partial[next(iter(self._partial))]
+                self.incomplete += 1
+            entry = self._partial[key] = [count, {}]
+        entry[1][index] = body
+        if len(entry[1]) < count:
+            return None
+        del self._partial[key]
+        return b"".join(entry[1][i] for i in range(count))
+
+    def _sequenced(self, session, sequence, payload):
+        if session != self._session or self._next_sequence - sequence > 0x80000000:
+            # First message, a restarted server or a wrapped sequence number: start counting afresh
+            self._session = session
+            self._next_sequence = sequence
+            self._early.clear()
+            self._skipped.clear()
+        if sequence in self._early:
+            self.duplicates += 1
+            return
+        if sequence < self._next_sequence:
+            if sequence in self._skipped:
+                # Arrived after we gave up on it: it was not lost after all, but it is too late
+                del self._skipped[sequence]
+                self.late += 1
+                self.reordered += 1
+                self.lost = max(0, self.lost - 1)
+            else:
+                self.duplicates += 1  # Already delivered
+            return
+        if sequence > self._next_sequence:
+            self._early[sequence] = payload
+            if len(self._early) > self.reorder_window:
+                # Window full: skip the gap and deliver from the oldest message we hold
+                first = min(self._early)
+                self.lost += first - self._next_sequence
+                self._skip(first)
+            else:
+                return
+        elif self._early:
+            self.reordered += 1   # Filled a gap while later messages were waiting
+            self._early[sequence] = payload
+        else:
+            self._early[sequence] = payload
+        while self._next_sequence in self._early:
+            self._deliver(self._early.pop(self._next_sequence))
+            self._next_sequence += 1
+
+    def _skip(self, first):
+        for sequence in range(max(self._next_sequence, first - MAX_SKIPPED), first):
+            self._skipped[sequence] = None
+        while len(self._skipped) > MAX_SKIPPED:
+            del self._skipped[next(iter(self._skipped))]
+        self._next_sequence = first
+
+    def _deliver(self, payload):
+        self.received += 1
+        tracing.stamp(payload, "link.recv")
+        self.dispatcher.put(payload, conflate=payload.get("sensor_channel") in self.conflated_channels)
+
+    def stats(self):
+        return {"received": self.received, "lost": self.lost, "reordered": self.reordered,
+                "late": self.late, "duplicates": self.duplicates, "incomplete": self.incomplete, "waiting": len(self._early)}
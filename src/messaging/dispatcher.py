@@ -0,0 +1,143 @@
+# src/messaging/dispatcher.py
+
+import asyncio
+import time
+from collections import deque
+from enums import OverflowPolicy
+from log import log_error
+
+class _Lane:
+    """One worker's queue. Conflated items wait as their key, the value lives in `latest`."""
+    __slots__ = ("items", "latest", "ready", "task")
+
+    def __init__(self):
+        self.items = deque()
+        self.latest = {}
+        self.ready = asyncio.Event()
+        self.task = None
+
+
+class _Conflated:
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+
+class Dispatcher:
+    """
+    Decouples a socket reader from slow message handlers.
+    The reader calls put(), which never awaits; `workers` tasks run the handler.
+    Items with the same key (see `key`) always go to the same worker, so they are
+    handled in arrival order; different keys may be handled concurrently.
+    Each worker queue holds at most `maxsize` items and applies the overflow policy
+    (drop-oldest or drop-newest) when full. put(conflate=True) keeps only the newest
+    waiting item per key.
+    """
+
+    def __init__(self, handler, workers=1, maxsize=1024, policy=OverflowPolicy.DROP_OLDEST, key=None,
+                 tag="Dispatcher"):
+        if policy == OverflowPolicy.DISCONNECT:
+            raise ValueError("A dispatcher can only drop messages, not disconnect")
+        self.handler = handler            # async (item) -> None
+        self.key = key or (lambda item: None)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.tag = tag
+        self._lanes = [_Lane() for _ in range(max(1, workers))]
+        self._next_lane = 0
+
+        # Counters
+        self.enqueued = 0
+        self.handled = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.errors = 0
+        self.high_watermark = 0
+        self.handler_time_total = 0.0
+        self.handler_time_max = 0.0
+
+    @property
+    def depth(self):
+        return sum(len(lane.items) for lane in self._lanes)
+
+    def start(self):
+        for lane in self._lanes:
+            if lane.task is None:
+                lane.task = asyncio.create_task(self._work(lane))
+
+    def put(self, item, conflate=False):
+        """Queue an item for its key's worker. Returns False if it was dropped."""
+        key = self.key(item)
+        lane = self._lane_for(key)
+        if conflate and key in lane.latest:
+            lane.latest[key] = item
+            self.conflated += 1
+            return True
+        if len(lane.items) >= self.maxsize:
+            self.dropped += 1
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                return False
+            dropped = lane.items.popleft()
+            if isinstance(dropped, _Conflated):
+                del lane.latest[dropped.key]
+        if conflate:
+            lane.latest[key] = item
+            lane.items.append(_Conflated(key))
+        else:
+            lane.items.append(item)
+        self.enqueued += 1
+        self.high_watermark = max(self.high_watermark, len(lane.items))
+        lane.ready.set()
+        return True
+
+    def _lane_for(self, key):
+        if len(self._lanes) == 1:
+            return self._lanes[0]
+        if key is None:
+            # No ordering requirement: spread round-robin
+            self._next_lane = (self._next_lane + 1) % len(self._lanes)
+            return self._lanes[self._next_lane]
+        return self._lanes[hash(key) % len(self._lanes)]
+
+    async def _work(self, lane):
+        while True:
+            if not lane.items:
+                lane.ready.clear()
+                await lane.ready.wait()
+                continue
+            item = lane.items.popleft()
+            if isinstance(item, _Conflated):
+                item = lane.latest.pop(item.key)
+            started = time.perf_counter()
+            try:
+                await self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                log_error(self.tag, f"Handler failed: {e}")
+            elapsed = time.perf_counter() - started
+            self.handled += 1
+            self.handler_time_total += elapsed
+            self.handler_time_max = max(self.handler_time_max, elapsed)
+
+    async def close(self):
+        for lane in self._lanes:
+            if lane.task is not None:
+                lane.task.cancel()
+        await asyncio.gather(*(lane.task for lane in self._lanes if lane.task is not None), return_exceptions=True)
+        for lane in self._lanes:
+            lane.task = None
+
+    def stats(self):
+        return {
+            "workers": len(self._lanes),
+            "depth": self.depth,
+            "high_watermark": self.high_watermark,
+            "enqueued": self.enqueued,
+            "handled": self.handled,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "errors": self.errors,
+            "handler_ms_avg": 1000 * self.handler_time_total / self.handled if self.handled else 0.0,
+            "handler_ms_max": 1000 * self.handler_time_max,
+        }
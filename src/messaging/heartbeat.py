@@ -30,4 +30,4 @@ class Heartbeat(Message):
         if time_in_status_seconds is not None:
             payload["time_in_status_seconds"] = time_in_status_seconds
 
-        super().__init__(sender=sender, content=payload)  # <-- Pass sender properly
\ No newline at end of file
+        super().__init__(sender=sender, content=payload, msg_type="heartbeat")  # <-- Pass sender properly
\ No newline at end of file
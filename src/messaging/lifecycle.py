@@ -0,0 +1,29 @@
+import os
+import socket
+from messaging.message import Message
+
+READY = "ready"    # start() returned: servers listen, upstream connections are up
+FAILED = "failed"  # load, boot or start raised
+UPDATED = "updated"    # New params from a config reload were applied live
+REJECTED = "rejected"  # New params need a restart (see Module.update_params)
+
+class Lifecycle(Message):
+    """A module's boot (or live update) state, published on lifecycle/<module class path> (retained by the GCC)."""
+
+    def __init__(self, module: str, state: str, launched_at: float, error: str = None, name: str = None,
+                 streams: dict = None):
+        payload = {
+            "module": module,
+            "state": state,
+            "device": socket.gethostname(),
+            "pid": os.getpid(),
+            "launched_at": launched_at,
+        }
+        if error is not None:
+            payload["error"] = error
+        if name is not None:
+            payload["name"] = name  # The module's name, as used in its heartbeats
+        if streams:
+            payload["streams"] = streams  # { stream name: endpoint URL } for the agent to advertise
+
+        super().__init__(sender=module, content=payload, msg_type="lifecycle")
@@ -3,33 +3,48 @@ import time
 import base64
 
 class Message:
-    def __init__(self, sender, content, timestamp=None, msg_type="data"):
+    def __init__(self, sender, content, timestamp=None, msg_type="data", topic=None, trace=None):
         self.sender = sender  # Module name (e.g., "TempSensor")
         self.content = content  # dict, can contain base64-encoded fields
         self.timestamp = timestamp or time.time()
         self.msg_type = msg_type  # 'data' or 'heartbeat'
+        self.topic = topic or Message.default_topic(msg_type, sender)  # e.g. 'heartbeat/ultrasonic_sensor'
+        self.trace = trace  # Optional trace context, see messaging/tracing.py
+
+    @staticmethod
+    def default_topic(msg_type, sender):
+        return f"{msg_type}/{sender}"
 
     def to_dict(self):
-        return {
+        data = {
             "sender": self.sender,
             "timestamp": self.timestamp,
             "type": self.msg_type,
+            "topic": self.topic,
             "content": self.content,
         }
+        if self.trace is not None:
+            data["trace"] = self.trace
+        return data
 
     def to_json(self):
         return json.dumps(self.to_dict())
 
     @staticmethod
-    def from_json(json_string):
-        data = json.loads(json_string)
+    def from_dict(data):
         return Message(
             sender=data["sender"],
             content=data["content"],
             timestamp=data.get("timestamp"),
-            msg_type=data.get("type", "data")
+            msg_type=data.get("type", "data"),
+            topic=data.get("topic"),
+            trace=data.get("trace")
         )
 
+    @staticmethod
+    def from_json(json_string):
+        return Message.from_dict(json.loads(json_string))
+
     @staticmethod
     def encode_binary_data(binary_data):
         return base64.b64encode(binary_data).decode('utf-8')
@@ -37,4 +52,3 @@ class Message:
     @staticmethod
     def decode_binary_data(encoded_string):
         return base64.b64decode(encoded_string)
-
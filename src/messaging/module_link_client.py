@@ -1,27 +1,93 @@
 # src/messaging/module_link_client.py
 
 import asyncio
+import random
 import websockets
-import json
+from messaging.codec import SUBPROTOCOLS, codec_for, decode_frame
+from messaging.dispatcher import Dispatcher
+from messaging import tracing
+from messaging.shm_ring import ShmRingReader, is_local_endpoint
+from messaging.datagram_link import DatagramLinkClient
 
 class ModuleLinkClient:
-    def __init__(self, url, on_message_callback, parent_module=None):
+    """
+    Receives a producer module's stream. Payloads are dicts; arrays sent with
+    ModuleLinkServer.broadcast_array arrive under "array" as read-only np.ndarrays
+    rebuilt with np.frombuffer over the received frame.
+
+    With transport="auto" (the default) a producer on this machine is read through
+    its shared-memory ring instead of the loopback WebSocket; "websocket" disables that.
+
+    The socket is always read promptly: payloads are handed to the callback by a
+    Dispatcher (`workers` tasks, per-channel ordering, at most `queue_size` waiting).
+    Channels the server conflates (announced in its link_hello) keep only their newest
+    value in that queue, so a slow callback never works through stale readings.
+
+    A stream://<name> URL follows whichever producer advertises that stream in the vibes
+    (see Module.streams): the client connects once the stream resolves and moves over as
+    soon as its endpoint changes. Failed connections are retried with jittered exponential
+    backoff, so consumers of a restarting producer do not reconnect in lockstep.
+    """
+    RETRY_MIN = 1.0   # seconds before the first retry
+    RETRY_MAX = 30.0
+    SPILL_TIMEOUT = 1.0  # seconds a ring marker waits for its frame from the WebSocket
+
+    def __init__(self, url, on_message_callback, parent_module=None, transport="auto", workers=1, queue_size=1024,
+                 resolver=None):
         self.url = url
+        self.stream = url[len("stream://"):] if url.startswith("stream://") else None
+        self.resolver = resolver  # VibeListener resolving the stream; the process's shared one by default
+        self.endpoint = None if self.stream else url
         self.on_message_callback = on_message_callback
         self.parent = parent_module  # Optional: for updating connection status
+        self.transport = transport
+        self.shm_reader = None
+        self._shm_task = None
+        self._spills = {}  # { spill id: payload } received over the WebSocket, waiting for their ring marker
+        self._spill_arrived = asyncio.Event()
+        self.conflated_channels = set()
+        self.dispatcher = Dispatcher(on_message_callback, workers=workers, maxsize=queue_size,
+                                     key=lambda payload: payload.get("sensor_channel"), tag="ModuleLinkClient")
 
     async def run(self):
+        self.dispatcher.start()
+        try:
+            await self._run()
+        finally:
+            await self.dispatcher.close()
+
+    async def _run(self):
+        failures = 0
         while True:
+            if self.stream:
+                await self._resolve()
+            url, mover = self.endpoint, None
             try:
-                async with websockets.connect(self.url) as websocket:
-                    print(f"[ModuleLinkClient] Connected to {self.url}")
+                async with websockets.connect(url, subprotocols=SUBPROTOCOLS) as websocket:
+                    print(f"[ModuleLinkClient] Connected to {url} ({websocket.subprotocol or 'json'})")
+                    failures = 0
                     if self.parent:
                         self.parent.connection_status = "connected"
+                    if self.stream:
+                        mover = asyncio.create_task(self._close_when_moved(websocket, url))
+
+                    codec = codec_for(websocket.subprotocol)
+                    if self.transport == "auto" and await is_local_endpoint(url):
+                        await websocket.send(codec.encode({"type": "shm_attach"}))
 
                     async for message in websocket:
                         try:
-                            payload = json.loads(message)
-                            await self.on_message_callback(payload)
+                            payload = decode_frame(message)
+                            kind = payload.get("type", "")
+                            if kind.startswith("shm_"):
+                                await self._handle_shm_control(websocket, codec, payload)
+                            elif kind == "link_hello":
+                                self.conflated_channels = set(payload.get("conflate", []))
+                            elif "shm_spill" in payload and self.shm_reader is not None:
+                                self._spills[payload.pop("shm_spill")] = payload
+                                self._spill_arrived.set()
+                            else:
+                                self._receive(payload)
                         except Exception as e:
                             print(f"[ModuleLinkClient] Failed to handle message: {e}")
 
@@ -29,4 +95,107 @@ class ModuleLinkClient:
                 print(f"[ModuleLinkClient] Connection error: {e}")
                 if self.parent:
                     self.parent.connection_status = "disconnected"
-                await asyncio.sleep(2)
+            finally:
+                if mover is not None:
+                    mover.cancel()
+                await self._close_shm()
+            if self.stream and self.resolver.resolve(self.stream) not in (None, url):
+                continue  # The producer moved: follow it right away
+            failures += 1
+            delay = min(self.RETRY_MAX, self.RETRY_MIN * 2 ** (failures - 1)) * random.uniform(0.5, 1.0)
+            if not self.stream:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await self.resolver.wait_for_stream(self.stream, changed_from=url, timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _resolve(self):
+        if self.resolver is None:
+            from vibes import shared_listener
+            self.resolver = shared_listener()
+        endpoint = self.resolver.resolve(self.stream)
+        if endpoint is None:
+            print(f"[ModuleLinkClient] Waiting for a producer of stream {self.stream}")
+            endpoint = await self.resolver.wait_for_stream(self.stream)
+        if endpoint != self.endpoint:
+            print(f"[ModuleLinkClient] Stream {self.stream} is served on {endpoint}")
+        self.endpoint = endpoint
+
+    async def _close_when_moved(self, websocket, url):
+        await self.resolver.wait_for_stream(self.stream, changed_from=url)
+        print(f"[ModuleLinkClient] Stream {self.stream} moved away from {url}")
+        await websocket.close()
+
+    def _receive(self, payload):
+        tracing.stamp(payload, "link.recv")
+        self.dispatcher.put(payload, conflate=payload.get("sensor_channel") in self.conflated_channels)
+
+    async def _handle_shm_control(self, websocket, codec, payload):
+        kind = payload["type"]
+        if kind == "shm_ready":
+            try:
+                self.shm_reader = ShmRingReader(payload["name"])
+            except (OSError, ValueError) as e:
+                print(f"[ModuleLinkClient] Cannot map shared memory, staying on WebSocket: {e}")
+                return
+            port = await self.shm_reader.open_doorbell()
+            await websocket.send(codec.encode({"type": "shm_doorbell", "port": port}))
+        elif kind == "shm_active" and self.shm_reader is not None:
+            # Everything up to this sequence came over the WebSocket, the rest comes from the ring
+            self.shm_reader.seek(payload["seq"])
+            self._shm_task = asyncio.create_task(self._read_shm(self.shm_reader))
+            print(f"[ModuleLinkClient] Reading {self.endpoint} through shared memory")
+
+    async def _read_shm(self, reader):
+        async for frame in reader.frames():
+            try:
+                payload = decode_frame(frame)
+                if payload.get("type") == "shm_spill":
+                    payload = await self._take_spill(payload["id"])
+                if payload is not None:
+                    self._receive(payload)
+            except Exception as e:
+                print(f"[ModuleLinkClient] Failed to handle message: {e}")
+
+    async def _take_spill(self, spill_id):
+        """The frame a ring marker stands in for, once it arrives over the WebSocket (None if it never does)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.SPILL_TIMEOUT
+        while spill_id not in self._spills:
+            self._spill_arrived.clear()
+            try:
+                await asyncio.wait_for(self._spill_arrived.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                print(f"[ModuleLinkClient] Frame {spill_id} too large for shared memory never arrived")
+                return None
+        for stale in [other for other in self._spills if other < spill_id]:
+            del self._spills[stale]  # Its marker was lost to a ring overrun
+        return self._spills.pop(spill_id)
+
+    async def _close_shm(self):
+        task, self._shm_task = self._shm_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._spills.clear()
+        if self.shm_reader is not None:
+            stats = self.shm_reader.stats()
+            if stats["lost"]:
+                print(f"[ModuleLinkClient] Shared memory overruns: lost {stats['lost']} of {stats['received'] + stats['lost']} frames")
+            self.shm_reader.close()
+            self.shm_reader = None
+
+
+def create_link_client(url, on_message_callback, parent_module=None, **kwargs):
+    """
+    udp:// URLs get a DatagramLinkClient, anything else (ws://, or stream://<name> to follow
+    an advertised WebSocket stream) a ModuleLinkClient.
+    """
+    if url.startswith("udp://"):
+        return DatagramLinkClient(url, on_message_callback, parent_module=parent_module, **kwargs)
+    return ModuleLinkClient(url, on_message_callback, parent_module=parent_module, **kwargs)
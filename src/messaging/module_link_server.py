@@ -1,42 +1,192 @@
 import asyncio
+import time
 import websockets
-import json
+from urllib.parse import urlparse
+from enums import OverflowPolicy
+from messaging import tracing
+from messaging.codec import binary_codec, codec_for, decode_frame, select_subprotocol
+from messaging.outbound_queue import OutboundQueue
+from messaging.shm_ring import ShmRingWriter
+from messaging.datagram_link import DatagramLinkServer, is_multicast
 
 class ModuleLinkServer:
-    def __init__(self, host="0.0.0.0", port=9100):
-        self.clients = set()
+    """
+    Streams a producer module's data to its consumers. Consumers on the same machine
+    can switch to a shared-memory ring (see ShmRingWriter): the WebSocket then only
+    carries control messages and frames too large for a ring slot. Such a frame leaves
+    an shm_spill marker in the ring and goes over the WebSocket tagged with the marker's
+    id, so the consumer delivers it in its place and the order of the stream is kept.
+
+    Every WebSocket client has its own writer task, so a slow consumer never holds up
+    the producer or the other consumers. Channels listed in `conflate` keep only the
+    newest value per client: a consumer that falls behind gets the latest reading
+    instead of a backlog of stale ones. Other channels are queued in full (up to
+    `queue_size` frames per client, oldest dropped first).
+    """
+
+    def __init__(self, host="0.0.0.0", port=9100, shared_memory=True, shm_slots=256, shm_slot_size=64 * 1024,
+                 conflate=(), queue_size=256):
+        self.clients = {}  # { websocket: OutboundQueue (carries the negotiated codec) }
+        self.sequences = {}  # { sensor_channel: last sequence number sent }
         self.host = host
         self.port = port
+        self.conflated_channels = set(conflate)
+        self.queue_size = queue_size
+        self.shared_memory = shared_memory
+        self.shm_slots = shm_slots
+        self.shm_slot_size = shm_slot_size
+        self.ring = None
+        self.shm_clients = {}  # { websocket: doorbell address } for clients reading from the ring
+        self.spills = 0  # Frames too large for the ring sent to shm clients over the WebSocket
 
     async def handler(self, websocket):
         print(f"[ModuleLinkServer] Client connected: {websocket.remote_address}")
-        self.clients.add(websocket)
+        queue = OutboundQueue(websocket, maxsize=self.queue_size, policy=OverflowPolicy.DROP_OLDEST,
+                              tag="ModuleLinkServer", codec=codec_for(websocket.subprotocol))
+        self.clients[websocket] = queue
+        if self.conflated_channels:
+            queue.put(queue.codec.encode(self._hello()))
+        queue.start()
         try:
-            await websocket.wait_closed()
+            async for frame in websocket:
+                await self.handle_control(websocket, decode_frame(frame))
+        except websockets.ConnectionClosed:
+            pass
         finally:
             print(f"[ModuleLinkServer] Client disconnected: {websocket.remote_address}")
-            self.clients.remove(websocket)
+            queue = self.clients.pop(websocket, None)
+            if queue is not None:
+                await queue.close()
+            doorbell = self.shm_clients.pop(websocket, None)
+            if doorbell is not None and self.ring is not None:
+                self.ring.doorbells.discard(doorbell)
+
+    async def handle_control(self, websocket, request):
+        """
+        Shared-memory handshake: shm_attach -> shm_ready (ring name), then once the client has
+        mapped the ring, shm_doorbell -> shm_active (last sequence sent over the WebSocket).
+        """
+        queue = self.clients[websocket]
+        kind = request.get("type")
+        if kind == "shm_attach":
+            ring = self._ensure_ring()
+            if ring is None:
+                queue.put(queue.codec.encode({"type": "shm_unavailable"}))
+            else:
+                queue.put(queue.codec.encode({"type": "shm_ready", "name": ring.name}))
+        elif kind == "shm_doorbell" and self.ring is not None:
+            doorbell = ("127.0.0.1", int(request["port"]))
+            self.shm_clients[websocket] = doorbell
+            self.ring.doorbells.add(doorbell)
+            # Queued behind the frames already waiting for this client, so none are lost or duplicated
+            queue.put(queue.codec.encode({"type": "shm_active", "seq": self.ring.sequence}))
+            print(f"[ModuleLinkServer] Client {websocket.remote_address} switched to shared memory ({self.ring.name})")
+
+    def _ensure_ring(self):
+        if self.ring is None and self.shared_memory:
+            try:
+                self.ring = ShmRingWriter(f"catdog-link-{self.port}", self.shm_slots, self.shm_slot_size)
+            except OSError as e:
+                print(f"[ModuleLinkServer] Shared memory unavailable: {e}")
+                self.shared_memory = False
+        return self.ring
 
     async def start(self):
-        print(f"[ModuleLinkServer] Starting on ws://{self.host}:{self.port}")
         self.server = await websockets.serve(
             self.handler,
             self.host,
-            self.port
+            self.port,
+            select_subprotocol=select_subprotocol
         )
+        if not self.port:
+            self.port = self.server.sockets[0].getsockname()[1]  # Port 0: whichever port the OS picked
+        print(f"[ModuleLinkServer] Starting on {self.endpoint}")
 
-    async def broadcast(self, payload: dict):
-        """Send JSON message to all connected clients."""
-        message = json.dumps(payload)
-        dead = set()
-        for client in self.clients:
-            try:
-                await client.send(message)
-            except websockets.ConnectionClosed:
-                dead.add(client)
-        self.clients -= dead
+    @property
+    def endpoint(self):
+        """The URL this server listens on, e.g. for advertising it as a stream."""
+        return f"ws://{self.host}:{self.port}"
+
+    def conflate(self, *channels):
+        """Switch channels to latest-value delivery."""
+        self.conflated_channels.update(channels)
+        for queue in self.clients.values():
+            queue.put(queue.codec.encode(self._hello()))
+
+    def _hello(self):
+        # Lets clients conflate on their side too, so stale values do not wait in socket buffers
+        return {"type": "link_hello", "conflate": sorted(self.conflated_channels)}
+
+    async def broadcast(self, payload: dict, conflate=None):
+        """
+        Queue a message for all connected clients, encoded once per negotiated codec.
+        `conflate` overrides the channel's configured delivery mode for this message.
+        """
+        tracing.begin(payload, "link.send")
+        channel = payload.get("sensor_channel")
+        if conflate is None:
+            conflate = channel in self.conflated_channels
+        frames = {}
+        spill = None
+        if self.shm_clients:
+            parts = binary_codec.encode_parts(payload)
+            if self.ring.fits(sum(memoryview(part).nbytes for part in parts)):
+                self.ring.write(parts)
+            else:
+                self.spills += 1
+                self.ring.write([binary_codec.encode({"type": "shm_spill", "id": self.spills})])
+                spill = (dict(payload, shm_spill=self.spills), {})  # Tagged payload, its frame per codec
+            frames[binary_codec.name] = parts[0] if len(parts) == 1 else parts
+        for client, queue in list(self.clients.items()):
+            codec = queue.codec
+            if client in self.shm_clients:
+                if spill is not None:
+                    tagged, spill_frames = spill
+                    if codec.name not in spill_frames:
+                        parts = codec.encode_parts(tagged)
+                        spill_frames[codec.name] = parts[0] if len(parts) == 1 else parts
+                    queue.put(spill_frames[codec.name])
+                continue
+            if codec.name not in frames:
+                parts = codec.encode_parts(payload)
+                # Multi-part frames (binary header + raw buffers) go out as one fragmented message, uncopied
+                frames[codec.name] = parts[0] if len(parts) == 1 else parts
+            if conflate:
+                queue.put_latest(channel, frames[codec.name])
+            else:
+                queue.put(frames[codec.name])
+
+    async def broadcast_array(self, sensor_channel, array, timestamp=None, **fields):
+        """
+        Send a NumPy array (e.g. an audio buffer) with its dtype, shape, sequence number and timestamp.
+        Binary clients get the raw buffer straight from the array's memory; JSON clients get a list.
+        Frames reference the array until they are written, so do not modify it after sending.
+        """
+        sequence = self.sequences.get(sensor_channel, -1) + 1
+        self.sequences[sensor_channel] = sequence
+        await self.broadcast(dict(fields,
+                                  sensor_channel=sensor_channel,
+                                  seq=sequence,
+                                  timestamp=timestamp if timestamp is not None else time.time(),
+                                  array=array))
 
     async def stop(self):
         self.server.close()
         await self.server.wait_closed()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
         print("[ModuleLinkServer] Server stopped.")
+
+
+def create_link_server(url="ws://0.0.0.0:9100", **kwargs):
+    """
+    Pick the link transport from a URL: ws://host:port serves WebSockets (with shared memory
+    for same-host consumers), udp://host:port unicast datagrams and udp://group:port multicast.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "udp":
+        if is_multicast(parsed.hostname):
+            return DatagramLinkServer(port=parsed.port, group=parsed.hostname, **kwargs)
+        return DatagramLinkServer(host=parsed.hostname, port=parsed.port, **kwargs)
+    return ModuleLinkServer(host=parsed.hostname, port=parsed.port, **kwargs)
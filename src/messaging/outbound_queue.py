@@ -0,0 +1,205 @@
+# src/messaging/outbound_queue.py
+
+import asyncio
+import websockets
+from collections import deque
+from enums import OverflowPolicy
+from messaging.codec import json_codec
+from log import log_error
+
+class _Latest:
+    """Placeholder in the queue for the newest frame of a conflated key."""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+
+class OutboundQueue:
+    """
+    Bounded send queue for one client, drained by its own writer task.
+    Producers never await a client's socket: put() is O(1) and applies the
+    overflow policy when the client cannot keep up.
+    Frames are expected to be encoded with the client's negotiated `codec`.
+    With batch_size > 1, queued frames are coalesced into one batch frame,
+    waiting up to `linger` seconds for more to arrive.
+    Frames queued with put_latest() are conflated: only the newest frame per key
+    waits in the queue, and it is sent in the position of the first one queued.
+    """
+
+    def __init__(self, websocket, maxsize=256, policy=OverflowPolicy.DROP_OLDEST, tag="OutboundQueue",
+                 batch_size=1, linger=0.0, codec=json_codec):
+        self.websocket = websocket
+        self.codec = codec
+        self.maxsize = maxsize
+        self.policy = policy
+        self.tag = tag
+        self.batch_size = batch_size
+        self.linger = linger
+        self.closed = False
+        self._frames = deque()
+        self._latest = {}   # { key: newest frame } for keys with a _Latest in _frames
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+        # Counters
+        self.enqueued = 0
+        self.sent = 0
+        self.frames_written = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.high_watermark = 0
+
+    @property
+    def depth(self):
+        return len(self._frames)
+
+    def start(self):
+        self._task = asyncio.create_task(self._drain())
+        return self._task
+
+    def put(self, frame):
+        """Queue a frame for this client. Returns False if the frame was not queued."""
+        if self.closed or not self._make_room():
+            return False
+        self._frames.append(frame)
+        self._queued()
+        return True
+
+    def put_latest(self, key, frame):
+        """Queue a frame that supersedes any frame with the same key still waiting to be sent."""
+        if self.closed:
+            return False
+        if key in self._latest:
+            self._latest[key] = frame
+            self.conflated += 1
+            self.enqueued += 1
+            return True
+        if not self._make_room():
+            return False
+        self._latest[key] = frame
+        self._frames.append(_Latest(key))
+        self._queued()
+        return True
+
+    def resize(self, maxsize, policy=None):
+        """Change the bound (and policy); frames already beyond a smaller bound are shed by the policy."""
+        self.maxsize = maxsize
+        if policy is not None:
+            self.policy = policy
+        excess = len(self._frames) - maxsize
+        if excess <= 0 or self.closed:
+            return
+        self.dropped += excess
+        if self.policy == OverflowPolicy.DISCONNECT:
+            self._disconnect_slow_consumer()
+            return
+        for _ in range(excess):
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                self._pop()
+            else:
+                self._popleft()
+
+    def _make_room(self):
+        if len(self._frames) < self.maxsize:
+            return True
+        self.dropped += 1
+        if self.policy == OverflowPolicy.DROP_NEWEST:
+            return False
+        if self.policy == OverflowPolicy.DISCONNECT:
+            self._disconnect_slow_consumer()
+            return False
+        self._popleft()
+        return True
+
+    def _queued(self):
+        self.enqueued += 1
+        self.high_watermark = max(self.high_watermark, len(self._frames))
+        self._wakeup.set()
+
+    def _peek(self):
+        item = self._frames[0]
+        return self._latest[item.key] if isinstance(item, _Latest) else item
+
+    def _popleft(self):
+        item = self._frames.popleft()
+        return self._latest.pop(item.key) if isinstance(item, _Latest) else item
+
+    def _pop(self):
+        item = self._frames.pop()
+        return self._latest.pop(item.key) if isinstance(item, _Latest) else item
+
+    async def _drain(self):
+        try:
+            while not self.closed:
+                if not self._frames:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                if self.batch_size > 1:
+                    if self.linger and len(self._frames) < self.batch_size:
+                        await asyncio.sleep(self.linger)
+                    await self._send_batch()
+                else:
+                    await self.websocket.send(self._popleft())
+                    self.sent += 1
+                self.frames_written += 1
+        except websockets.ConnectionClosed:
+            self.closed = True
+        except Exception as e:
+            log_error(self.tag, f"Writer for {self._address()} failed: {e}")
+            self.closed = True
+
+    async def _send_batch(self):
+        frames = []
+        while self._frames and len(frames) < self.batch_size and self._batchable(self._peek()):
+            frames.append(self._popleft())
+        if not frames:
+            # Frames in a foreign format (e.g. raw legacy text) are sent as they are
+            await self.websocket.send(self._popleft())
+            self.sent += 1
+            return
+        if len(frames) == 1:
+            await self.websocket.send(frames[0])
+        else:
+            await self.websocket.send(self.codec.join(frames))
+        self.sent += len(frames)
+
+    def _batchable(self, frame):
+        if self.codec is json_codec:
+            return isinstance(frame, str)
+        return isinstance(frame, (bytes, bytearray))
+
+    def _disconnect_slow_consumer(self):
+        log_error(self.tag, f"Disconnecting slow consumer {self._address()} (queue full at {self.maxsize})")
+        self.closed = True
+        self._frames.clear()
+        self._latest.clear()
+        self._wakeup.set()
+        asyncio.create_task(self.websocket.close(code=1008, reason="slow consumer"))
+
+    def _address(self):
+        return getattr(self.websocket, "remote_address", None)
+
+    async def close(self):
+        self.closed = True
+        self._wakeup.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        return {
+            "client": str(self._address()),
+            "depth": self.depth,
+            "high_watermark": self.high_watermark,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "frames_written": self.frames_written,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "policy": self.policy.value,
+        }
@@ -1,32 +1,102 @@
 import asyncio
 import websockets
-import json
 from log import log, log_error
 from enums import ConnectionStatus
+from messaging.codec import SUBPROTOCOLS, codec_for, decode_frame, json_codec
+from messaging.dispatcher import Dispatcher
+from messaging import tracing
 
 class Receiver:
-    def __init__(self, global_channel_url, on_message_callback, module=None):
+    """
+    Reads the Global Channel and hands messages to `on_message_callback` through a
+    Dispatcher, so a slow callback never stops the socket from being read. Messages
+    on the same topic are handled in order; with workers > 1 different topics run
+    concurrently.
+    `overflow_policy` and `gcc_queue_size` ask the GCC for this client's own outbound
+    queue settings instead of its defaults.
+    """
+
+    def __init__(self, global_channel_url, on_message_callback, module=None, topics=None, workers=1,
+                 queue_size=1024, overflow_policy=None, gcc_queue_size=None):
         self.global_channel_url = global_channel_url
         self.on_message_callback = on_message_callback
         self.websocket = None
+        self.codec = json_codec
         self.module = module
         self.tag = module.__class__.__name__ if module else "Receiver"
+        # None = legacy mode (receive everything); a set = topic patterns this receiver wants
+        self.subscriptions = set(topics) if topics is not None else None
+        self.queue_options = {}
+        if overflow_policy is not None:
+            self.queue_options["overflow_policy"] = getattr(overflow_policy, "value", overflow_policy)
+        if gcc_queue_size is not None:
+            self.queue_options["queue_size"] = gcc_queue_size
+        self.dispatcher = Dispatcher(on_message_callback, workers=workers, maxsize=queue_size,
+                                     key=lambda data: data.get("topic") or data.get("sender"), tag=self.tag)
+
+    async def subscribe(self, *patterns):
+        """Declare topic patterns such as 'heartbeat/*' or 'control/shutdown'."""
+        if self.subscriptions is None:
+            self.subscriptions = set()
+        self.subscriptions.update(patterns)
+        await self._send_control("subscribe", patterns)
+
+    async def unsubscribe(self, *patterns):
+        if self.subscriptions is None:
+            return
+        self.subscriptions.difference_update(patterns)
+        await self._send_control("unsubscribe", patterns)
+
+    async def _send_control(self, kind, patterns):
+        if self.websocket is None:
+            return  # Subscriptions are (re)sent on connect
+        control = {"type": kind, "topics": list(patterns)}
+        if kind == "subscribe":
+            control.update(self.queue_options)
+        try:
+            await self.websocket.send(self.codec.encode(control))
+        except websockets.ConnectionClosed:
+            pass
 
     async def run(self):
         log(self.tag, f"Connecting to Global Channel at {self.global_channel_url}")
+        self.dispatcher.start()
+        try:
+            await self._run()
+        finally:
+            await self.dispatcher.close()
+
+    async def _run(self):
         while True:
             try:
-                self.websocket = await websockets.connect(self.global_channel_url)
-                log(self.tag, "Connected.")
+                self.websocket = await websockets.connect(self.global_channel_url, subprotocols=SUBPROTOCOLS)
+                self.codec = codec_for(self.websocket.subprotocol)
+                log(self.tag, f"Connected ({self.codec.name}).")
+                if self.subscriptions is not None:
+                    await self._send_control("subscribe", self.subscriptions)
                 if self.module:
                     self.module.connection_status = ConnectionStatus.CONNECTED
 
                 async for message in self.websocket:
-                    data = json.loads(message)
-                    await self.on_message_callback(data)
+                    try:
+                        data = decode_frame(message)
+                    except (ValueError, TypeError) as e:
+                        log_error(self.tag, f"Skipping undecodable frame: {e}")
+                        continue
+                    if not isinstance(data, dict):
+                        log_error(self.tag, f"Skipping frame that is not a message: {type(data).__name__}")
+                        continue
+                    if data.get("type") == "batch":
+                        # Batched frames (e.g. the GCC's retained snapshot on subscribe)
+                        for item in data.get("messages", []):
+                            if isinstance(item, dict):
+                                self.dispatcher.put(tracing.stamp(item, "receiver.recv"))
+                    else:
+                        self.dispatcher.put(tracing.stamp(data, "receiver.recv"))
 
             except Exception as e:
                 log_error(self.tag, f"Connection error: {e}")
+                self.websocket = None
                 if self.module:
                     self.module.connection_status = ConnectionStatus.LOST
                 await asyncio.sleep(2)
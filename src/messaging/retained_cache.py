@@ -0,0 +1,60 @@
+# src/messaging/retained_cache.py
+
+import time
+from collections import OrderedDict
+from messaging.topics import topic_matches
+
+class RetainedCache:
+    """
+    Last-value cache for the GCC, keyed by (sender, topic).
+    Entries expire after `ttl` seconds and the cache is bounded both in entry
+    count and in approximate bytes; the least recently updated entry goes first.
+    """
+
+    def __init__(self, ttl=60.0, max_entries=1024, max_bytes=1_000_000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.total_bytes = 0
+        self.evicted = 0
+        self._entries = OrderedDict()   # { (sender, topic): (stored_at, size, message) }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, message, size):
+        """Retain a parsed message (dict with 'topic', optionally 'sender'); `size` is its encoded length."""
+        if message.get("retain") is False or not message.get("topic"):
+            return
+        key = (message.get("sender"), message["topic"])
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= previous[1]
+        now = self.clock()
+        self._entries[key] = (now, size, message)
+        self.total_bytes += size
+        self._evict(now)
+
+    def snapshot(self, patterns):
+        """Return the retained messages whose topic matches any of the patterns, oldest first."""
+        self._evict(self.clock())
+        patterns = list(patterns)
+        return [
+            message for (sender, topic), (_, _, message) in self._entries.items()
+            if any(topic_matches(pattern, topic) for pattern in patterns)
+        ]
+
+    def evict_expired(self):
+        self._evict(self.clock())
+
+    def _evict(self, now):
+        # Entries are kept in update order, so expired and over-budget entries are always at the head
+        while self._entries:
+            stored_at, size, _ = next(iter(self._entries.values()))
+            over_budget = len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes
+            if not over_budget and now - stored_at <= self.ttl:
+                break
+            self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evicted += 1
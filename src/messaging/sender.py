@@ -1,28 +1,163 @@
 import asyncio
+import random
 import websockets
-import json
+from collections import deque
+from enums import OverflowPolicy
 from log import log, log_error
+from messaging.message import Message
+from messaging.codec import SUBPROTOCOLS, codec_for, json_codec
+from messaging import tracing
 
 class Sender:
-    def __init__(self, global_channel_url, tag="Sender"):
+    """
+    Publishes to the Global Channel without ever blocking the module on the network.
+    send()/publish() only queue the payload; a writer task owns the connection,
+    reconnects with jittered backoff and coalesces bursts into batch frames of up to
+    `batch_size` messages, waiting at most `linger` seconds for a batch to fill.
+    While disconnected, up to `maxsize` payloads are kept (oldest dropped first by default).
+    """
+
+    def __init__(self, global_channel_url, tag="Sender", maxsize=1024, batch_size=32, linger=0.002,
+                 policy=OverflowPolicy.DROP_OLDEST):
         self.global_channel_url = global_channel_url
         self.websocket = None
+        self.codec = json_codec
         self.tag = tag
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.linger = linger
+        self.policy = policy
+        self._payloads = deque()
+        self._wakeup = asyncio.Event()
+        self._connected = asyncio.Event()
+        self._task = None
+        self._closing = False
+
+        # Counters
+        self.enqueued = 0
+        self.sent = 0
+        self.frames_written = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
 
-    async def connect(self):
-        log(self.tag, f"Connecting to Global Channel at {self.global_channel_url}")
-        self.websocket = await websockets.connect(self.global_channel_url)
-        log(self.tag, "Connected.")
+    async def connect(self, timeout=5.0):
+        """Start the writer task and wait (up to `timeout`) for the first connection. Never raises."""
+        self.start()
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout)
+        except asyncio.TimeoutError:
+            log_error(self.tag, f"Global Channel not reachable yet, buffering up to {self.maxsize} messages")
+        return self.connected
+
+    def start(self):
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+        return self._task
 
     async def send(self, message):
-        if self.websocket is None:
-            raise RuntimeError(f"[{self.tag}] Call connect() before sending.")
-        payload = message.content if hasattr(message, 'content') else message
-        await self.websocket.send(json.dumps(payload))
-        log(self.tag, f"Sent: {payload}")
+        if isinstance(message, Message):
+            self.publish_nowait(message.topic, message)
+        else:
+            self._enqueue(message.content if hasattr(message, 'content') else message)
+
+    async def publish(self, topic, message):
+        """Publish a Message (or a plain dict) on a topic; the GCC routes it to matching subscribers only."""
+        self.publish_nowait(topic, message)
+
+    def publish_nowait(self, topic, message):
+        payload = message.to_dict() if isinstance(message, Message) else dict(message)
+        payload["topic"] = topic
+        return self._enqueue(tracing.begin(payload, "sender.publish"))
+
+    def _enqueue(self, payload):
+        """Queue a payload for the writer task. Returns False if it was dropped."""
+        self.start()
+        if len(self._payloads) >= self.maxsize:
+            self.dropped += 1
+            if self.policy != OverflowPolicy.DROP_OLDEST:
+                return False
+            self._payloads.popleft()
+        self._payloads.append(payload)
+        self.enqueued += 1
+        self._wakeup.set()
+        return True
+
+    async def _run(self):
+        backoff = 1
+        while not self._closing or self._payloads:  # Closing still flushes what was queued
+            try:
+                log(self.tag, f"Connecting to Global Channel at {self.global_channel_url}")
+                async with websockets.connect(self.global_channel_url, subprotocols=SUBPROTOCOLS) as websocket:
+                    self.websocket = websocket
+                    self.codec = codec_for(websocket.subprotocol)
+                    # A Sender never reads, so opt out of the legacy broadcast-to-everyone delivery
+                    await websocket.send(self.codec.encode({"type": "subscribe", "topics": []}))
+                    log(self.tag, f"Connected ({self.codec.name}).")
+                    backoff = 1
+                    self._connected.set()
+                    await self._drain(websocket)
+                    return
+            except Exception as e:
+                if not self._closing:
+                    log_error(self.tag, f"Connection to Global Channel lost: {e}")
+            finally:
+                self.websocket = None
+                self._connected.clear()
+            if self._closing:
+                return
+            self.reconnects += 1
+            await asyncio.sleep(backoff * (0.5 + random.random()))
+            backoff = min(backoff * 2, 30)
+
+    async def _drain(self, websocket):
+        while True:
+            if not self._payloads:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if self.linger and len(self._payloads) < self.batch_size and not self._closing:
+                await asyncio.sleep(self.linger)
+            batch = [self._payloads.popleft() for _ in range(min(self.batch_size, len(self._payloads)))]
+            frames = [self.codec.encode(payload) for payload in batch]
+            try:
+                await websocket.send(frames[0] if len(frames) == 1 else self.codec.join(frames))
+            except Exception:
+                # Not written: keep the batch (in order) for the next connection
+                self._payloads.extendleft(reversed(batch))
+                while len(self._payloads) > self.maxsize:
+                    self._payloads.pop()
+                    self.dropped += 1
+                raise
+            self.sent += len(batch)
+            self.frames_written += 1
 
-    async def close(self):
-        if self.websocket:
-            await self.websocket.close()
-            log(self.tag, "Connection closed.")
+    async def close(self, timeout=1.0):
+        """Flush what is queued (up to `timeout` seconds), then close the connection."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        log(self.tag, "Connection closed.")
 
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "depth": len(self._payloads),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "frames_written": self.frames_written,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,234 @@
+# src/messaging/shard_bus.py
+
+import asyncio
+import itertools
+import os
+import struct
+import tempfile
+from log import log, log_error
+from messaging.topics import TopicIndex, MULTI_WILDCARD
+from messaging.codec import binary_codec
+
+HEADER = struct.Struct("!IB")       # payload length, frame kind
+TOPIC_HEADER = struct.Struct("!HB")  # topic length, is_text
+
+PUBLISH = 1
+BROADCAST = 2
+INTEREST = 3
+SNAPSHOT_REQUEST = 4
+SNAPSHOT_REPLY = 5
+
+MAX_PEER_BUFFER = 4 * 1024 * 1024   # bytes buffered towards one stalled shard before dropping
+
+
+def socket_path(port, shard_id, socket_dir=None):
+    return os.path.join(socket_dir or tempfile.gettempdir(), f"catdog-gcc-{port}-{shard_id}.sock")
+
+
+class ShardBus:
+    """
+    Local IPC bus between GCC shard processes (one Unix socket per shard).
+    Each shard advertises the topic patterns its clients subscribed to, so a
+    frame is only relayed to the shards that have a matching subscriber.
+    Relayed frames are delivered locally by the receiving shard and never re-relayed.
+    """
+
+    def __init__(self, shard_id, shard_count, port, on_publish, on_broadcast, snapshot_provider, socket_dir=None,
+                 on_interest_changed=None):
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.port = port
+        self.on_publish = on_publish                # (topic, frame) -> None
+        self.on_broadcast = on_broadcast            # (frame) -> None
+        self.snapshot_provider = snapshot_provider  # (patterns) -> [message dict]
+        self.on_interest_changed = on_interest_changed
+        self.socket_dir = socket_dir
+        self.tag = f"GCC-{shard_id}"
+        self.relayed = 0
+        self.dropped = 0
+
+        self._server = None
+        self._peers = {}                    # { shard_id: StreamWriter }
+        self._peer_interest = TopicIndex()  # subscriber = peer shard id
+        self._legacy_peers = set()          # peers with clients that receive everything
+        self._local_interest = ([], False)
+        self._snapshot_ids = itertools.count()
+        self._pending_snapshots = {}        # { request_id: (Future, [messages], remaining) }
+        self._tasks = []
+
+    async def start(self):
+        path = socket_path(self.port, self.shard_id, self.socket_dir)
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = await asyncio.start_unix_server(self._handle_peer, path=path)
+        for peer_id in range(self.shard_count):
+            if peer_id != self.shard_id:
+                self._tasks.append(asyncio.create_task(self._connect(peer_id)))
+        log(self.tag, f"Shard bus listening on {path}")
+
+    async def _connect(self, peer_id):
+        path = socket_path(self.port, peer_id, self.socket_dir)
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+            except OSError:
+                await asyncio.sleep(0.1)
+                continue
+            self._peers[peer_id] = writer
+            patterns, legacy = self._local_interest
+            self._write(writer, INTEREST, binary_codec.encode({"shard": self.shard_id, "patterns": patterns, "legacy": legacy}))
+            log(self.tag, f"Connected to shard {peer_id}")
+            try:
+                await reader.read()  # The peer never writes on this link, so EOF means it is gone
+            except ConnectionError:
+                pass
+            self._forget_peer(peer_id)
+            log_error(self.tag, f"Lost shard {peer_id}, reconnecting")
+
+    def _forget_peer(self, peer_id):
+        """Stop relaying to (and waiting for snapshots from) a shard that went away."""
+        writer = self._peers.pop(peer_id, None)
+        if writer is not None:
+            writer.close()
+        self._peer_interest.remove(peer_id)
+        self._legacy_peers.discard(peer_id)
+        if self.on_interest_changed:
+            self.on_interest_changed()
+
+    # Outbound
+
+    def relay_publish(self, topic, frame):
+        targets = self._peer_interest.match(topic) | self._legacy_peers
+        if not targets:
+            return
+        payload = self._encode_topic_frame(topic, frame)
+        for peer_id in targets:
+            writer = self._peers.get(peer_id)
+            if writer is not None:
+                self._write(writer, PUBLISH, payload)
+                self.relayed += 1
+
+    def relay_broadcast(self, frame):
+        payload = self._encode_topic_frame("", frame)
+        for peer_id in self._legacy_peers:
+            writer = self._peers.get(peer_id)
+            if writer is not None:
+                self._write(writer, BROADCAST, payload)
+                self.relayed += 1
+
+    def advertise_interest(self, patterns, legacy):
+        """Tell the other shards which topics this shard's clients want; no-op if unchanged."""
+        interest = (sorted(patterns), bool(legacy))
+        if interest == self._local_interest:
+            return
+        self._local_interest = interest
+        payload = binary_codec.encode({"shard": self.shard_id, "patterns": interest[0], "legacy": interest[1]})
+        for writer in self._peers.values():
+            self._write(writer, INTEREST, payload)
+
+    def remote_patterns(self, include_legacy=True):
+        """Patterns subscribed on the other shards ('#' if one of them has legacy clients, unless excluded)."""
+        if include_legacy and self._legacy_peers:
+            return {MULTI_WILDCARD}
+        return self._peer_interest.all_patterns()
+
+    async def collect_snapshots(self, patterns, timeout=0.05):
+        """Ask every other shard for its retained messages matching the patterns."""
+        if not self._peers:
+            return []
+        request_id = next(self._snapshot_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_snapshots[request_id] = (future, [], len(self._peers))
+        payload = binary_codec.encode({"shard": self.shard_id, "id": request_id, "patterns": list(patterns)})
+        for writer in self._peers.values():
+            self._write(writer, SNAPSHOT_REQUEST, payload)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            log_error(self.tag, "Timed out waiting for retained snapshots from other shards")
+        _, messages, _ = self._pending_snapshots.pop(request_id)
+        return messages
+
+    def _write(self, writer, kind, payload):
+        if writer.transport.get_write_buffer_size() > MAX_PEER_BUFFER:
+            self.dropped += 1
+            return
+        writer.write(HEADER.pack(len(payload), kind) + payload)
+
+    @staticmethod
+    def _encode_topic_frame(topic, frame):
+        topic_bytes = topic.encode()
+        is_text = isinstance(frame, str)
+        body = frame.encode() if is_text else bytes(frame)
+        return TOPIC_HEADER.pack(len(topic_bytes), is_text) + topic_bytes + body
+
+    @staticmethod
+    def _decode_topic_frame(payload):
+        topic_length, is_text = TOPIC_HEADER.unpack_from(payload)
+        start = TOPIC_HEADER.size
+        topic = payload[start:start + topic_length].decode()
+        body = payload[start + topic_length:]
+        return topic, (body.decode() if is_text else body)
+
+    # Inbound
+
+    async def _handle_peer(self, reader, writer):
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                length, kind = HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                self._dispatch(kind, payload)
+        except asyncio.IncompleteReadError:
+            pass
+        except Exception as e:
+            log_error(self.tag, f"Shard bus connection failed: {e}")
+        finally:
+            writer.close()
+
+    def _dispatch(self, kind, payload):
+        if kind == PUBLISH:
+            self.on_publish(*self._decode_topic_frame(payload))
+        elif kind == BROADCAST:
+            self.on_broadcast(self._decode_topic_frame(payload)[1])
+        elif kind == INTEREST:
+            data = binary_codec.decode(payload)
+            peer_id = data["shard"]
+            self._peer_interest.remove(peer_id)
+            for pattern in data["patterns"]:
+                self._peer_interest.subscribe(peer_id, pattern)
+            if data["legacy"]:
+                self._legacy_peers.add(peer_id)
+            else:
+                self._legacy_peers.discard(peer_id)
+            if self.on_interest_changed:
+                self.on_interest_changed()
+        elif kind == SNAPSHOT_REQUEST:
+            data = binary_codec.decode(payload)
+            writer = self._peers.get(data["shard"])
+            if writer is not None:
+                reply = {"id": data["id"], "messages": self.snapshot_provider(data["patterns"])}
+                self._write(writer, SNAPSHOT_REPLY, binary_codec.encode(reply))
+        elif kind == SNAPSHOT_REPLY:
+            data = binary_codec.decode(payload)
+            pending = self._pending_snapshots.get(data["id"])
+            if pending is None:
+                return
+            future, messages, remaining = pending
+            messages.extend(data["messages"])
+            remaining -= 1
+            self._pending_snapshots[data["id"]] = (future, messages, remaining)
+            if remaining == 0 and not future.done():
+                future.set_result(None)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for writer in self._peers.values():
+            writer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        path = socket_path(self.port, self.shard_id, self.socket_dir)
+        if os.path.exists(path):
+            os.unlink(path)
@@ -0,0 +1,230 @@
+# src/messaging/shm_ring.py
+
+import asyncio
+import ipaddress
+import socket
+import struct
+from multiprocessing import shared_memory
+from urllib.parse import urlparse
+
+# Ring layout: a 64-byte header followed by `slot_count` fixed-size slots.
+# Each slot starts with the sequence number of the frame it holds (0 while being written).
+HEADER = struct.Struct("<4sIIxxxxQ")     # magic, slot count, slot size, write sequence
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct("<QI")       # sequence, frame length
+SEQ = struct.Struct("<Q")
+MAGIC = b"CDRB"
+WRITE_SEQ_OFFSET = 16
+
+_owned = set()   # Segments created by writers in this process
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if name in _owned:
+            return shm
+        try:
+            # Readers must not unlink the producer's segment when they exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+async def is_local_endpoint(url):
+    """True if the link URL points at this machine, so the shared-memory transport can be used."""
+    host = urlparse(url).hostname
+    if not host:
+        return False
+    loop = asyncio.get_running_loop()
+    try:
+        # Name lookups can block for seconds: never on the event loop
+        infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+    except OSError:
+        return False
+    address = infos[0][4][0]
+    if ipaddress.ip_address(address).is_loopback:
+        return True
+    return address in await loop.run_in_executor(None, local_addresses)
+
+
+def local_addresses():
+    addresses = set()
+    try:
+        addresses.update(socket.gethostbyname_ex(socket.gethostname())[2])
+    except OSError:
+        pass
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            addresses.add(s.getsockname()[0])
+    except OSError:
+        pass
+    return addresses
+
+
+class ShmRingWriter:
+    """
+    Single-producer ring buffer in shared memory. Every frame gets a sequence number;
+    readers detect overruns by comparing sequence numbers, so the producer never waits.
+    After each write a one-byte datagram rings the doorbell of every attached reader.
+    """
+
+    def __init__(self, name, slot_count=256, slot_size=64 * 1024):
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        size = HEADER_SIZE + slot_count * (SLOT_HEADER.size + slot_size)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a crashed producer: take it over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self.shm.name
+        _owned.add(self.name)
+        self.buffer = self.shm.buf
+        HEADER.pack_into(self.buffer, 0, MAGIC, slot_count, slot_size, 0)
+        self.sequence = 0
+        self.doorbells = set()   # { (host, port) } of attached readers
+        self._doorbell_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._doorbell_socket.setblocking(False)
+
+    def fits(self, size):
+        return size <= self.slot_size
+
+    def write(self, parts):
+        """Write one frame, given as a list of buffers, into the next slot. Returns its sequence number."""
+        size = sum(memoryview(part).nbytes for part in parts)
+        if not self.fits(size):
+            raise ValueError(f"Frame of {size} bytes does not fit a {self.slot_size}-byte slot")
+        sequence = self.sequence + 1
+        offset = HEADER_SIZE + (sequence % self.slot_count) * (SLOT_HEADER.size + self.slot_size)
+        SLOT_HEADER.pack_into(self.buffer, offset, 0, size)      # Mark the slot as being written
+        position = offset + SLOT_HEADER.size
+        for part in parts:
+            view = memoryview(part).cast("B")
+            self.buffer[position:position + view.nbytes] = view
+            position += view.nbytes
+        SEQ.pack_into(self.buffer, offset, sequence)
+        SEQ.pack_into(self.buffer, WRITE_SEQ_OFFSET, sequence)
+        self.sequence = sequence
+        self._ring()
+        return sequence
+
+    def _ring(self):
+        for doorbell in list(self.doorbells):
+            try:
+                self._doorbell_socket.sendto(b"\x01", doorbell)
+            except BlockingIOError:
+                pass   # The reader is already behind on wakeups; it drains everything anyway
+            except OSError:
+                self.doorbells.discard(doorbell)
+
+    def close(self):
+        self._doorbell_socket.close()
+        self.buffer = None
+        self.shm.close()
+        _owned.discard(self.name)
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _Doorbell(asyncio.DatagramProtocol):
+    def __init__(self, event):
+        self.event = event
+
+    def datagram_received(self, data, addr):
+        self.event.set()
+
+
+class ShmRingReader:
+    """One consumer of a ShmRingWriter. Tracks its own position and counts frames lost to overruns."""
+
+    def __init__(self, name, start_sequence=None):
+        self.shm = _attach(name)
+        self.buffer = self.shm.buf
+        magic, self.slot_count, self.slot_size, write_sequence = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Shared memory segment {name} is not a CatDog ring buffer")
+        self.next_sequence = (start_sequence if start_sequence is not None else write_sequence) + 1
+        self.overruns = 0
+        self.lost = 0
+        self.received = 0
+        self._wakeup = asyncio.Event()
+        self._transport = None
+
+    def seek(self, sequence):
+        """Continue reading after `sequence` (frames up to and including it were delivered elsewhere)."""
+        self.next_sequence = sequence + 1
+
+    async def open_doorbell(self):
+        """Bind a loopback UDP port for wakeups; the producer needs to be told the returned port."""
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(
+            lambda: _Doorbell(self._wakeup), local_addr=("127.0.0.1", 0))
+        return self._transport.get_extra_info("sockname")[1]
+
+    def read_available(self):
+        """Return every complete frame written since the last call (as bytes), oldest first."""
+        frames = []
+        write_sequence = SEQ.unpack_from(self.buffer, WRITE_SEQ_OFFSET)[0]
+        if write_sequence - self.next_sequence >= self.slot_count:
+            # The producer lapped us: skip to the oldest frame still in the ring
+            skipped_to = write_sequence - self.slot_count + 1
+            self._count_loss(skipped_to - self.next_sequence)
+            self.next_sequence = skipped_to
+        while self.next_sequence <= write_sequence:
+            offset = HEADER_SIZE + (self.next_sequence % self.slot_count) * (SLOT_HEADER.size + self.slot_size)
+            sequence, length = SLOT_HEADER.unpack_from(self.buffer, offset)
+            if sequence != self.next_sequence:
+                if sequence > self.next_sequence or sequence == 0:
+                    # Overwritten (or being overwritten) before we got to it
+                    self._count_loss(1)
+                    self.next_sequence += 1
+                    continue
+                break
+            start = offset + SLOT_HEADER.size
+            frame = bytes(self.buffer[start:start + length])
+            if SEQ.unpack_from(self.buffer, offset)[0] != self.next_sequence:
+                self._count_loss(1)   # Torn read: the slot was reused while we copied it
+            else:
+                frames.append(frame)
+                self.received += 1
+            self.next_sequence += 1
+        return frames
+
+    def _count_loss(self, count):
+        if count > 0:
+            self.overruns += 1
+            self.lost += count
+
+    async def frames(self):
+        """Async iterator over frames, woken by the producer's doorbell."""
+        while True:
+            frames = self.read_available()
+            if frames:
+                for frame in frames:
+                    yield frame
+                continue
+            self._wakeup.clear()
+            # Re-check after clearing so a doorbell that rang in between is not missed
+            if SEQ.unpack_from(self.buffer, WRITE_SEQ_OFFSET)[0] >= self.next_sequence:
+                continue
+            await self._wakeup.wait()
+
+    def stats(self):
+        return {"received": self.received, "lost": self.lost, "overruns": self.overruns}
+
+    def close(self):
+        if self._transport:
+            self._transport.close()
+        self.buffer = None
+        self.shm.close()
@@ -0,0 +1,118 @@
+# src/messaging/topics.py
+
+SEPARATOR = "/"
+SINGLE_WILDCARD = "*"   # matches exactly one topic level: heartbeat/*
+MULTI_WILDCARD = "#"    # matches zero or more trailing levels: sensors/#
+
+
+def is_wildcard(pattern):
+    return any(level in (SINGLE_WILDCARD, MULTI_WILDCARD) for level in pattern.split(SEPARATOR))
+
+
+def topic_matches(pattern, topic):
+    """Check a single topic against a single pattern, without building an index."""
+    pattern_levels = pattern.split(SEPARATOR)
+    topic_levels = topic.split(SEPARATOR)
+    for i, level in enumerate(pattern_levels):
+        if level == MULTI_WILDCARD:
+            return True
+        if i >= len(topic_levels):
+            return False
+        if level != SINGLE_WILDCARD and level != topic_levels[i]:
+            return False
+    return len(pattern_levels) == len(topic_levels)
+
+
+class _TrieNode:
+    __slots__ = ("children", "subscribers")
+
+    def __init__(self):
+        self.children = {}
+        self.subscribers = set()
+
+
+class TopicIndex:
+    """
+    Maps topic patterns to subscribers.
+    Exact patterns live in a dict, wildcard patterns in a trie keyed by topic level,
+    so a lookup costs O(levels) instead of O(subscribers).
+    """
+
+    def __init__(self):
+        self._exact = {}             # { topic: set(subscriber) }
+        self._root = _TrieNode()
+        self._patterns = {}          # { subscriber: set(pattern) }
+
+    def register(self, subscriber):
+        """Mark a subscriber as topic-aware, even if it has no patterns yet."""
+        self._patterns.setdefault(subscriber, set())
+
+    def subscribe(self, subscriber, pattern):
+        patterns = self._patterns.setdefault(subscriber, set())
+        if pattern in patterns:
+            return
+        patterns.add(pattern)
+        if is_wildcard(pattern):
+            node = self._root
+            for level in pattern.split(SEPARATOR):
+                node = node.children.setdefault(level, _TrieNode())
+            node.subscribers.add(subscriber)
+        else:
+            self._exact.setdefault(pattern, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber, pattern):
+        patterns = self._patterns.get(subscriber)
+        if not patterns or pattern not in patterns:
+            return
+        patterns.discard(pattern)
+        if is_wildcard(pattern):
+            self._remove_from_trie(self._root, pattern.split(SEPARATOR), subscriber)
+        else:
+            subscribers = self._exact.get(pattern)
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._exact[pattern]
+
+    def remove(self, subscriber):
+        """Drop every subscription held by a subscriber (e.g. on disconnect)."""
+        for pattern in list(self._patterns.get(subscriber, ())):
+            self.unsubscribe(subscriber, pattern)
+        self._patterns.pop(subscriber, None)
+
+    def patterns(self, subscriber):
+        return set(self._patterns.get(subscriber, ()))
+
+    def all_patterns(self):
+        return set().union(*self._patterns.values()) if self._patterns else set()
+
+    def has_subscriber(self, subscriber):
+        return subscriber in self._patterns
+
+    def match(self, topic):
+        """Return the set of subscribers whose patterns match the topic."""
+        matched = set(self._exact.get(topic, ()))
+        self._collect(self._root, topic.split(SEPARATOR), 0, matched)
+        return matched
+
+    def _collect(self, node, levels, depth, matched):
+        multi = node.children.get(MULTI_WILDCARD)
+        if multi is not None:
+            matched.update(multi.subscribers)
+        if depth == len(levels):
+            matched.update(node.subscribers)
+            return
+        for key in (levels[depth], SINGLE_WILDCARD):
+            child = node.children.get(key)
+            if child is not None:
+                self._collect(child, levels, depth + 1, matched)
+
+    def _remove_from_trie(self, node, levels, subscriber):
+        if not levels:
+            node.subscribers.discard(subscriber)
+            return
+        child = node.children.get(levels[0])
+        if child is None:
+            return
+        self._remove_from_trie(child, levels[1:], subscriber)
+        if not child.subscribers and not child.children:
+            del node.children[levels[0]]
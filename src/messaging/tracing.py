@@ -0,0 +1,135 @@
+# src/messaging/tracing.py
+#
+# Opt-in latency tracing. A sampled message carries
+#   "trace": {"id": "<hex>", "hops": [[hop, device, unix_ts], ...]}
+# and every component it passes through appends a hop. The consumer calls finish(),
+# which records the trace in this process's collector.
+# Unsampled messages cost one dict lookup per hop.
+#
+# Enable with CATDOG_TRACE_SAMPLE=<fraction> (inherited by every process the agent
+# launches) or configure(sample_rate=...).
+#
+# Hops stamped on other devices are put on this host's clock with the offsets the
+# agent measures (ClockSync) and publishes on the retained clock/<device> topic.
+
+import os
+import time
+import random
+import socket
+from collections import defaultdict, deque
+from log import log
+
+TRACE_KEY = "trace"
+SEPARATOR = " > "
+CLOCK_TOPIC = "clock"
+
+sample_rate = float(os.environ.get("CATDOG_TRACE_SAMPLE", "0") or 0)
+device = socket.gethostname()
+
+
+def configure(rate=None, device_name=None):
+    global sample_rate, device
+    if rate is not None:
+        sample_rate = rate
+    if device_name is not None:
+        device = device_name
+
+
+def clock_topic(device_name=None):
+    """The topic on which the agent of a device publishes its clock offsets to the other devices."""
+    return f"{CLOCK_TOPIC}/{device_name or device}"
+
+
+def use_clock_offsets(offsets):
+    """Correct remote hops in this process's collector: { device: seconds to add to its timestamps }."""
+    collector.clock_offset = dict(offsets).get
+
+
+def begin(payload, hop):
+    """Start a trace on a payload (if sampled), or add a hop if it already carries one."""
+    trace = payload.get(TRACE_KEY)
+    if trace is not None:
+        trace["hops"].append([hop, device, time.time()])
+    elif sample_rate and random.random() < sample_rate:
+        payload[TRACE_KEY] = {"id": "%016x" % random.getrandbits(64), "hops": [[hop, device, time.time()]]}
+    return payload
+
+
+def stamp(payload, hop):
+    """Add a hop to a traced payload; untraced payloads are left alone."""
+    trace = payload.get(TRACE_KEY) if isinstance(payload, dict) else None
+    if trace is not None:
+        trace["hops"].append([hop, device, time.time()])
+    return payload
+
+
+def finish(payload, hop):
+    """Add the final hop and record the trace in this process's collector."""
+    trace = payload.get(TRACE_KEY) if isinstance(payload, dict) else None
+    if trace is not None:
+        trace["hops"].append([hop, device, time.time()])
+        collector.record(trace)
+    return payload
+
+
+class TraceCollector:
+    """
+    Latency percentiles per path (the sequence of hop names a trace went through),
+    for the whole path and for every segment between consecutive hops. Keeps the
+    most recent `window` samples per series.
+    `clock_offset(device)` returns seconds to add to that device's timestamps to
+    bring them onto this host's clock.
+    """
+
+    def __init__(self, window=1024, clock_offset=None):
+        self.window = window
+        self.clock_offset = clock_offset
+        self.traces = 0
+        self._series = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, trace):
+        hops = trace["hops"]
+        if len(hops) < 2:
+            return
+        times = [ts + self._offset(hop_device) for _, hop_device, ts in hops]
+        path = SEPARATOR.join(name for name, _, _ in hops)
+        self._series[path].append(times[-1] - times[0])
+        for (name, _, _), (next_name, _, _), start, end in zip(hops, hops[1:], times, times[1:]):
+            self._series[f"{path} | {name}{SEPARATOR}{next_name}"].append(end - start)
+        self.traces += 1
+
+    def _offset(self, hop_device):
+        if self.clock_offset is None or hop_device == device:
+            return 0.0
+        return self.clock_offset(hop_device) or 0.0
+
+    def summary(self):
+        """{ series: {"count", "p50_ms", "p95_ms", "p99_ms"} }; a series is a path or 'path | hop > hop'."""
+        result = {}
+        for series, samples in self._series.items():
+            ordered = sorted(samples)
+            result[series] = {
+                "count": len(ordered),
+                "p50_ms": 1000 * percentile(ordered, 50),
+                "p95_ms": 1000 * percentile(ordered, 95),
+                "p99_ms": 1000 * percentile(ordered, 99),
+            }
+        return result
+
+    def report(self, tag="Tracing"):
+        for series, stats in sorted(self.summary().items()):
+            log(tag, f"{series}: n={stats['count']} p50={stats['p50_ms']:.2f}ms "
+                     f"p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms")
+
+    def reset(self):
+        self._series.clear()
+        self.traces = 0
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+collector = TraceCollector()
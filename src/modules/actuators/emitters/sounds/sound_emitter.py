@@ -2,23 +2,32 @@
 
 import asyncio
 import os
-import sounddevice as sd
-import soundfile as sf
 import datetime
 
 from modules.actuators.emitters.sounds.sound import Sound
 from messaging.sender import Sender
-from messaging.module_link_client import ModuleLinkClient
+from messaging.module_link_client import create_link_client
+from messaging import tracing
 from asset_manager import AssetManager
 from enums import HeartbeatStatus, ConnectionStatus
 from log import log, log_error
 
 
+def _sounddevice():
+    import sounddevice  # Lazy: importing it initialises PortAudio, which only playback needs
+    return sounddevice
+
+
 class SoundEmitter(Sound):
-    def __init__(self, global_channel_url, upstream_data_url):
+    LIVE_PARAMS = ("threshold",)  # Can change through a config reload without a restart
+    IO_WORKERS = 2    # Loading/playing audio must not wait behind each other's device calls
+    PLAY_TIMEOUT = 2  # seconds for the audio device to start playing
+
+    def __init__(self, global_channel_url, upstream_data_url, threshold=25):
         """
         :param global_channel_url: WebSocket URL for sending heartbeats (GCC)
-        :param upstream_data_url: WebSocket URL for connecting to sensor data (module link)
+        :param upstream_data_url: URL of the sensor data link (stream://<name>, ws:// or udp://, see create_link_client)
+        :param threshold: Distance (cm) below which the sound plays
         """
         super().__init__()
         self.global_channel_url = global_channel_url
@@ -32,7 +41,7 @@ class SoundEmitter(Sound):
         self.sample_rate = None
 
         # Threshold logic
-        self.threshold = 25          # Threshold signal strength (e.g., 25cm)
+        self.threshold = threshold   # Threshold signal strength (e.g., 25cm)
         self.signal_high = False     # Current threshold crossing state
 
     async def boot(self):
@@ -43,31 +52,44 @@ class SoundEmitter(Sound):
             raise RuntimeError(f"[SoundEmitter] Boot file not found: {self.sound_path}")
 
         try:
-            self.audio_data, self.sample_rate = sf.read(self.sound_path, dtype='float32')
+            import soundfile as sf  # Lazy, like sounddevice: only needed from boot on
+            self.audio_data, self.sample_rate = await self.run_blocking(sf.read, self.sound_path, dtype='float32',
+                                                                        label="load sound")
             log("SoundEmitter", "Sound file loaded successfully.")
         except Exception as e:
             raise RuntimeError(f"[SoundEmitter] Boot failed: {e}")
 
     async def start(self):
         self.running = True
+        asyncio.create_task(self.warm_up_audio())
 
         # Setup Sender for heartbeats
         self.sender = Sender(self.global_channel_url,"SoundEmitter")
         await self.sender.connect()
 
         # Setup direct data Receiver (ModuleLinkClient)
-        self.data_receiver = ModuleLinkClient(
+        self.data_receiver = create_link_client(
             url=self.upstream_data_url,
             on_message_callback=self.handle_message,
             parent_module=self
         )
-        await asyncio.sleep(2)  # let server get ready
+        # The agent starts us once the upstream sensor reports ready (depends_on), so no settling delay
         asyncio.create_task(self.data_receiver.run())
 
         self.set_status(HeartbeatStatus.OPERATIONAL)
         log("SoundEmitter", "Started successfully.")
+        asyncio.create_task(self.loop())  # Paced by a Ticker; also reports trace latencies
+
+    async def warm_up_audio(self):
+        # Load PortAudio in the background so the first sound does not pay for it
+        try:
+            await self.run_blocking(_sounddevice, label="load audio")
+        except Exception as e:
+            # Not fatal (a task that raises would mark us crashed in a module host): play_sound() reports it too
+            log_error("SoundEmitter", f"Audio unavailable: {e}")
 
     async def handle_message(self, msg):
+        tracing.finish(msg, "sound_emitter.handle")
         timestamp = datetime.datetime.now().isoformat(timespec='seconds')
         log("SoundEmitter", f"{timestamp} - Incoming message: {msg}")
 
@@ -106,7 +128,9 @@ class SoundEmitter(Sound):
         self.set_status(HeartbeatStatus.PROCESSING)
 
         try:
-            sd.play(self.audio_data, self.sample_rate, blocking=False)
+            # Opening the output device can block; playback itself runs in PortAudio's thread
+            await self.run_blocking(lambda: _sounddevice().play(self.audio_data, self.sample_rate, blocking=False),
+                                    timeout=self.PLAY_TIMEOUT, label="play")
             log("SoundEmitter", "Playing sound...")
             await asyncio.sleep(len(self.audio_data) / self.sample_rate)
         finally:
@@ -114,12 +138,18 @@ class SoundEmitter(Sound):
             self.set_status(HeartbeatStatus.OPERATIONAL)
 
     async def loop(self):
+        reported = 0
+        ticker = self.every(1.0)
         while self.running:
+            await ticker.wait()
             self.set_last_function("idle loop")
-            await asyncio.sleep(1)
+            if tracing.collector.traces - reported >= 100:
+                reported = tracing.collector.traces
+                tracing.collector.report("SoundEmitter")
 
     async def stop(self):
         self.running = False
+        self.io.shutdown()
         if self.sender:
             await self.sender.close()
         log("SoundEmitter", "Stopped.")
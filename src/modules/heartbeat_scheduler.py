@@ -0,0 +1,121 @@
+# src/modules/heartbeat_scheduler.py
+
+import asyncio
+import time
+from log import log_error
+
+VOLATILE = ("time_in_status_seconds", "ticks", "io")  # Heartbeat fields that change without anything happening
+
+
+class HeartbeatScheduler:
+    """
+    Sends the heartbeats of every module in the process from one task. Heartbeats that
+    fall due together go out in one burst per Sender, which its writer coalesces into
+    one batch frame; due times are rounded to a shared `tick` grid so that they do.
+
+    A module starts at the `fast` interval. Every heartbeat that is unchanged from the
+    previous one doubles its interval, up to `slow`. A status change (changed(), called
+    by Module.set_status) sends a heartbeat right away and drops back to `fast`.
+    Each heartbeat carries `interval`, the seconds until the next one, so the agent can
+    set its deadline from that instead of one fixed timeout.
+    """
+
+    def __init__(self, fast=1.0, slow=5.0, tick=None, clock=time.monotonic):
+        self.fast = fast
+        self.slow = slow
+        self.tick = tick or fast
+        self.clock = clock
+        self.modules = {}  # { module: {"due": time, "interval": seconds, "sent": signature of the last heartbeat} }
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+        # Counters
+        self.wakeups = 0
+        self.heartbeats = 0
+        self.frames = 0  # Bursts handed to a Sender (one batch frame each)
+
+    def add(self, module):
+        """Start sending heartbeats for `module` (it needs a `sender`), the first one now."""
+        module.heartbeats = self
+        self.modules[module] = {"due": self.clock(), "interval": self.fast, "sent": None}
+        self._wake()
+
+    def remove(self, module):
+        self.modules.pop(module, None)
+        if getattr(module, "heartbeats", None) is self:
+            module.heartbeats = None
+
+    def changed(self, module):
+        """Send `module`'s heartbeat now and return to the fast rate."""
+        entry = self.modules.get(module)
+        if entry is not None:
+            entry.update(due=self.clock(), interval=self.fast)
+            self._wake()
+
+    def _wake(self):
+        self._wakeup.set()
+        if self._task is None:
+            try:
+                self._task = asyncio.get_running_loop().create_task(self.run())
+            except RuntimeError:
+                pass  # No loop yet: the first add() or changed() inside one starts it
+
+    def _next_due(self, now, interval):
+        due = round((now + interval) / self.tick) * self.tick
+        return due if due > now else due + self.tick
+
+    async def beat(self, now=None):
+        """Send every heartbeat that is due; returns how many went out."""
+        now = self.clock() if now is None else now
+        bursts = {}  # { sender: [heartbeat, ...] }
+        for module, entry in list(self.modules.items()):
+            if entry["due"] > now:
+                continue
+            final = not getattr(module, "alive", True)
+            heartbeat = module.heartbeat(final=final)
+            signature = {key: value for key, value in heartbeat.content.items() if key not in VOLATILE}
+            if final:
+                self.remove(module)
+            else:
+                unchanged = signature == entry["sent"]
+                interval = min(entry["interval"] * 2, self.slow) if unchanged else self.fast
+                due = self._next_due(now, interval)
+                heartbeat.content["interval"] = round(due - now, 3)
+                entry.update(due=due, interval=interval, sent=signature)
+            bursts.setdefault(module.sender, []).append(heartbeat)
+
+        for sender, heartbeats in bursts.items():
+            for heartbeat in heartbeats:
+                try:
+                    await sender.send(heartbeat)
+                except Exception as e:
+                    log_error("Heartbeat", f"Error sending heartbeat for {heartbeat.content.get('module_name')}: {e}")
+            self.frames += 1
+            self.heartbeats += len(heartbeats)
+        return sum(len(heartbeats) for heartbeats in bursts.values())
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            await self.beat()
+            due = min((entry["due"] for entry in self.modules.values()), default=None)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if due is None else max(0.0, due - self.clock()))
+            except asyncio.TimeoutError:
+                pass
+            self.wakeups += 1
+
+    def stats(self):
+        return {"modules": len(self.modules), "wakeups": self.wakeups, "heartbeats": self.heartbeats,
+                "frames": self.frames}
+
+
+_scheduler = None
+
+
+def shared_scheduler():
+    """The process's HeartbeatScheduler, shared by all modules it runs."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = HeartbeatScheduler()
+    return _scheduler
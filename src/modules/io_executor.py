@@ -0,0 +1,125 @@
+# src/modules/io_executor.py
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class IOQueueFull(RuntimeError):
+    """More blocking calls are waiting than the executor accepts."""
+
+
+class IOExecutor:
+    """
+    A module's own threads for blocking calls (GPIO reads, audio and file I/O), so the event
+    loop, and with it heartbeats and message handling, never waits on hardware.
+
+    At most `workers + max_pending` calls are in flight; run() raises IOQueueFull beyond
+    that instead of piling up work behind a hung device. A call that times out or whose
+    caller is cancelled is dropped if it has not started yet; one that is already running
+    cannot be interrupted and keeps its slot until it returns. Worker threads are daemons,
+    so a stuck driver call never holds up process exit.
+    """
+
+    def __init__(self, name, workers=1, max_pending=4, window=256):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.window = window
+        self.pending = 0  # Calls queued or running
+        self.calls = {}  # { label: counters and recent timings }
+        self._jobs = queue.SimpleQueue()
+        self._threads = []
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"{self.name}-io-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            future, fn, args, kwargs, timing = job
+            if not future.set_running_or_notify_cancel():
+                continue  # Cancelled (or timed out) while queued
+            timing["started"] = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                timing["finished"] = time.perf_counter()
+                future.set_exception(e)
+            else:
+                timing["finished"] = time.perf_counter()
+                future.set_result(result)
+
+    def _stats(self, label):
+        return self.calls.setdefault(label, {"calls": 0, "errors": 0, "timeouts": 0, "cancelled": 0, "rejected": 0,
+                                             "durations": deque(maxlen=self.window), "waits": deque(maxlen=self.window)})
+
+    async def run(self, fn, *args, timeout=None, label=None, **kwargs):
+        """Run fn(*args, **kwargs) on a worker thread and return its result (or raise its exception)."""
+        label = label or getattr(fn, "__name__", "call")
+        stats = self._stats(label)
+        if self.pending >= self.workers + self.max_pending:
+            stats["rejected"] += 1
+            raise IOQueueFull(f"{self.name}: {self.pending} blocking calls in flight, not queuing {label}")
+        loop = asyncio.get_running_loop()
+        future = Future()
+        timing = {"queued": time.perf_counter()}
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._finished, label, timing, future)
+            except RuntimeError:
+                pass  # The loop is gone: nobody left to account to
+
+        self.pending += 1
+        future.add_done_callback(done)
+        self._start_workers()
+        self._jobs.put((future, fn, args, kwargs, timing))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            stats["timeouts"] += 1
+            raise
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            raise
+
+    def _finished(self, label, timing, future):
+        self.pending -= 1
+        stats = self._stats(label)
+        if "started" not in timing:
+            return  # Dropped before it ran
+        stats["calls"] += 1
+        stats["waits"].append(timing["started"] - timing["queued"])
+        stats["durations"].append(timing["finished"] - timing["started"])
+        if not future.cancelled() and future.exception() is not None:
+            stats["errors"] += 1
+
+    def stats(self):
+        """Per label: calls, errors, timeouts, cancelled and rejected counts, queue wait and duration in ms."""
+        def summary(stats):
+            durations = sorted(stats["durations"])
+            waits = stats["waits"]
+            return {
+                **{key: stats[key] for key in ("calls", "errors", "timeouts", "cancelled", "rejected")},
+                "wait_mean_ms": 1000 * sum(waits) / len(waits) if waits else None,
+                "duration_mean_ms": 1000 * sum(durations) / len(durations) if durations else None,
+                "duration_p99_ms": 1000 * durations[min(len(durations) - 1, int(0.99 * len(durations)))] if durations else None,
+                "duration_max_ms": 1000 * durations[-1] if durations else None,
+            }
+        return {"pending": self.pending, "workers": self.workers,
+                "calls": {label: summary(stats) for label, stats in self.calls.items()}}
+
+    def shutdown(self):
+        """Let the worker threads exit once their current call returns; queued calls still run first."""
+        for _ in self._threads:
+            self._jobs.put(None)
+        self._threads = []
@@ -4,13 +4,19 @@ from datetime import datetime, timezone
 
 from enums import HeartbeatStatus, ConnectionStatus
 from messaging.heartbeat import Heartbeat
+from modules.heartbeat_scheduler import shared_scheduler
+from modules.ticker import Ticker, SKIP
+from modules.io_executor import IOExecutor
 
 
 
 
 
 class Module(ABC):
-    
+    LIVE_PARAMS = ()  # Constructor params that update_params() can change without a restart
+    IO_WORKERS = 1    # Threads for this module's blocking calls (see run_blocking)
+    IO_QUEUE = 4      # Blocking calls that may wait for a thread before run_blocking() refuses more
+
     def __init__(self, name=None, interval=0.1, sender=None):
         self.name = name if name else self.__class__.__name__.lower()
         self.interval = interval
@@ -21,15 +27,58 @@ class Module(ABC):
         self.error_info = None
         self.connection_status = ConnectionStatus.LOST
         self.sender = sender
-        self._heartbeat_task = None
+        self.heartbeats = None  # HeartbeatScheduler sending our heartbeats, once added to one
+        self.tickers = {}  # { loop name: Ticker } pacing this module's fixed-rate loops
+        self._io = None
 
     def set_status(self, new_status: HeartbeatStatus):
+        changed = new_status != self.status
         self.status = new_status
         self.last_status_change = datetime.now(timezone.utc)
+        if changed and self.heartbeats is not None:
+            self.heartbeats.changed(self)  # Report the new status now, not at the next scheduled heartbeat
 
     def set_last_function(self, func_name: str):
         self.last_function = func_name
 
+    def every(self, period, policy=SKIP, name="loop"):
+        """A Ticker for a loop that should run every `period` seconds; its stats show up in tick_stats()."""
+        ticker = self.tickers[name] = Ticker(period, policy)
+        return ticker
+
+    def tick_stats(self):
+        return {name: ticker.stats() for name, ticker in self.tickers.items()}
+
+    @property
+    def io(self):
+        """This module's IOExecutor, started on first use."""
+        if self._io is None:
+            self._io = IOExecutor(self.name, workers=self.IO_WORKERS, max_pending=self.IO_QUEUE)
+        return self._io
+
+    async def run_blocking(self, fn, *args, timeout=None, label=None, **kwargs):
+        """
+        Await a blocking call (hardware, audio, file I/O) run on this module's own I/O threads.
+        Raises asyncio.TimeoutError after `timeout` seconds and IOQueueFull when too many are pending.
+        """
+        return await self.io.run(fn, *args, timeout=timeout, label=label, **kwargs)
+
+    def update_params(self, params):
+        """Apply changed constructor params while running. Raises ValueError if any of them needs a restart."""
+        fixed = set(params) - set(self.LIVE_PARAMS)
+        if fixed:
+            raise ValueError(f"restart needed to change {', '.join(sorted(fixed))}")
+        for key, value in params.items():
+            setattr(self, key, value)
+
+    def streams(self):
+        """
+        Optional override: the data streams this module serves, {stream name: endpoint URL}.
+        Advertised through the vibes once the module is ready, so consumers can connect
+        to stream://<name> instead of a fixed address.
+        """
+        return {}
+
     async def boot(self):
         """Optional override: diagnostic and setup phase."""
         pass
@@ -46,8 +95,9 @@ class Module(ABC):
             await asyncio.sleep(1)
 
     async def run(self):
-        """Entrypoint for all modules: boots, starts, loops, and runs heartbeat."""
-        self._heartbeat_task = asyncio.create_task(self.heartbeat_loop())
+        """Entrypoint for all modules: boots, starts, loops, and sends heartbeats (through the process's scheduler)."""
+        if self.sender is not None:
+            shared_scheduler().add(self)
         try:
             await self.boot()
             self.set_status(HeartbeatStatus.OPERATIONAL)
@@ -56,25 +106,19 @@ class Module(ABC):
         except Exception as e:
             print(f"[Module:{self.name}] Main thread crashed: {e}")
             self.error_info = str(e)
-            self.alive = False  # Heartbeat loop will detect and shut down
-
-    async def heartbeat_loop(self):
-        while True:
-            try:
-                if not self.alive:
-                    await self.send_heartbeat(final=True)
-                    break
-                await self.send_heartbeat()
-            except Exception as e:
-                print(f"[Heartbeat:{self.name}] Error sending heartbeat: {e}")
-                break
-            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+            self.alive = False  # The scheduler sends our dying heartbeat and drops us
+            self.set_status(HeartbeatStatus.ERROR)
+            if self.heartbeats is not None:
+                self.heartbeats.changed(self)  # Even if the status already was error
 
     async def send_heartbeat(self, final=False):
         if self.sender is None:
             print(f"[Heartbeat:{self.name}] No sender attached.")
             return
+        await self.sender.send(self.heartbeat(final))
 
+    def heartbeat(self, final=False):
+        """This module's Heartbeat message, with diagnostics unless it is simply operational."""
         heartbeat = Heartbeat(
             sender=self.name,
             module_name=self.name,
@@ -91,8 +135,11 @@ class Module(ABC):
                 "error": self.error_info,
                 "time_in_status_seconds": (datetime.now(timezone.utc) - self.last_status_change).total_seconds()
             })
-
-        await self.sender.send(heartbeat)
+            if self.tickers:
+                heartbeat.content["ticks"] = self.tick_stats()
+            if self._io is not None:
+                heartbeat.content["io"] = self._io.stats()
+        return heartbeat
 
     def selftest(self):
         print(f"[{self.name}] Selftest passed.")
@@ -1,11 +1,17 @@
-from modules.sensor.sound import SoundSensor
+from modules.sensors.sensor import Sensor
+from modules.io_executor import IOQueueFull
+from log import log_error
+import asyncio
 import numpy as np
-import threading
-import pyaudio
-import wave
-import time
 
-class Microphone(SoundSensor):
+class Microphone(Sensor):
+    """
+    Keeps the last `buffer_duration` seconds of audio in a ring buffer (read() returns a copy).
+    PyAudio's stream.read blocks for a whole chunk, so it runs on the module's I/O thread and
+    the loop awaits each chunk; a simulation file is replayed at the same pace on a Ticker.
+    """
+    IO_QUEUE = 1  # One chunk read in flight at a time
+
     def __init__(self, name="microphone_sensor", sample_rate=16000, buffer_duration=1.0, simulate=False, simulation_file=None, interval=0.1):
         super().__init__(name, interval)
         self.sample_rate = sample_rate
@@ -18,63 +24,76 @@ class Microphone(SoundSensor):
         self.audio_interface = None
         self.stream = None
         self.running = False
-        self.thread = None
+        self.task = None
         self.simulated_audio = None
         self.sim_pointer = 0
 
-    def start(self):
+    async def start(self):
         if self.simulate and self.simulation_file:
-            self._start_simulation()
+            self.simulated_audio = await self.run_blocking(self._load_simulation, label="load simulation")
+            self.sim_pointer = 0
+            self.running = True
+            self.task = asyncio.create_task(self._simulate_audio())
         else:
-            self._start_microphone()
+            await self.run_blocking(self._open_microphone, label="open")
+            self.running = True
+            self.task = asyncio.create_task(self._listen_microphone())
 
-    def _start_microphone(self):
+    def _open_microphone(self):
+        import pyaudio  # Lazy: only a real microphone needs PortAudio
         self.audio_interface = pyaudio.PyAudio()
         self.stream = self.audio_interface.open(format=pyaudio.paInt16,
                                                 channels=1,
                                                 rate=self.sample_rate,
                                                 input=True,
                                                 frames_per_buffer=self.chunk_size)
-        self.running = True
-        self.thread = threading.Thread(target=self._listen_microphone)
-        self.thread.start()
 
-    def _listen_microphone(self):
+    async def _listen_microphone(self):
+        chunk_seconds = self.chunk_size / self.sample_rate
         while self.running:
-            data = np.frombuffer(self.stream.read(self.chunk_size, exception_on_overflow=False), dtype=np.int16)
-            self.buffer = np.roll(self.buffer, -len(data))
-            self.buffer[-len(data):] = data
+            try:
+                raw = await self.run_blocking(self.stream.read, self.chunk_size, exception_on_overflow=False,
+                                              timeout=4 * chunk_seconds, label="read")
+            except (asyncio.TimeoutError, IOQueueFull) as e:
+                log_error("Microphone", f"Audio read stalled: {e or 'timed out'}")
+                await asyncio.sleep(chunk_seconds)
+                continue
+            self._append(np.frombuffer(raw, dtype=np.int16))
 
-    def _start_simulation(self):
-        wf = wave.open(self.simulation_file, 'rb')
-        raw_data = wf.readframes(wf.getnframes())
-        self.simulated_audio = np.frombuffer(raw_data, dtype=np.int16)
-        self.sim_pointer = 0
-        self.running = True
-        self.thread = threading.Thread(target=self._simulate_audio)
-        self.thread.start()
+    def _load_simulation(self):
+        import wave
+        with wave.open(self.simulation_file, 'rb') as wf:
+            raw_data = wf.readframes(wf.getnframes())
+        return np.frombuffer(raw_data, dtype=np.int16)
 
-    def _simulate_audio(self):
+    async def _simulate_audio(self):
+        ticker = self.every(self.chunk_size / self.sample_rate)
         while self.running:
+            await ticker.wait()
             end_pointer = self.sim_pointer + self.chunk_size
             if end_pointer > len(self.simulated_audio):
                 self.sim_pointer = 0  # loop the audio
                 end_pointer = self.chunk_size
             data = self.simulated_audio[self.sim_pointer:end_pointer]
             self.sim_pointer = end_pointer
-            self.buffer = np.roll(self.buffer, -len(data))
-            self.buffer[-len(data):] = data
-            time.sleep(self.chunk_size / self.sample_rate)
+            self._append(data)
+
+    def _append(self, data):
+        self.buffer = np.roll(self.buffer, -len(data))
+        self.buffer[-len(data):] = data
 
     def read(self):
         return np.copy(self.buffer)
 
-    def stop(self):
+    async def stop(self):
         self.running = False
-        if self.thread:
-            self.thread.join()
+        if self.task:
+            self.task.cancel()
         if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
-        if self.audio_interface:
-            self.audio_interface.terminate()
\ No newline at end of file
+            await self.run_blocking(self._close_microphone, timeout=1, label="close")
+        self.io.shutdown()
+
+    def _close_microphone(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.audio_interface.terminate()
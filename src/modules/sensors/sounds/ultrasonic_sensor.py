@@ -1,19 +1,30 @@
 from modules.sensors.sensor import Sensor
-from messaging.module_link_server import ModuleLinkServer
+from messaging.module_link_server import create_link_server
+from messaging import tracing
+from modules.io_executor import IOQueueFull
 from enums import HeartbeatStatus
-from gpiozero import DistanceSensor
-from log import log
+from log import log, log_error
 import asyncio
+import time
 import warnings
 
 class UltrasonicSensor(Sensor):
-    def __init__(self, trigger_pin=27, echo_pin=22, **kwargs):
+    def __init__(self, trigger_pin=27, echo_pin=22, data_publish_port=9100, data_publish_url=None, stream="ultrasonic",
+                 sample_period=0.5, **kwargs):
         super().__init__(name="ultrasonic_sensor")
         warnings.filterwarnings("ignore")  # Suppress gpiozero fallback warning
+        from gpiozero import DistanceSensor  # Lazy: only the sensor object needs it, not importing the class
         self.sensor = DistanceSensor(trigger=trigger_pin, echo=echo_pin, max_distance=3)
-        self._server = ModuleLinkServer(host="0.0.0.0", port=9100)
+        # ws://0.0.0.0:<port> by default (port 0: any free port); udp://... (unicast or multicast group) for the datagram link
+        url = data_publish_url or f"ws://0.0.0.0:{data_publish_port}"
+        self._server = create_link_server(url, conflate=["ultrasonic_data"])
+        self.stream = stream  # Consumers find the server as stream://<stream>
+        self.sample_period = sample_period  # seconds; held on a fixed grid whatever a reading costs
         self.running = False
 
+    def streams(self):
+        return {self.stream: self._server.endpoint} if self.stream else {}
+
     async def boot(self):
         self.set_last_function("boot")
         log("UltrasonicSensor", "Boot complete")
@@ -28,15 +39,25 @@ class UltrasonicSensor(Sensor):
 
     async def loop(self):
         self.set_last_function("loop")
+        ticker = self.every(self.sample_period)
         while self.running:
-            distance = self.sensor.distance * 100
+            await ticker.wait()
+            try:
+                # The GPIO read runs on our I/O thread; a slow echo costs this sample, not the event loop
+                distance = await self.run_blocking(lambda: self.sensor.distance, timeout=self.sample_period,
+                                                   label="distance") * 100
+            except (asyncio.TimeoutError, IOQueueFull) as e:
+                log_error("UltrasonicSensor", f"Skipping sample: {e or 'read timed out'}")
+                continue
             log("UltrasonicSensor", f"Distance: {distance:.1f} cm")
-            await self._server.broadcast({
+            await self._server.broadcast(tracing.begin({
                 "sensor_channel": "ultrasonic_data",
-                "value": distance
-            })
-            await asyncio.sleep(0.5)
+                "value": distance,
+                "timestamp": time.time()
+            }, "ultrasonic.read"))
 
     async def stop(self):
         self.running = False
+        log("UltrasonicSensor", f"Sampling: {self.tick_stats().get('loop')}, reads: {self.io.stats()['calls'].get('distance')}")
         await self._server.stop()
+        self.io.shutdown()
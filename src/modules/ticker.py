@@ -0,0 +1,89 @@
+# src/modules/ticker.py
+
+import asyncio
+import time
+from collections import deque
+
+SKIP = "skip"          # After an overrun, drop the missed ticks and rejoin the grid
+CATCH_UP = "catch-up"  # After an overrun, run every missed tick back to back
+
+
+class Ticker:
+    """
+    Paces a loop at a fixed rate on the monotonic clock. Tick n is due at start + n * period,
+    however long the loop body takes, so the rate does not drift with processing time.
+
+    A body that runs past the next due time is an overrun. SKIP drops the ticks that are
+    already over and runs the most recent one at once (for sampling: a late sample is
+    better than a burst of stale ones); CATCH_UP runs each missed tick without sleeping.
+    How late every tick starts (its jitter) is kept for the last `window` ticks.
+    `clock` and `sleep` can be replaced together, e.g. by a fake clock in tests.
+
+        ticker = Ticker(0.5)
+        while running:
+            await ticker.wait()
+            ...
+    """
+
+    def __init__(self, period, policy=SKIP, clock=time.monotonic, sleep=asyncio.sleep, window=1024):
+        if period <= 0:
+            raise ValueError("period must be positive")
+        if policy not in (SKIP, CATCH_UP):
+            raise ValueError(f"unknown overrun policy: {policy}")
+        self.period = period
+        self.policy = policy
+        self.clock = clock
+        self.sleep = sleep
+        self.due = None  # When the current tick was due
+        self.lateness = deque(maxlen=window)  # Seconds each tick started after it was due
+
+        # Counters
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+
+    async def wait(self):
+        """Sleep until the next tick is due; returns the time it was due (on the ticker's clock)."""
+        now = self.clock()
+        if self.due is None:
+            self.due = now
+        else:
+            self.due += self.period
+            if now > self.due:
+                self.overruns += 1
+                if self.policy == SKIP:
+                    missed = int((now - self.due) / self.period)
+                    self.skipped += missed
+                    self.due += missed * self.period
+            delay = self.due - now
+            if delay > 0:
+                await self.sleep(delay)
+        self.lateness.append(max(0.0, self.clock() - self.due))
+        self.ticks += 1
+        return self.due
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.wait()
+
+    def reset(self):
+        """Start a new grid at the next wait(), e.g. after the loop was paused."""
+        self.due = None
+
+    def stats(self):
+        """Tick and overrun counts, and the jitter of recent ticks in milliseconds."""
+        late = sorted(self.lateness)
+        percentile = lambda p: 1000 * late[min(len(late) - 1, int(p * len(late)))] if late else None
+        return {
+            "period_ms": 1000 * self.period,
+            "policy": self.policy,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter_mean_ms": 1000 * sum(late) / len(late) if late else None,
+            "jitter_p50_ms": percentile(0.50),
+            "jitter_p99_ms": percentile(0.99),
+            "jitter_max_ms": 1000 * late[-1] if late else None,
+        }
@@ -0,0 +1,179 @@
+# startup_profile.py
+#
+# Startup profiling for `launcher.py --profile-startup`: how long the process took from
+# fork/exec until a module was operational, split into per-import timings and the
+# module lifecycle phases (import, __init__, boot, start).
+#
+# Imports are timed by a meta path hook around every module's loader, so the numbers
+# match `python -X importtime`: cumulative (with nested imports) and self time.
+# Everything here is a no-op until start() is called.
+
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+_profile = None
+
+
+class _TimedLoader:
+    """Wraps a module's loader for the duration of its first import."""
+
+    def __init__(self, loader, timer, name):
+        self.loader = loader
+        self.timer = timer
+        self.name = name
+
+    def create_module(self, spec):
+        # Extension modules do their work here, so the clock starts now
+        self.timer.enter(self.name)
+        try:
+            return self.loader.create_module(spec)
+        except BaseException:
+            self.timer.leave(self.name)
+            raise
+
+    def exec_module(self, module):
+        # Put the real loader back before the module's code can look at it
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.leave(self.name)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportTimer:
+    """Meta path hook recording (module, cumulative seconds, self seconds) for every first import."""
+
+    def __init__(self):
+        self.records = []
+        self._stack = []  # [ [name, started, seconds spent in nested imports] ]
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self, name)
+                return spec
+        return None
+
+    def enter(self, name):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def leave(self, name):
+        if not self._stack or self._stack[-1][0] != name:
+            return
+        _, started, nested = self._stack.pop()
+        cumulative = time.perf_counter() - started
+        self.records.append((name, cumulative, cumulative - nested))
+        if self._stack:
+            self._stack[-1][2] += cumulative
+
+
+def process_age():
+    """Seconds since the OS started this process (fork or exec), or None where unknown (non-Linux)."""
+    try:
+        with open("/proc/self/stat") as stat:
+            fields = stat.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")  # Field 22: start time in ticks after boot
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.age_at_start = process_age()  # Interpreter start and whatever ran before start()
+        self.imports = ImportTimer()
+        self.phases = []  # (module, phase, seconds)
+        self.operational = {}  # { module: seconds since the process started }
+
+    def since_process_start(self):
+        return (self.age_at_start or 0.0) + time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, module, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((module, name, time.perf_counter() - began))
+
+    def report(self, top=15):
+        lines = []
+        if self.age_at_start is not None:
+            lines.append(f"process start -> profiler: {self.age_at_start * 1000:.0f} ms (interpreter and launcher imports)")
+        for module, name, seconds in self.phases:
+            lines.append(f"{module.rsplit('.', 1)[-1]} {name}: {seconds * 1000:.1f} ms")
+        for module, seconds in self.operational.items():
+            lines.append(f"{module.rsplit('.', 1)[-1]} operational {seconds * 1000:.0f} ms after process start")
+        slowest = sorted(self.imports.records, key=lambda record: record[2], reverse=True)[:top]
+        total = sum(record[2] for record in self.imports.records)
+        lines.append(f"{len(self.imports.records)} imports took {total * 1000:.0f} ms; slowest (self / cumulative):")
+        for name, cumulative, own in slowest:
+            lines.append(f"  {name}: {own * 1000:.1f} / {cumulative * 1000:.1f} ms")
+        return lines
+
+    def to_dict(self):
+        return {
+            "process_start_to_profiler_s": self.age_at_start,
+            "phases": [{"module": m, "phase": p, "seconds": s} for m, p, s in self.phases],
+            "operational_s": self.operational,
+            "imports": [{"module": n, "cumulative_s": c, "self_s": s} for n, c, s in self.imports.records],
+        }
+
+
+def start():
+    """Begin profiling this process (idempotent); returns the profile."""
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+        _profile.imports.install()
+    return _profile
+
+
+def active():
+    return _profile
+
+
+@contextmanager
+def phase(module, name):
+    if _profile is None:
+        yield
+    else:
+        with _profile.phase(module, name):
+            yield
+
+
+def operational(module):
+    if _profile is not None:
+        _profile.operational[module] = _profile.since_process_start()
+
+
+def finish(path=None):
+    """Stop timing imports and return the report lines; also writes JSON to `path` if given."""
+    if _profile is None:
+        return []
+    _profile.imports.uninstall()
+    if path:
+        with open(path, "w") as file:
+            json.dump(_profile.to_dict(), file, indent=2)
+    return _profile.report()
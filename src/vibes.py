@@ -1,53 +1,486 @@
 from log import log, log_error
+from liveness import TimingWheel
+from enums import HeartbeatStatus
 import asyncio
+import random
 import socket
+import struct
 import json
 import time
+from collections import deque
+from urllib.parse import urlparse
 
-class VibeSender:
-    def __init__(self, device_name, get_health_callback, port=30303, interval=5):
+# Binary vibe: a fixed header, the device name and a list of (module, status) entries.
+# A keyframe carries the full health table; a delta only the entries that changed since
+# the previous vibe of the same session (status REMOVED for modules that went away).
+# An optional stream section follows, (stream name, endpoint URL) pairs with the same
+# delta rules (an empty endpoint for a stream that went away); older decoders ignore it.
+# A listener that is out of sync sends the 4-byte KEYFRAME_REQUEST back to the sender's
+# address and gets a keyframe unicast, instead of waiting for the next scheduled one.
+VIBE_PORT = 30303
+MAGIC = b"VB"
+VERSION = 1
+KEYFRAME = 0
+DELTA = 1
+KEYFRAME_REQUEST = struct.pack("!2sBB", MAGIC, VERSION, 2)
+HEADER = struct.Struct("!2sBBIIdf")  # magic, version, kind, session, sequence, timestamp, uptime
+STRING_LENGTH = struct.Struct("!B")
+ENTRY_COUNT = struct.Struct("!H")
+STATUSES = [status.value for status in HeartbeatStatus] + ["unknown"]  # Sent as their index
+LITERAL = 0xFE  # Status not in STATUSES; the string follows
+REMOVED = 0xFF
+
+JOINED = "joined"        # First vibe from a device
+RESTARTED = "restarted"  # Vibe from a new session (the device's agent restarted)
+CHANGED = "changed"      # A module's status, an advertised stream or the device's address changed
+LEFT = "left"            # No vibe within the TTL
+
+
+class VibeError(ValueError):
+    pass
+
+
+def _pack_string(text):
+    data = text.encode("utf-8")[:255]
+    return STRING_LENGTH.pack(len(data)) + data
+
+
+def _unpack_string(data, offset):
+    (length,) = STRING_LENGTH.unpack_from(data, offset)
+    offset += STRING_LENGTH.size
+    if offset + length > len(data):
+        raise VibeError("truncated string")
+    return data[offset:offset + length].decode("utf-8"), offset + length
+
+
+def encode_vibe(kind, session, sequence, timestamp, uptime, device, entries, streams=None):
+    """
+    `entries` is {module: status} and `streams` {stream name: endpoint URL}, with None
+    for a removed module or stream.
+    """
+    parts = [HEADER.pack(MAGIC, VERSION, kind, session, sequence, timestamp, uptime),
+             _pack_string(device), ENTRY_COUNT.pack(len(entries))]
+    for module, status in entries.items():
+        parts.append(_pack_string(module))
+        if status is None:
+            parts.append(bytes([REMOVED]))
+        elif status in STATUSES:
+            parts.append(bytes([STATUSES.index(status)]))
+        else:
+            parts.append(bytes([LITERAL]) + _pack_string(status))
+    if streams:
+        parts.append(ENTRY_COUNT.pack(len(streams)))
+        for stream, endpoint in streams.items():
+            parts.append(_pack_string(stream) + _pack_string(endpoint or ""))
+    return b"".join(parts)
+
+
+def decode_vibe(data):
+    if len(data) < HEADER.size + STRING_LENGTH.size + ENTRY_COUNT.size:
+        raise VibeError("vibe too short")
+    magic, version, kind, session, sequence, timestamp, uptime = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or kind not in (KEYFRAME, DELTA):
+        raise VibeError("not a vibe")
+    try:
+        device, offset = _unpack_string(data, HEADER.size)
+        (count,) = ENTRY_COUNT.unpack_from(data, offset)
+        offset += ENTRY_COUNT.size
+        entries = {}
+        for _ in range(count):
+            module, offset = _unpack_string(data, offset)
+            code = data[offset]
+            offset += 1
+            if code == REMOVED:
+                entries[module] = None
+            elif code == LITERAL:
+                entries[module], offset = _unpack_string(data, offset)
+            else:
+                entries[module] = STATUSES[code]
+        streams = {}
+        if offset < len(data):
+            (count,) = ENTRY_COUNT.unpack_from(data, offset)
+            offset += ENTRY_COUNT.size
+            for _ in range(count):
+                stream, offset = _unpack_string(data, offset)
+                endpoint, offset = _unpack_string(data, offset)
+                streams[stream] = endpoint or None
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise VibeError(f"malformed vibe: {e}") from e
+    return {"kind": kind, "session": session, "sequence": sequence, "timestamp": timestamp,
+            "uptime": uptime, "device": device, "entries": entries, "streams": streams}
+
+
+def _delta(current, sent):
+    """What changed from `sent` to `current`, with None for keys that went away."""
+    changes = {key: value for key, value in current.items() if sent.get(key) != value}
+    changes.update((key, None) for key in sent if key not in current)
+    return changes
+
+
+def _apply_delta(table, changes):
+    for key, value in changes.items():
+        if value is None:
+            table.pop(key, None)
+        else:
+            table[key] = value
+
+
+def _endpoint_on(url, address):
+    """An advertised endpoint with a wildcard host (0.0.0.0) points at the device it came from."""
+    parsed = urlparse(url)
+    if parsed.hostname not in (None, "", "0.0.0.0", "::"):
+        return url
+    return parsed._replace(netloc=f"{address}:{parsed.port}" if parsed.port else address).geturl()
+
+
+class VibeSender(asyncio.DatagramProtocol):
+    """
+    Broadcasts this device's module health and the streams its modules serve every
+    `interval` seconds. Only what changed since the last vibe is sent, with a full keyframe
+    every `keyframe_every` vibes so listeners that missed a delta (or just started) catch up.
+    A change in the advertised streams is always sent as a keyframe, and a listener that
+    asks for one gets a keyframe right away, so consumers never wait for the schedule.
+    """
+
+    def __init__(self, device_name, get_health_callback, port=VIBE_PORT, interval=5, keyframe_every=6,
+                 start_time=None, host="<broadcast>", get_streams_callback=None):
         self.device_name = device_name
-        self.get_health_callback = get_health_callback
+        self.get_health_callback = get_health_callback  # () -> { module: status }
+        self.get_streams_callback = get_streams_callback  # () -> { stream name: endpoint URL }
         self.port = port
         self.interval = interval
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self.keyframe_every = keyframe_every
+        self.start_time = time.time() if start_time is None else start_time
+        self.host = host
+        self.session = random.getrandbits(32)
+        self.sequence = 0
+        self.sent = {}  # Health as of the last vibe
+        self.sent_streams = {}
+        self.transport = None
+
+    def next_vibe(self):
+        health = dict(self.get_health_callback())
+        streams = dict(self.get_streams_callback()) if self.get_streams_callback else {}
+        if self.sequence % self.keyframe_every == 0 or streams != self.sent_streams:
+            kind, entries, stream_entries = KEYFRAME, health, streams
+        else:
+            kind, entries, stream_entries = DELTA, _delta(health, self.sent), _delta(streams, self.sent_streams)
+        now = time.time()
+        vibe = encode_vibe(kind, self.session, self.sequence, now, now - self.start_time, self.device_name,
+                           entries, stream_entries)
+        self.sent, self.sent_streams = health, streams
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        return vibe
+
+    def keyframe(self):
+        """The state of the last vibe sent, as a keyframe with its sequence number, for one listener."""
+        now = time.time()
+        return encode_vibe(KEYFRAME, self.session, (self.sequence - 1) & 0xFFFFFFFF, now, now - self.start_time,
+                           self.device_name, self.sent, self.sent_streams)
+
+    def datagram_received(self, data, addr):
+        if data == KEYFRAME_REQUEST and self.sequence:
+            self.transport.sendto(self.keyframe(), addr)
 
     async def start(self):
-        while True:
-            vibe = {
-                "device_name": self.device_name,
-                "timestamp": time.time(),
-                "health": self.get_health_callback(),
-                "uptime": time.time() - self.get_health_callback().get('start_time', time.time())
-            }
-            message = json.dumps(vibe).encode('utf-8')
-            self.sock.sendto(message, ('<broadcast>', self.port))
-            await asyncio.sleep(self.interval)
-
-
-class VibeListener:
-    def __init__(self, port=30303):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: self, local_addr=("0.0.0.0", 0), allow_broadcast=True)
+        try:
+            while True:
+                self.transport.sendto(self.next_vibe(), (self.host, self.port))
+                await asyncio.sleep(self.interval)
+        finally:
+            self.transport.close()
+
+
+class VibeListener(asyncio.DatagramProtocol):
+    """
+    The cluster state table: per device its address, module health, advertised streams,
+    uptime and when it was last heard from. Devices silent for `ttl` seconds are dropped.
+    Every change is passed to `on_change(event, device, entry)` and wakes any wait_for()
+    callers; packets are handled as they arrive on the event loop, without ever blocking it.
+
+    `streams` caches where each advertised stream is served ({stream name: URL}, the most
+    recently heard device winning), rebuilt whenever an endpoint changes or a device expires.
+    A device whose deltas cannot be applied (we just started, or missed one) is asked for a
+    keyframe, at most once per `resync_interval` seconds.
+    """
+
+    def __init__(self, port=VIBE_PORT, ttl=15.0, on_change=None, clock=time.time, verbose=True, resync_interval=1.0):
+        self.port = port
+        self.ttl = ttl
+        self.resync_interval = resync_interval
+        self.on_change = on_change
+        self.clock = clock
+        self.verbose = verbose
+        self.precision = min(1.0, ttl / 4)
+        self.wheel = TimingWheel(tick=self.precision, slots=max(64, int(ttl / self.precision) * 2), now=clock())
+        self.devices = {}  # { device_name: {"address", "health", "streams", "uptime", "timestamp", "last_seen", "session", "sequence", "synced"} }
+        self.streams = {}  # { stream name: URL }
+        self.transport = None
+        self.errors = 0
+        self._waiters = []  # [ (device, predicate, future) ]
+        self._stream_waiters = []  # [ (stream, URL it should differ from, future) ]
+
+    @property
+    def addresses(self):
+        return {device: entry["address"] for device, entry in self.devices.items()}
+
+    def _socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', self.port))
+        return sock
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, sock=self._socket())
+        if self.verbose:
+            log("VibeListener", f"Listening for vibes on UDP {self.transport.get_extra_info('sockname')[1]}")
+        try:
+            while True:
+                await asyncio.sleep(self.precision)
+                self.expire()
+        finally:
+            self.transport.close()
+
+    def datagram_received(self, data, addr):
+        try:
+            vibe = decode_vibe(data)
+        except VibeError as e:
+            self.errors += 1
+            log_error("VibeListener", f"Ignoring vibe from {addr[0]}: {e}")
+            return
+        self.apply(vibe, addr[0])
+        self._resync(vibe["device"], addr)
+
+    def _resync(self, device, addr):
+        """Ask a device whose deltas we cannot apply for a keyframe, at most once per resync_interval."""
+        entry = self.devices.get(device)
+        if self.transport is None or entry is None or entry["synced"]:
+            return
+        if self.clock() - entry.get("resync", 0) >= self.resync_interval:
+            entry["resync"] = self.clock()
+            self.transport.sendto(KEYFRAME_REQUEST, addr)
+
+    def apply(self, vibe, address):
+        device = vibe["device"]
+        entry = self.devices.get(device)
+        event = None
+        if entry is None:
+            event = JOINED
+            entry = self.devices[device] = {"health": {}, "streams": {}, "synced": False}
+        elif entry["session"] != vibe["session"]:
+            event = RESTARTED
+            entry.update(health={}, streams={}, synced=False)
+        elif vibe["sequence"] != (entry["sequence"] + 1) & 0xFFFFFFFF:
+            entry["synced"] = False  # Lost or reordered vibes: hold the health we have until a keyframe
+        moved = entry.get("address") not in (None, address)  # e.g. a new DHCP lease: its streams moved too
+        entry.update(address=address, uptime=vibe["uptime"], timestamp=vibe["timestamp"], last_seen=self.clock(),
+                     session=vibe["session"], sequence=vibe["sequence"])
+        self.wheel.schedule(device, entry["last_seen"] + self.ttl)
+
+        if vibe["kind"] == KEYFRAME:
+            changed = entry["health"] != vibe["entries"] or entry["streams"] != vibe["streams"]
+            entry.update(health=dict(vibe["entries"]), streams=dict(vibe["streams"]), synced=True)
+        elif entry["synced"]:
+            changed = bool(vibe["entries"] or vibe["streams"])
+            _apply_delta(entry["health"], vibe["entries"])
+            _apply_delta(entry["streams"], vibe["streams"])
+        else:
+            changed = False
+        if event is None and (changed or moved):
+            event = CHANGED
+        if event is not None:
+            self._emit(event, device, entry)
+
+    def expire(self):
+        """Drop devices not heard from within the TTL; returns them."""
+        expired = self.wheel.advance(self.clock())
+        for device in expired:
+            entry = self.devices.pop(device)
+            self._emit(LEFT, device, entry)
+        return expired
+
+    def _emit(self, event, device, entry):
+        if self.verbose and event == CHANGED:
+            log("VibeListener", f"{device}: {entry['health']}")
+        elif self.verbose:
+            log("VibeListener", f"{device} {event} ({entry['address']}, uptime {entry['uptime']:.1f}s)")
+        self._update_streams()
+        if self.on_change:
+            self.on_change(event, device, entry)
+        for waiter in list(self._waiters):
+            name, predicate, future = waiter
+            if future.done():
+                self._waiters.remove(waiter)
+            elif name == device and event != LEFT and predicate(entry):
+                self._waiters.remove(waiter)
+                future.set_result(dict(entry))
+
+    def _update_streams(self):
+        streams = {}
+        for entry in sorted(self.devices.values(), key=lambda entry: entry["last_seen"]):
+            streams.update((stream, _endpoint_on(url, entry["address"])) for stream, url in entry["streams"].items())
+        if streams == self.streams:
+            return
+        for stream in set(self.streams) | set(streams):
+            if self.streams.get(stream) != streams.get(stream):
+                log("VibeListener", f"Stream {stream}: {streams.get(stream) or 'gone'}")
+        self.streams = streams
+        for waiter in list(self._stream_waiters):
+            stream, previous, future = waiter
+            if future.done():
+                self._stream_waiters.remove(waiter)
+            elif streams.get(stream) not in (None, previous):
+                self._stream_waiters.remove(waiter)
+                future.set_result(streams[stream])
+
+    def resolve(self, stream):
+        """The URL `stream` is served on, or None if no device advertises it (any more)."""
+        return self.streams.get(stream)
+
+    async def wait_for_stream(self, stream, changed_from=None, timeout=None):
+        """Wait until `stream` is advertised at a URL other than `changed_from`; returns the URL."""
+        url = self.streams.get(stream)
+        if url is not None and url != changed_from:
+            return url
+        future = asyncio.get_running_loop().create_future()
+        self._stream_waiters.append((stream, changed_from, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if not future.done():
+                future.cancel()
+
+    def get(self, device):
+        entry = self.devices.get(device)
+        return None if entry is None else dict(entry, age=self.clock() - entry["last_seen"])
+
+    def snapshot(self):
+        """A copy of the state table, with each device's age (seconds since its last vibe)."""
+        return {device: self.get(device) for device in self.devices}
+
+    async def wait_for(self, device, predicate=lambda entry: True, timeout=None):
+        """Wait until `device` is present and `predicate(entry)` holds; returns its entry."""
+        entry = self.devices.get(device)
+        if entry is not None and predicate(entry):
+            return dict(entry)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((device, predicate, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if not future.done():
+                future.cancel()
+
+
+_shared = None
+
+
+def shared_listener():
+    """This process's VibeListener for resolving streams, started on first use (needs a running loop)."""
+    global _shared
+    if _shared is None:
+        _shared = VibeListener(verbose=False)
+        _shared.task = asyncio.create_task(_shared.start())
+    return _shared
+
+
+def _is_timestamp(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class ClockSync(asyncio.DatagramProtocol):
+    """
+    NTP-style clock offset estimation between agents, on its own UDP port.
+    Every `interval` seconds each peer gets a request stamped t1; it answers with its
+    receive (t2) and send (t3) times, and the reply arrives at t4:
+        offset = ((t2 - t1) + (t3 - t4)) / 2     (peer clock minus ours)
+        delay  = (t4 - t1) - (t3 - t2)
+    Of the last `window` samples per peer, the one with the lowest delay is used,
+    because queuing delay is what makes a sample asymmetric and wrong.
+    """
+
+    def __init__(self, device_name, peers_callback, port=30304, interval=5, window=8, max_age=300):
+        self.device_name = device_name
+        self.peers_callback = peers_callback  # () -> { device_name: ip }
         self.port = port
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock.bind(('', self.port))
-        self.vibe_map = {}  # { device_name: last_vibe_dict }
+        self.interval = interval
+        self.window = window
+        self.max_age = max_age
+        self.transport = None
+        self.samples = {}  # { device_name: deque([(offset, delay, t4), ...]) }
+        self._request_id = 0
 
     async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=("0.0.0.0", self.port))
+        log("Vibes", f"Clock sync listening on UDP {self.port}")
         while True:
-            data, addr = self.sock.recvfrom(4096)
-            try:
-                vibe = json.loads(data.decode('utf-8'))
-                device_name = vibe.get("device_name", "unknown")
-                self.vibe_map[device_name] = vibe
-                self.print_vibe_map()
-            except Exception as e:
-                log_error("VibeListener", f"Failed to decode vibe: {e}")
-
-    def print_vibe_map(self):
-        log("VibeListener", "Current Vibe Map:")
-        for device, vibe in self.vibe_map.items():
-            status = vibe['health']
-            uptime = vibe['uptime']
-            log("VibeListener", f"{device}: {status} (uptime: {uptime:.1f}s)")
+            for device, ip in list(self.peers_callback().items()):
+                if device != self.device_name:
+                    self.request(ip)
+            # Poll quickly until every peer has a full filter window, then settle to the interval
+            warming = any(len(samples) < self.window for samples in self.samples.values()) or not self.samples
+            await asyncio.sleep(1 if warming else self.interval)
+
+    def request(self, ip):
+        self._request_id += 1
+        message = {"type": "clock_req", "device": self.device_name, "id": self._request_id, "t1": time.time()}
+        self.transport.sendto(json.dumps(message).encode('utf-8'), (ip, self.port))
+
+    def datagram_received(self, data, addr):
+        t_received = time.time()
+        try:
+            message = json.loads(data.decode('utf-8'))
+        except ValueError:
+            return
+        if not isinstance(message, dict):
+            return  # Not ours: anything can arrive on a UDP port
+        if message.get("type") == "clock_req":
+            if "id" not in message or not _is_timestamp(message.get("t1")):
+                return
+            reply = {"type": "clock_resp", "device": self.device_name, "id": message["id"],
+                     "t1": message["t1"], "t2": t_received, "t3": time.time()}
+            self.transport.sendto(json.dumps(reply).encode('utf-8'), addr)
+        elif message.get("type") == "clock_resp":
+            timestamps = [message.get(key) for key in ("t1", "t2", "t3")]
+            if not isinstance(message.get("device"), str) or not all(map(_is_timestamp, timestamps)):
+                return
+            self.add_sample(message["device"], message["t1"], message["t2"], message["t3"], t_received)
+
+    def add_sample(self, peer, t1, t2, t3, t4):
+        offset = ((t2 - t1) + (t3 - t4)) / 2
+        delay = (t4 - t1) - (t3 - t2)
+        samples = self.samples.setdefault(peer, deque(maxlen=self.window))
+        samples.append((offset, delay, t4))
+
+    def _best(self, peer):
+        samples = self.samples.get(peer)
+        if not samples:
+            return None
+        now = time.time()
+        fresh = [sample for sample in samples if now - sample[2] <= self.max_age] or list(samples)
+        return min(fresh, key=lambda sample: sample[1])
+
+    def offset(self, peer):
+        """Seconds the peer's clock is ahead of ours (0.0 for ourselves or an unknown peer)."""
+        best = self._best(peer)
+        return best[0] if best else 0.0
+
+    def delay(self, peer):
+        best = self._best(peer)
+        return best[1] if best else None
+
+    def to_local(self, peer, timestamp):
+        """Convert a timestamp taken on `peer` into this machine's timebase."""
+        if peer == self.device_name:
+            return timestamp
+        return timestamp - self.offset(peer)
+
+    def snapshot(self):
+        return {peer: {"offset_ms": 1000 * self.offset(peer), "delay_ms": 1000 * self.delay(peer),
+                       "samples": len(samples)}
+                for peer, samples in self.samples.items() if samples}
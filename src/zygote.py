@@ -0,0 +1,371 @@
+# zygote.py
+#
+# Pre-warmed fork server for module launchers.
+#
+# A zygote is a long-lived process that has already imported the heavy dependencies
+# every module needs. Instead of starting a fresh interpreter per module, the agent asks
+# the zygote to fork a child, which runs launcher.py's main() with the given arguments.
+# Interpreter start-up and imports are paid once per device instead of once per spawn.
+#
+# Protocol (Unix socket, one connection per child):
+#   client -> zygote:  one JSON line {"args": [...], "cwd": ..., "env": {...}}
+#                      plus the child's stdin/stdout/stderr passed as SCM_RIGHTS fds
+#   zygote -> client:  {"pid": <pid>}\n  once forked
+#                      {"exit": <returncode>}\n  once the child is reaped
+#
+# Only available where os.fork and fd passing exist (Linux, macOS); callers fall back
+# to subprocess.Popen elsewhere (see zygote.SUPPORTED).
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import importlib
+import selectors
+import subprocess
+import tempfile
+import traceback
+
+SUPPORTED = hasattr(os, "fork") and hasattr(socket, "AF_UNIX") and hasattr(socket, "send_fds")
+
+# Imported once in the zygote; a missing optional dependency is skipped.
+# sounddevice is deliberately absent: importing it initialises PortAudio, and a
+# PortAudio host does not survive being forked into children.
+PRELOAD = [
+    "numpy",
+    "websockets",
+    "yaml",
+    "soundfile",
+    "gpiozero",
+    "log",
+    "enums",
+    "launcher",
+    "modules.module",
+    "messaging.sender",
+    "messaging.module_link_server",
+    "messaging.module_link_client",
+]
+
+START_TIMEOUT = 30  # seconds; preloading numpy on a Raspberry Pi takes a while
+
+
+class ZygoteError(OSError):
+    pass
+
+
+# --- Zygote process -------------------------------------------------------------
+
+def preload(names):
+    loaded = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            pass
+    return loaded
+
+
+def _read_request(connection):
+    data, fds, _, _ = socket.recv_fds(connection, 65536, 3)
+    while data and not data.endswith(b"\n"):
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data), fds
+
+
+def _run_child(request, fds):
+    """Runs in the forked child: become the launcher and never return."""
+    code = 1
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        if request.get("env") is not None:
+            os.environ.clear()
+            os.environ.update(request["env"])
+            for entry in reversed(os.environ.get("PYTHONPATH", "").split(os.pathsep)):
+                if entry and entry not in sys.path:
+                    sys.path.insert(0, entry)
+            importlib.invalidate_caches()
+
+        import asyncio
+        import launcher
+        sys.argv = [launcher.__file__] + list(request["args"])
+        asyncio.run(launcher.main())
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(path, modules=PRELOAD):
+    loaded = preload(modules)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(16)
+
+    # SIGCHLD wakes the selector through the signal wakeup fd
+    wake_read, wake_write = os.pipe()
+    os.set_blocking(wake_read, False)
+    os.set_blocking(wake_write, False)
+    signal.set_wakeup_fd(wake_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    selector.register(wake_read, selectors.EVENT_READ)
+    children = {}  # { pid: connection to the client that asked for it }
+    print(f"[Zygote] Ready on {path} ({len(loaded)} modules preloaded)", flush=True)
+
+    def reap():
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            connection = children.pop(pid, None)
+            if connection is not None:
+                try:
+                    connection.sendall(json.dumps({"exit": os.waitstatus_to_exitcode(status)}).encode() + b"\n")
+                except OSError:
+                    pass
+                connection.close()
+
+    def spawn(connection):
+        try:
+            request, fds = _read_request(connection)
+        except (OSError, ValueError) as e:
+            print(f"[Zygote] Bad spawn request: {e}", flush=True)
+            connection.close()
+            return
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            selector.close()
+            listener.close()
+            os.close(wake_read)
+            os.close(wake_write)
+            for other in children.values():
+                other.close()
+            connection.close()
+            _run_child(request, fds)
+        for fd in fds:
+            os.close(fd)
+        children[pid] = connection
+        connection.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+
+    try:
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is listener:
+                    connection, _ = listener.accept()
+                    spawn(connection)
+                else:
+                    try:
+                        while os.read(wake_read, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    reap()
+    finally:
+        listener.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+# --- Client side ------------------------------------------------------------------
+
+class ZygoteProcess:
+    """The part of subprocess.Popen the agent uses, for a child forked by a zygote."""
+
+    def __init__(self, pid, connection, stdout=None):
+        self.pid = pid
+        self.returncode = None
+        self.stdout = stdout
+        self._connection = connection
+        self._buffer = b""
+
+    def poll(self):
+        if self.returncode is None:
+            self._read(timeout=0)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.returncode is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise subprocess.TimeoutExpired(f"zygote child {self.pid}", timeout)
+            self._read(timeout=remaining)
+        return self.returncode
+
+    def send_signal(self, signum):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def _read(self, timeout):
+        if self._connection is None:
+            # The zygote is gone, so nobody can tell us the exit status; watch the pid instead
+            if not self._alive():
+                self.returncode = -1
+            elif timeout != 0:
+                time.sleep(0.1 if timeout is None else min(timeout, 0.1))
+            return
+        self._connection.settimeout(timeout)
+        try:
+            chunk = self._connection.recv(4096)
+        except (BlockingIOError, socket.timeout):
+            return
+        except OSError:
+            chunk = b""
+        if not chunk:
+            self._connection.close()
+            self._connection = None
+            if not self._alive():
+                self.returncode = -1
+            return
+        self._buffer += chunk
+        while b"\n" in self._buffer:
+            line, self._buffer = self._buffer.split(b"\n", 1)
+            message = json.loads(line)
+            if "exit" in message:
+                self.returncode = message["exit"]
+                self._connection.close()
+                self._connection = None
+                return
+
+    def _alive(self):
+        try:
+            os.kill(self.pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+
+class Zygote:
+    """Starts and talks to a zygote process. spawn() mirrors subprocess.Popen for launcher.py."""
+
+    def __init__(self, path=None, python=sys.executable, preload=None, cwd=None, env=None):
+        self.path = path or os.path.join(tempfile.gettempdir(), f"catdog-zygote-{os.getpid()}.sock")
+        self.python = python
+        self.preload = preload
+        self.cwd = cwd
+        self.env = env
+        self.process = None
+
+    def start(self):
+        command = [self.python, os.path.abspath(__file__), "--socket", self.path]
+        if self.preload is not None:
+            command += ["--preload", ",".join(self.preload)]
+        self.process = subprocess.Popen(command, cwd=self.cwd, env=self.env)
+        return self
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def spawn(self, args, cwd=None, env=None, stdout=None, stderr=None, text=False):
+        """
+        Fork a launcher running `launcher.py <args>`. stdout/stderr may be None (inherit
+        ours), subprocess.PIPE, or (stderr only) subprocess.STDOUT. Raises ZygoteError
+        when the zygote cannot be reached.
+        """
+        connection = self._connect()
+        pipe = None
+        try:
+            if stdout == subprocess.PIPE:
+                read_end, write_end = os.pipe()
+                pipe = os.fdopen(read_end, "r" if text else "rb")
+                out_fd = write_end
+            else:
+                out_fd = os.dup(1)
+            err_fd = os.dup(out_fd) if stderr == subprocess.STDOUT else os.dup(2)
+            in_fd = os.dup(0)
+            request = {"args": list(args), "cwd": cwd, "env": dict(env) if env is not None else None}
+            try:
+                socket.send_fds(connection, [json.dumps(request).encode() + b"\n"], [in_fd, out_fd, err_fd])
+            finally:
+                for fd in (in_fd, out_fd, err_fd):
+                    os.close(fd)
+            reply = b""
+            connection.settimeout(START_TIMEOUT)
+            while not reply.endswith(b"\n"):
+                chunk = connection.recv(4096)
+                if not chunk:
+                    raise ZygoteError("zygote closed the connection before forking")
+                reply += chunk
+            pid = json.loads(reply)["pid"]
+        except Exception:
+            connection.close()
+            if pipe is not None:
+                pipe.close()
+            raise
+        return ZygoteProcess(pid, connection, stdout=pipe)
+
+    def _connect(self):
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                connection.connect(self.path)
+                return connection
+            except OSError as e:
+                connection.close()
+                if not self.running:
+                    raise ZygoteError(f"zygote is not running ({e})")
+                if time.monotonic() > deadline:
+                    raise ZygoteError(f"zygote did not come up within {START_TIMEOUT}s")
+                time.sleep(0.01)
+
+    def stop(self):
+        if self.running:
+            self.process.terminate()
+            self.process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", required=True, help="Unix socket path to listen on.")
+    parser.add_argument("--preload", help="Comma-separated modules to import before forking.")
+    args = parser.parse_args()
+    serve(args.socket, args.preload.split(",") if args.preload else PRELOAD)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import os
+import sys
+import websockets
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+RUN_SHARD = "import sys, gcc; gcc.run_shard(int(sys.argv[1]), gcc.parse_args(sys.argv[2:]))"
+
+
+class GCCProcess:
+    """
+    A GCC, or one shard of a sharded GCC, in its own process: the GCC keeps its state in
+    module globals, so tests that need several of them (shards, a bridged device GCC) run
+    each one apart. Shards of one GCC share a port; give each its own loopback `host`
+    (127.0.0.1, 127.0.0.2, ...) so a test decides which shard its clients connect to.
+    """
+
+    def __init__(self, port, *args, host="127.0.0.1", shard_id=0):
+        self.port = port
+        self.host = host
+        self.args = ["--host", host, "--port", str(port), *args]
+        self.shard_id = shard_id
+        self.process = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}"
+
+    async def start(self, timeout=5.0):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", RUN_SHARD, str(self.shard_id), *self.args,
+            cwd=SRC, env=dict(os.environ, PYTHONPATH=SRC, PYTHONUNBUFFERED="1"))
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            try:
+                async with websockets.connect(self.url, open_timeout=1):
+                    return self
+            except OSError:
+                if asyncio.get_running_loop().time() > deadline:
+                    await self.stop()
+                    raise
+                await asyncio.sleep(0.05)
+
+    async def stop(self):
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+
+async def connect(url, *topics):
+    """A raw client; subscribed to `topics` if any are given (otherwise a legacy client)."""
+    websocket = await websockets.connect(url)
+    if topics:
+        await websocket.send(json.dumps({"type": "subscribe", "topics": list(topics)}))
+    return websocket
+
+
+async def receive(websocket, timeout=1.0):
+    """The messages in the frames that arrive within `timeout` (batch frames are unpacked)."""
+    messages = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            frame = await asyncio.wait_for(websocket.recv(), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            return messages
+        data = json.loads(frame)
+        messages.extend(data["messages"] if data.get("type") == "batch" else [data])
+
+
+def publish(websocket, topic, content, sender="test", timestamp=None):
+    message = {"sender": sender, "topic": topic, "type": "data", "content": content}
+    if timestamp is not None:
+        message["timestamp"] = timestamp
+    return websocket.send(json.dumps(message))
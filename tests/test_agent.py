@@ -0,0 +1,85 @@
+import asyncio
+import time
+import pytest
+import yaml
+from agent import Agent
+from messaging.heartbeat import Heartbeat
+from messaging.lifecycle import Lifecycle, READY, FAILED
+
+
+@pytest.fixture
+def agent(tmp_path):
+    config = {"devices": {"pi": {"ip": "203.0.113.7", "modules": [
+        {"module": "modules.sensors.Distance"},
+        {"module": "modules.actuators.Speaker", "depends_on": ["Distance"]},
+    ]}}}
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    return Agent(str(path), is_primary=True)
+
+
+def test_dependencies_resolve_by_class_name_or_path(agent):
+    assert agent.resolve_dependency("Distance") == "modules.sensors.Distance"
+    assert agent.resolve_dependency("modules.actuators.Speaker") == "modules.actuators.Speaker"
+    assert agent.resolve_dependency("Camera") is None
+
+
+@pytest.mark.asyncio
+async def test_dependents_wait_for_upstream_readiness(agent):
+    waiting = asyncio.create_task(agent.wait_ready(["modules.sensors.Distance"], timeout=1))
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    await agent.on_lifecycle(Lifecycle("modules.sensors.Distance", READY, time.time()).to_dict())
+    await asyncio.wait_for(waiting, 0.5)
+    assert agent.boot_timeline["modules.sensors.Distance"]["state"] == READY
+
+
+@pytest.mark.asyncio
+async def test_a_failed_upstream_releases_its_dependents(agent):
+    await agent.on_lifecycle(Lifecycle("modules.sensors.Distance", FAILED, time.time(), error="no GPIO").to_dict())
+
+    await asyncio.wait_for(agent.wait_ready(["modules.sensors.Distance"]), 0.5)
+    assert agent.boot_timeline["modules.sensors.Distance"]["state"] == FAILED
+    assert agent.liveness_snapshot()["modules.sensors.Distance"]["state"] == "dead"
+
+
+@pytest.mark.asyncio
+async def test_heartbeats_are_tracked_under_the_module_class_path(agent):
+    await agent.on_lifecycle(Lifecycle("modules.sensors.Distance", READY, time.time(), name="distance").to_dict())
+    await agent.on_channel_message(Heartbeat(sender="distance", module_name="distance", status="operational",
+                                             dying=False).to_dict())
+
+    entry = agent.liveness_snapshot()["modules.sensors.Distance"]
+    assert (entry["state"], entry["status"], entry["beats"]) == ("alive", "operational", 1)
+    assert agent.get_health_snapshot()["modules.sensors.Distance"] == "operational"
+
+
+@pytest.mark.asyncio
+async def test_streams_of_own_modules_are_advertised_until_they_die(agent):
+    agent.modules["modules.sensors.Distance"] = object()  # Spawned by this agent
+    await agent.on_lifecycle(Lifecycle("modules.sensors.Distance", READY, time.time(), name="distance",
+                                       streams={"distance": "ws://0.0.0.0:9100"}).to_dict())
+    await agent.on_lifecycle(Lifecycle("modules.remote.Camera", READY, time.time(),
+                                       streams={"video": "ws://0.0.0.0:9200"}).to_dict())
+    assert agent.advertised_streams() == {"distance": "ws://0.0.0.0:9100"}
+
+    await agent.on_channel_message(Heartbeat(sender="distance", module_name="distance", status="error",
+                                             dying=True).to_dict())
+    assert agent.advertised_streams() == {}
+
+
+@pytest.mark.asyncio
+async def test_streams_are_withdrawn_while_their_module_misses_heartbeats(agent):
+    agent.modules["modules.sensors.Distance"] = object()
+    await agent.on_lifecycle(Lifecycle("modules.sensors.Distance", READY, time.time(), name="distance",
+                                       streams={"distance": "ws://0.0.0.0:9100"}).to_dict())
+    heartbeat = Heartbeat(sender="distance", module_name="distance", status="operational", dying=False).to_dict()
+    await agent.on_channel_message(heartbeat)
+
+    agent.liveness.clock = lambda: time.time() + 60
+    assert agent.liveness.check() == ["modules.sensors.Distance"]
+    assert agent.advertised_streams() == {}
+
+    await agent.on_channel_message(heartbeat)
+    assert agent.advertised_streams() == {"distance": "ws://0.0.0.0:9100"}
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import pytest
+import websockets
+from tests.gcc_process import GCCProcess, connect, receive, publish
+from tests.test_sender import wait_for
+
+
+class FakePrimary:
+    """The primary GCC as a bridged device GCC sees it: records its frames and advertises `interest`."""
+
+    def __init__(self, interest):
+        self.interest = interest
+        self.frames = []
+        self.websocket = None
+
+    async def handler(self, websocket):
+        async for frame in websocket:
+            data = json.loads(frame)
+            self.frames.append(data)
+            if any(message.get("type") == "bridge" for message in unbatched([data])):
+                self.websocket = websocket
+                await websocket.send(json.dumps({"type": "interest", "topics": self.interest}))
+
+    def published(self):
+        return [m for m in unbatched(self.frames) if m.get("topic")]
+
+
+def unbatched(frames):
+    messages = []
+    for data in frames:
+        messages.extend(data["messages"] if data.get("type") == "batch" else [data])
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_a_device_gcc_forwards_only_what_the_primary_wants():
+    primary = FakePrimary(interest=["sensor/#"])
+    server = await websockets.serve(primary.handler, "127.0.0.1", 9210)
+    local = GCCProcess(9211, "--upstream", "ws://127.0.0.1:9210", "--batch-linger", "0.02")
+    try:
+        await local.start()
+        await wait_for(lambda: primary.websocket is not None)
+        module_a = await connect(local.url, "control/a")
+        module_b = await connect(local.url, "local/#", "sensor/remote")
+        await asyncio.sleep(0.1)
+
+        await publish(module_a, "sensor/distance", {"cm": 42})  # The primary has a subscriber
+        await publish(module_a, "status/a", {"ok": True})       # Nobody upstream wants it
+        await publish(module_a, "local/a", {"n": 1})            # Between two modules on this device
+        assert [(m["topic"], m["content"]) for m in await receive(module_b, timeout=0.3)] == [("local/a", {"n": 1})]
+        await wait_for(lambda: primary.published())
+        assert [(m["topic"], m["content"]) for m in primary.published()] == [("sensor/distance", {"cm": 42})]
+    finally:
+        await local.stop()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_bridge_frames_are_batched_and_never_echoed_upstream():
+    primary = FakePrimary(interest=["sensor/#"])
+    server = await websockets.serve(primary.handler, "127.0.0.1", 9212)
+    local = GCCProcess(9213, "--upstream", "ws://127.0.0.1:9212", "--batch-linger", "0.02")
+    try:
+        await local.start()
+        await wait_for(lambda: primary.websocket is not None)
+        module_a = await connect(local.url, "control/a")
+        module_b = await connect(local.url, "sensor/remote")
+        await asyncio.sleep(0.1)
+        frames_before = len(primary.frames)
+
+        for n in range(20):
+            await publish(module_a, "sensor/distance", {"n": n})
+        await wait_for(lambda: len(primary.published()) == 20)
+        assert [m["content"]["n"] for m in primary.published()] == list(range(20))
+        assert len(primary.frames) - frames_before < 20
+
+        # A frame from upstream is delivered here, though the primary wants its topic, and not sent back
+        await primary.websocket.send(json.dumps({"sender": "pc", "topic": "sensor/remote", "content": {"v": 1}}))
+        assert [m["content"] for m in await receive(module_b, timeout=0.3)] == [{"v": 1}]
+        assert all(m["topic"] != "sensor/remote" for m in primary.published())
+    finally:
+        await local.stop()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_a_legacy_client_does_not_subscribe_the_device_to_everything_upstream():
+    primary = FakePrimary(interest=["sensor/#"])
+    server = await websockets.serve(primary.handler, "127.0.0.1", 9214)
+    local = GCCProcess(9215, "--upstream", "ws://127.0.0.1:9214", "--batch-linger", "0.02")
+    try:
+        await local.start()
+        await wait_for(lambda: primary.websocket is not None)
+        legacy = await connect(local.url)
+        module = await connect(local.url, "control/a")
+        await asyncio.sleep(0.2)
+
+        subscribed = set()
+        for message in unbatched(primary.frames):
+            if message.get("type") == "subscribe":
+                subscribed |= set(message["topics"])
+            elif message.get("type") == "unsubscribe":
+                subscribed -= set(message["topics"])
+        assert subscribed == {"control/a"}
+
+        # It still gets everything published on its own device
+        await publish(module, "status/a", {"ok": True})
+        assert [m["topic"] for m in await receive(legacy, timeout=0.3)] == ["status/a"]
+    finally:
+        await local.stop()
+        server.close()
+        await server.wait_closed()
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from vibes import ClockSync
+
+
+def test_lowest_delay_sample_wins():
+    sync = ClockSync("pc", lambda: {})
+    # Peer clock 2 s ahead; symmetric 10 ms path
+    sync.add_sample("pi", t1=100.000, t2=102.005, t3=102.006, t4=100.011)
+    # Same peer, but the reply sat in a queue for 80 ms: asymmetric and misleading
+    sync.add_sample("pi", t1=110.000, t2=112.005, t3=112.006, t4=110.091)
+
+    assert sync.offset("pi") == pytest.approx(2.0)
+    assert sync.delay("pi") == pytest.approx(0.010)
+    assert sync.to_local("pi", 105.0) == pytest.approx(103.0)
+    assert sync.to_local("pc", 105.0) == 105.0
+    assert sync.offset("unknown") == 0.0
+
+
+@pytest.mark.asyncio
+async def test_exchange_between_two_agents_on_loopback():
+    loop = asyncio.get_running_loop()
+    b = ClockSync("b", lambda: {})
+    b.transport, _ = await loop.create_datagram_endpoint(lambda: b, local_addr=("127.0.0.1", 0))
+    # Both agents share a host here, so `a` sends its requests to b's ephemeral port
+    a = ClockSync("a", lambda: {"b": "127.0.0.1"}, port=b.transport.get_extra_info("sockname")[1])
+    a.transport, _ = await loop.create_datagram_endpoint(lambda: a, local_addr=("127.0.0.1", 0))
+
+    for _ in range(3):
+        a.request("127.0.0.1")
+        await asyncio.sleep(0.02)
+
+    assert len(a.samples["b"]) == 3
+    assert abs(a.offset("b")) < 0.005
+    a.transport.close()
+    b.transport.close()
+
+
+def test_malformed_packets_are_dropped():
+    sent = []
+
+    class Transport:
+        def sendto(self, data, addr):
+            sent.append(data)
+
+    sync = ClockSync("pc", lambda: {})
+    sync.transport = Transport()
+    for packet in [b"\xff", b"[1, 2]", b'"clock_req"', b'{"type": "clock_req", "t1": 1.0}',
+                   b'{"type": "clock_req", "id": 1}', b'{"type": "clock_req", "id": 1, "t1": "now"}',
+                   b'{"type": "clock_resp", "t1": 1.0, "t2": 2.0, "t3": 3.0}',
+                   b'{"type": "clock_resp", "device": "pi", "t1": 1.0, "t2": null, "t3": 3.0}']:
+        sync.datagram_received(packet, ("127.0.0.1", 30304))
+
+    assert sent == []
+    assert sync.samples == {}
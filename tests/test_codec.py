@@ -0,0 +1,75 @@
+import pytest
+from messaging.codec import (
+    BINARY, JSON, CodecError, EncodedMessage, binary_codec, codec_for, decode_frame, json_codec, select_subprotocol
+)
+
+
+def test_binary_codec_round_trips_raw_bytes():
+    message = {"sender": "microphone", "topic": "data/microphone", "content": {"pcm": b"\x00\xff" * 100, "rate": 16000}}
+
+    frame = binary_codec.encode(message)
+
+    assert isinstance(frame, bytes)
+    assert decode_frame(frame) == message
+    assert len(frame) < len(json_codec.encode(message))
+
+
+def test_json_codec_keeps_base64_convention_for_bytes():
+    assert json_codec.decode(json_codec.encode({"pcm": b"\x00\x01\x02"})) == {"pcm": "AAEC"}
+
+
+def test_batches_round_trip_for_both_codecs():
+    messages = [{"topic": "heartbeat/a", "n": 1}, {"topic": "heartbeat/b", "n": 2}]
+    for codec in (json_codec, binary_codec):
+        batch = codec.join([codec.encode(m) for m in messages])
+        assert decode_frame(batch) == {"type": "batch", "messages": messages}
+
+
+def test_negotiation_prefers_binary_and_falls_back_to_json():
+    assert select_subprotocol(None, [JSON, BINARY]) == BINARY
+    assert select_subprotocol(None, []) is None
+    assert codec_for(None) is json_codec
+    assert codec_for(BINARY) is binary_codec
+
+
+def test_encoded_message_encodes_once_per_codec():
+    message = EncodedMessage(frame='{"topic": "data/x", "value": 1}')
+
+    binary_frame = message.frame(binary_codec)
+
+    assert message.frame(binary_codec) is binary_frame
+    assert message.frame(json_codec) == '{"topic": "data/x", "value": 1}'
+    assert message.data == {"topic": "data/x", "value": 1}
+
+
+def test_ndarray_travels_as_raw_buffer():
+    import numpy as np
+    samples = np.arange(1600, dtype=np.int16).reshape(2, 800)
+
+    parts = binary_codec.encode_parts({"sensor_channel": "microphone", "seq": 7, "array": samples})
+    decoded = decode_frame(b"".join(parts))
+
+    assert parts[1].nbytes == samples.nbytes  # the buffer is the array's own memory
+    assert decoded["seq"] == 7
+    assert decoded["array"].dtype == np.int16
+    assert (decoded["array"] == samples).all()
+
+
+def test_truncated_binary_frames_raise_codec_error():
+    frame = binary_codec.encode({"sender": "microphone", "content": {"pcm": b"\x00\xff" * 10}})
+    batch = binary_codec.join([frame, frame])
+
+    for truncated in [frame[:n] for n in range(len(frame))] + [batch[:n] for n in range(len(batch))]:
+        with pytest.raises(CodecError):
+            binary_codec.decode(truncated)
+
+
+def test_small_binary_frames_are_bare_json():
+    heartbeat = {"sender": "sound_emitter", "type": "heartbeat", "status": "operational", "dying": False}
+
+    frame = binary_codec.encode(heartbeat)
+
+    assert frame == b'{"sender":"sound_emitter","type":"heartbeat","status":"operational","dying":false}'
+    assert binary_codec.decode(frame) == decode_frame(frame) == heartbeat
+    assert decode_frame(binary_codec.join([frame, binary_codec.encode({"pcm": b"\x01"})])) == {
+        "type": "batch", "messages": [heartbeat, {"pcm": b"\x01"}]}
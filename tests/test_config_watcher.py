@@ -0,0 +1,76 @@
+import pytest
+import yaml
+from config_watcher import ConfigWatcher, spawn_units, diff_units, live_params
+
+IP = "203.0.113.7"
+
+
+def config(*modules):
+    return {"devices": {"pi": {"ip": IP, "modules": list(modules)},
+                        "pc": {"ip": "203.0.113.8", "modules": [{"module": "a.Remote"}]}}}
+
+
+def test_units_group_hosted_modules_and_skip_other_devices():
+    units = spawn_units(config({"module": "a.Sensor"}, {"module": "a.Left", "host": "motors"},
+                               {"module": "a.Right", "host": "motors"}), IP)
+
+    assert set(units) == {("module", "a.Sensor"), ("host", "motors")}
+    assert [m["module"] for m in units[("host", "motors")]] == ["a.Left", "a.Right"]
+
+
+def test_diff_only_reports_units_that_changed():
+    old = spawn_units(config({"module": "a.Sensor", "params": {"port": 1}}, {"module": "a.Speaker"},
+                             {"module": "a.Camera"}), IP)
+    new = spawn_units(config({"module": "a.Sensor", "params": {"port": 2}}, {"module": "a.Speaker"},
+                             {"module": "a.Display"}), IP)
+
+    assert diff_units(old, new) == ([("module", "a.Display")], [("module", "a.Camera")], [("module", "a.Sensor")])
+
+
+def test_only_params_changes_are_live_update_candidates():
+    old = [{"module": "a.Speaker", "params": {"threshold": 25}}]
+
+    assert live_params(old, [{"module": "a.Speaker", "params": {"threshold": 30}}]) == {"a.Speaker": {"threshold": 30}}
+    assert live_params(old, [{"module": "a.Speaker", "params": {"threshold": 25}, "depends_on": ["Sensor"]}]) is None
+
+
+@pytest.mark.asyncio
+async def test_watcher_reports_content_changes_and_skips_broken_yaml(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config()))
+    seen = []
+
+    async def on_change(new_config):
+        seen.append(new_config)
+
+    watcher = ConfigWatcher(str(path), on_change)
+    await watcher.check()
+    path.write_text("devices: [unclosed")
+    await watcher.check()
+    path.write_text(yaml.safe_dump(config({"module": "a.Sensor"})))
+    await watcher.check()
+
+    assert seen == [config({"module": "a.Sensor"})]
+
+
+@pytest.mark.asyncio
+async def test_watcher_ignores_an_empty_file_and_survives_a_failing_reload(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config()))
+    seen = []
+
+    async def on_change(new_config):
+        seen.append(new_config)
+        if len(seen) == 1:
+            raise KeyError("devices")
+
+    watcher = ConfigWatcher(str(path), on_change)
+    path.write_text("")
+    await watcher.check()
+    assert seen == []
+
+    path.write_text(yaml.safe_dump(config({"module": "a.Sensor"})))
+    await watcher.check()
+    path.write_text(yaml.safe_dump(config({"module": "a.Camera"})))
+    await watcher.check()
+    assert seen == [config({"module": "a.Sensor"}), config({"module": "a.Camera"})]
@@ -0,0 +1,85 @@
+import asyncio
+import numpy as np
+import pytest
+from messaging.codec import binary_codec
+from messaging.datagram_link import DatagramLinkClient, DatagramLinkServer, fragment
+
+
+def client(reorder_window=0):
+    received = []
+    link = DatagramLinkClient("udp://127.0.0.1:9", None, reorder_window=reorder_window)
+    link._deliver = lambda payload: received.append(payload["n"])
+    return link, received
+
+
+def feed(link, sequence, n, session=7):
+    for packet in fragment(session, sequence, binary_codec.encode({"n": n}), 1400):
+        link.datagram_received(packet, ("127.0.0.1", 9))
+
+
+def test_loss_and_late_arrivals_are_counted_without_reordering():
+    link, received = client()
+    for sequence in (1, 2, 4, 5, 3):
+        feed(link, sequence, sequence)
+
+    assert received == [1, 2, 4, 5]
+    assert link.stats()["late"] == 1
+    assert link.stats()["lost"] == 0   # 3 was counted lost, then turned up late
+
+
+def test_repeats_of_delivered_messages_are_duplicates_not_late():
+    link, received = client()
+    for sequence in (1, 2, 4, 2, 3, 3, 4):
+        feed(link, sequence, sequence)
+
+    assert received == [1, 2, 4]
+    assert (link.stats()["late"], link.stats()["lost"], link.stats()["duplicates"]) == (1, 0, 3)
+
+
+def test_reorder_window_restores_order():
+    link, received = client(reorder_window=2)
+    for sequence in (1, 3, 2, 4, 7, 8, 9):
+        feed(link, sequence, sequence)
+
+    assert received == [1, 2, 3, 4, 7, 8, 9]
+    assert link.stats()["reordered"] == 1
+    assert link.stats()["lost"] == 2
+
+
+def test_fragments_reassemble_in_any_order():
+    link, received = client()
+    packets = fragment(7, 1, binary_codec.encode({"n": b"x" * 5000}), 1400)
+    assert len(packets) == 4
+    for packet in reversed(packets):
+        link.datagram_received(packet, ("127.0.0.1", 9))
+
+    assert received == [b"x" * 5000]
+
+
+@pytest.mark.asyncio
+async def test_unicast_link_carries_ndarrays():
+    server = DatagramLinkServer(host="127.0.0.1", port=9185, conflate=["audio_level"])
+    await server.start()
+    received = []
+
+    async def on_message(payload):
+        received.append(payload)
+
+    link = DatagramLinkClient("udp://127.0.0.1:9185", on_message)
+    task = asyncio.create_task(link.run())
+    try:
+        while not server.clients or link.last_hello is None:
+            await asyncio.sleep(0.01)
+        assert link.conflated_channels == {"audio_level"}
+
+        samples = np.arange(4000, dtype=np.int16)
+        await server.broadcast_array("audio", samples)
+        while not received:
+            await asyncio.sleep(0.01)
+
+        assert np.array_equal(received[0]["array"], samples)
+        assert received[0]["seq"] == 0
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.stop()
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from enums import OverflowPolicy
+from messaging.dispatcher import Dispatcher
+
+
+@pytest.mark.asyncio
+async def test_items_with_the_same_key_are_handled_in_order_across_workers():
+    handled = []
+
+    async def handler(item):
+        await asyncio.sleep(0.001 * (item["n"] % 3))
+        handled.append((item["topic"], item["n"]))
+
+    dispatcher = Dispatcher(handler, workers=4, key=lambda item: item["topic"])
+    dispatcher.start()
+    for n in range(30):
+        dispatcher.put({"topic": f"data/{n % 5}", "n": n})
+    while dispatcher.handled < 30:
+        await asyncio.sleep(0.005)
+
+    for topic in {t for t, _ in handled}:
+        numbers = [n for t, n in handled if t == topic]
+        assert numbers == sorted(numbers)
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_put_never_waits_for_a_slow_handler_and_drops_oldest_when_full():
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(item):
+        await release.wait()
+        handled.append(item)
+
+    dispatcher = Dispatcher(handler, maxsize=3, policy=OverflowPolicy.DROP_OLDEST)
+    dispatcher.start()
+    dispatcher.put(0)
+    await asyncio.sleep(0)   # Worker picks up 0 and blocks in the handler
+    for n in range(1, 6):
+        assert dispatcher.put(n)
+
+    assert dispatcher.stats()["dropped"] == 2
+    release.set()
+    while dispatcher.depth:
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.001)
+    assert handled == [0, 3, 4, 5]
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_conflated_items_keep_only_the_newest_per_key():
+    handled = []
+
+    async def handler(item):
+        handled.append(item)
+
+    dispatcher = Dispatcher(handler, key=lambda item: item[0])
+    for n in range(5):
+        dispatcher.put(("distance", n), conflate=True)
+    dispatcher.put(("event", 0))
+    dispatcher.start()
+    await asyncio.sleep(0.01)
+
+    assert handled == [("distance", 4), ("event", 0)]
+    stats = dispatcher.stats()
+    assert stats["conflated"] == 4
+    assert stats["handled"] == 2
+    await dispatcher.close()
+
+
+def test_disconnect_policy_is_rejected():
+    with pytest.raises(ValueError):
+        Dispatcher(None, policy=OverflowPolicy.DISCONNECT)
@@ -0,0 +1,46 @@
+import pytest
+import gcc
+from messaging.codec import EncodedMessage
+from messaging.outbound_queue import OutboundQueue
+
+
+class FakeClient:
+    def __init__(self, name):
+        self.remote_address = (name, 0)
+
+
+@pytest.fixture
+def connect():
+    """Register clients with the GCC without starting their writers, so their queues fill up."""
+    clients = []
+
+    def connect(name):
+        client = FakeClient(name)
+        gcc.connected_clients[client] = OutboundQueue(client, maxsize=gcc.QUEUE_SIZE, policy=gcc.OVERFLOW_POLICY)
+        gcc.legacy_clients.add(client)
+        clients.append(client)
+        return client
+
+    yield connect
+    for client in clients:
+        gcc.forget_client(client)
+
+
+@pytest.mark.asyncio
+async def test_clients_can_ask_for_their_own_overflow_policy_and_queue_size(connect):
+    camera, logger, confused = connect("camera"), connect("logger"), connect("confused")
+    await gcc.handle_message(camera, EncodedMessage(data={"type": "subscribe", "topics": ["test/policy"],
+                                                          "overflow_policy": "drop-newest", "queue_size": 2}))
+    await gcc.handle_message(logger, EncodedMessage(data={"type": "subscribe", "topics": ["test/policy"]}))
+    await gcc.handle_message(confused, EncodedMessage(data={"type": "subscribe", "topics": ["test/policy"],
+                                                            "overflow_policy": "explode", "queue_size": 0}))
+
+    for n in range(gcc.QUEUE_SIZE + 4):
+        gcc.publish("test/policy", EncodedMessage(data={"sender": "test", "topic": "test/policy", "content": {"n": n}}))
+
+    stats = {client.remote_address[0]: gcc.connected_clients[client].stats() for client in (camera, logger, confused)}
+    assert (stats["camera"]["policy"], stats["camera"]["depth"], stats["camera"]["dropped"]) == \
+        ("drop-newest", 2, gcc.QUEUE_SIZE + 2)
+    for name in ("logger", "confused"):  # The defaults; invalid options are ignored
+        assert (stats[name]["policy"], stats[name]["depth"], stats[name]["dropped"]) == \
+            (gcc.OVERFLOW_POLICY.value, gcc.QUEUE_SIZE, 4)
@@ -0,0 +1,67 @@
+import pytest
+from tests.mocks.mock_sender import MockSender
+from enums import HeartbeatStatus
+from modules.module import Module
+from modules.heartbeat_scheduler import HeartbeatScheduler
+
+
+class DummyModule(Module):
+    async def start(self):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+async def beats_until(scheduler, clock, until):
+    """Step the fake clock through every due time up to `until`; returns the times heartbeats went out."""
+    times = []
+    while True:
+        due = min(entry["due"] for entry in scheduler.modules.values())
+        if due > until:
+            return times
+        clock.now = due
+        await scheduler.beat()
+        times.append(due)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_heartbeats_back_off_and_a_status_change_resets_the_rate():
+    clock = FakeClock()
+    sender = MockSender()
+    module = DummyModule(sender=sender)
+    scheduler = HeartbeatScheduler(fast=1.0, slow=5.0, clock=clock)
+    scheduler.add(module)
+
+    assert await beats_until(scheduler, clock, 120) == [100, 101, 103, 107, 112, 117]
+    assert [m.content["interval"] for m in sender.sent_messages] == [1, 2, 4, 5, 5, 5]
+
+    clock.now = 118.3
+    module.set_status(HeartbeatStatus.ERROR)   # Due immediately, back on the fast rate
+    await scheduler.beat()
+    assert sender.sent_messages[-1].content["status"] == "error"
+    assert sender.sent_messages[-1].content["interval"] == pytest.approx(0.7)  # Next tick on the shared grid
+
+
+@pytest.mark.asyncio
+async def test_modules_due_together_share_one_frame_and_dead_modules_say_goodbye():
+    clock = FakeClock()
+    sender = MockSender()
+    modules = [DummyModule(name=f"m{i}", sender=sender) for i in range(3)]
+    scheduler = HeartbeatScheduler(clock=clock)
+    for module in modules:
+        scheduler.add(module)
+
+    await beats_until(scheduler, clock, 130)
+    assert scheduler.frames == 8 and scheduler.heartbeats == 24   # vs 45 frames at one per module every 2 s
+
+    modules[0].alive = False
+    scheduler.changed(modules[0])
+    await scheduler.beat()
+    assert sender.sent_messages[-1].content["dying"] is True
+    assert modules[0] not in scheduler.modules and modules[0].heartbeats is None
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+import wave
+import numpy as np
+import pytest
+from modules.io_executor import IOExecutor, IOQueueFull
+from modules.sensors.sounds.microphone import Microphone
+
+
+@pytest.mark.asyncio
+async def test_blocking_calls_leave_the_event_loop_free():
+    executor = IOExecutor("sensor")
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(heartbeat())
+    try:
+        def slow_read():
+            time.sleep(0.2)
+            return threading.current_thread().name
+
+        assert await executor.run(slow_read) == "sensor-io-0"
+        assert ticks >= 10   # Kept ticking while the read blocked
+    finally:
+        task.cancel()
+        executor.shutdown()
+
+    stats = executor.stats()["calls"]["slow_read"]
+    assert stats["calls"] == 1 and stats["duration_mean_ms"] >= 200
+
+
+@pytest.mark.asyncio
+async def test_timeouts_bounded_queue_and_errors():
+    executor = IOExecutor("gpio", workers=1, max_pending=1)
+    release = threading.Event()
+    ran = []
+
+    hung = asyncio.create_task(executor.run(release.wait, label="echo"))
+    await asyncio.sleep(0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await executor.run(ran.append, "queued", timeout=0.05, label="queued")   # Never got a thread
+    with pytest.raises(IOQueueFull):
+        await asyncio.gather(executor.run(ran.append, "a"), executor.run(ran.append, "b"))
+
+    release.set()
+    await hung
+    await asyncio.sleep(0.05)
+    assert ran == ["a"] and executor.pending == 0   # The timed-out call was dropped, not run late
+
+    def broken():
+        raise OSError("no echo")
+
+    with pytest.raises(OSError):
+        await executor.run(broken)
+    await asyncio.sleep(0.01)
+    stats = executor.stats()["calls"]
+    assert stats["queued"]["timeouts"] == 1 and stats["queued"]["calls"] == 0
+    assert stats["append"]["rejected"] == 1
+    assert stats["broken"]["errors"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_simulated_microphone_fills_its_buffer_off_the_event_loop(tmp_path):
+    path = tmp_path / "tone.wav"
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(np.full(16000, 7, dtype=np.int16).tobytes())
+
+    microphone = Microphone(simulate=True, simulation_file=str(path), buffer_duration=0.5)
+    await microphone.start()
+    await asyncio.sleep(0.25)
+    await microphone.stop()
+
+    assert (microphone.read() == 7).sum() >= 3 * microphone.chunk_size
+    assert microphone.io.stats()["calls"]["load simulation"]["calls"] == 1
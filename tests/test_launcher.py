@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from tests.mocks.mock_sender import MockSender
+from enums import HeartbeatStatus
+from launcher import ModuleHost
+from modules.module import Module
+from modules.actuators.emitters.sounds.sound_emitter import SoundEmitter
+from tests.test_sender import start_server
+
+MOCK_SENDER = MockSender()
+
+
+class Healthy(Module):
+    def __init__(self, **kwargs):
+        super().__init__(name="healthy", sender=MOCK_SENDER)
+
+    async def start(self):
+        self.set_status(HeartbeatStatus.OPERATIONAL)
+
+
+class FailsToStart(Module):
+    def __init__(self, **kwargs):
+        super().__init__(name="fails_to_start", sender=MOCK_SENDER)
+
+    async def start(self):
+        raise RuntimeError("no GPIO")
+
+
+class QuietEmitter(SoundEmitter):
+    async def boot(self):
+        pass  # No sound file or audio device needed to run its loop
+
+
+class CrashesLater(Module):
+    def __init__(self, **kwargs):
+        super().__init__(name="crashes_later", sender=MOCK_SENDER)
+
+    async def start(self):
+        asyncio.create_task(self.loop())
+
+    async def loop(self):
+        await asyncio.sleep(0.01)
+        raise ValueError("sensor unplugged")
+
+
+@pytest.mark.asyncio
+async def test_crashing_modules_do_not_take_down_the_host():
+    MOCK_SENDER.sent_messages.clear()
+    host = ModuleHost([{"module": f"{__name__}.{name}"} for name in ("Healthy", "FailsToStart", "CrashesLater")])
+    task = asyncio.create_task(host.run())
+    await asyncio.sleep(0.1)
+
+    assert set(host.crashed) == {f"{__name__}.FailsToStart", f"{__name__}.CrashesLater"}
+    assert host.crashed[f"{__name__}.CrashesLater"] == "sensor unplugged"
+    assert not task.done()
+
+    heartbeats = {m.sender: m.content for m in MOCK_SENDER.sent_messages}
+    assert heartbeats["healthy"]["dying"] is False
+    assert heartbeats["fails_to_start"]["dying"] is True
+    assert heartbeats["fails_to_start"]["error"] == "no GPIO"
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_a_launched_modules_loop_ticks():
+    server = await start_server(9186, [])
+    params = {"global_channel_url": "ws://127.0.0.1:9186", "upstream_data_url": "ws://127.0.0.1:9"}
+    host = ModuleHost([{"module": f"{__name__}.QuietEmitter", "params": params}])
+    task = asyncio.create_task(host.run())
+    try:
+        for _ in range(100):
+            emitter = host.modules.get(f"{__name__}.QuietEmitter")
+            if emitter is not None and emitter.tick_stats().get("loop", {}).get("ticks"):
+                break
+            await asyncio.sleep(0.02)
+        assert emitter.tick_stats()["loop"]["ticks"] >= 1
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        server.close()
+        await server.wait_closed()
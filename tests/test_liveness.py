@@ -0,0 +1,72 @@
+from liveness import Liveness, TimingWheel, ALIVE, MISSED, DEAD
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_wheel_fires_keys_within_one_tick_of_their_deadline():
+    wheel = TimingWheel(tick=0.5, slots=8, now=0)
+    wheel.schedule("a", 1.2)
+    wheel.schedule("b", 10.0)  # More than one rotation (4 s) out
+
+    assert wheel.advance(1.0) == []
+    assert wheel.advance(1.5) == ["a"]
+    assert wheel.advance(5.0) == []
+    assert wheel.advance(10.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_missed_deadline_is_reported_once_and_recovery_after():
+    clock = FakeClock()
+    missed, recovered = [], []
+    liveness = Liveness(timeout=10, precision=0.5, clock=clock,
+                        on_missed=lambda module, entry: missed.append(module),
+                        on_recovered=lambda module, entry: recovered.append(module))
+    liveness.beat("sensor", "operational")
+
+    clock.now += 9
+    liveness.beat("sensor", "operational")
+    clock.now += 10.4
+    liveness.check()
+    assert missed == ["sensor"]
+    clock.now += 5
+    liveness.check()
+    assert missed == ["sensor"]
+    assert liveness.get("sensor")["state"] == MISSED
+
+    liveness.beat("sensor", "operational")
+    assert recovered == ["sensor"]
+    assert liveness.get("sensor")["state"] == ALIVE
+
+
+def test_snapshot_filters_by_state():
+    clock = FakeClock()
+    liveness = Liveness(timeout=10, clock=clock)
+    liveness.expect("spawned")
+    liveness.beat("speaker", "error", dying=True, error="no audio device")
+    liveness.beat("sensor", "operational")
+    clock.now += 11
+    liveness.check()
+
+    assert set(liveness.snapshot()) == {"spawned", "speaker", "sensor"}
+    assert set(liveness.snapshot(MISSED)) == {"spawned", "sensor"}
+    dead = liveness.snapshot(DEAD)["speaker"]
+    assert dead["error"] == "no audio device"
+    assert dead["age"] == 11
+
+
+def test_a_heartbeat_can_bring_its_deadline_closer():
+    clock = FakeClock()
+    liveness = Liveness(timeout=10, precision=0.5, clock=clock)
+    liveness.beat("sensor", "operational", timeout=2.0)   # It promised its next heartbeat within ~1 s
+    liveness.beat("speaker", "operational", timeout=30)   # Never later than the table's own timeout
+
+    clock.now += 2.5
+    assert liveness.check() == ["sensor"]
+    clock.now += 8
+    assert liveness.check() == ["speaker"]
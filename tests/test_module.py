@@ -2,7 +2,7 @@ import asyncio
 import pytest
 from tests.mocks.mock_sender import MockSender
 from enums import HeartbeatStatus
-from module.module import Module
+from modules.module import Module
 from datetime import datetime, timezone, timezone
 
 # Define a simple dummy module for testing
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from messaging.module_link_client import ModuleLinkClient
+from messaging.module_link_server import ModuleLinkServer
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_of_conflated_channel_gets_latest_value():
+    server = ModuleLinkServer(host="127.0.0.1", port=9184, conflate=["ultrasonic_data"])
+    await server.start()
+    received = []
+
+    async def on_message(payload):
+        received.append(payload)
+        await asyncio.sleep(0.05)   # A consumer far slower than the producer
+
+    client = ModuleLinkClient("ws://127.0.0.1:9184", on_message, transport="websocket")
+    task = asyncio.create_task(client.run())
+    try:
+        while not client.conflated_channels:
+            await asyncio.sleep(0.01)
+        for value in range(200):
+            await server.broadcast({"sensor_channel": "ultrasonic_data", "value": value})
+            if value % 50 == 0:
+                await server.broadcast({"sensor_channel": "events", "value": value})
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.2)
+
+        distances = [p["value"] for p in received if p["sensor_channel"] == "ultrasonic_data"]
+        events = [p["value"] for p in received if p["sensor_channel"] == "events"]
+        assert distances[-1] == 199
+        assert len(distances) < 50
+        assert events == [0, 50, 100, 150]   # Non-conflated channels are delivered in full
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_stream_client_follows_the_producer_to_its_new_endpoint():
+    from vibes import VibeListener, encode_vibe, decode_vibe, KEYFRAME
+
+    resolver = VibeListener(verbose=False)
+    advertise = lambda sequence, url: resolver.apply(decode_vibe(encode_vibe(
+        KEYFRAME, 1, sequence, 0.0, 1.0, "pi", {}, {"distance": url})), "127.0.0.1")
+    first = ModuleLinkServer(host="0.0.0.0", port=0)
+    second = ModuleLinkServer(host="0.0.0.0", port=0)
+    await first.start()
+    await second.start()
+    received = []
+
+    async def on_message(payload):
+        received.append(payload["value"])
+
+    client = ModuleLinkClient("stream://distance", on_message, transport="websocket", resolver=resolver)
+    task = asyncio.create_task(client.run())
+    try:
+        advertise(0, first.endpoint)   # Wildcard host: resolved to the address the vibe came from
+        while not first.clients:
+            await asyncio.sleep(0.01)
+        assert client.endpoint == f"ws://127.0.0.1:{first.port}"
+        await first.broadcast({"sensor_channel": "d", "value": 1})
+
+        advertise(1, second.endpoint)  # The producer restarted on another port
+        while not second.clients:
+            await asyncio.sleep(0.01)
+        await second.broadcast({"sensor_channel": "d", "value": 2})
+        await asyncio.sleep(0.1)
+        assert received == [1, 2]
+        assert client.endpoint == f"ws://127.0.0.1:{second.port}"
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await first.stop()
+        await second.stop()
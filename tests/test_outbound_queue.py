@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from enums import OverflowPolicy
+from messaging.outbound_queue import OutboundQueue
+
+
+class StalledWebSocket:
+    """Stand-in for a client on bad Wi-Fi: send() blocks until released."""
+
+    def __init__(self):
+        self.sent = []
+        self.release = asyncio.Event()
+        self.closed_with = None
+        self.remote_address = ("10.0.0.2", 5000)
+
+    async def send(self, frame):
+        await self.release.wait()
+        self.sent.append(frame)
+
+    async def close(self, code=1000, reason=""):
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest_frames():
+    websocket = StalledWebSocket()
+    queue = OutboundQueue(websocket, maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+
+    for frame in ("a", "b", "c"):
+        assert queue.put(frame)
+
+    assert queue.depth == 2
+    assert queue.dropped == 1
+    queue.start()
+    websocket.release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert websocket.sent == ["b", "c"]
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_drop_newest_rejects_new_frames():
+    queue = OutboundQueue(StalledWebSocket(), maxsize=2, policy=OverflowPolicy.DROP_NEWEST)
+
+    assert queue.put("a")
+    assert queue.put("b")
+    assert not queue.put("c")
+    assert queue.stats()["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_consumer():
+    websocket = StalledWebSocket()
+    queue = OutboundQueue(websocket, maxsize=1, policy=OverflowPolicy.DISCONNECT)
+
+    queue.put("a")
+    assert not queue.put("b")
+    await asyncio.sleep(0)
+
+    assert queue.closed
+    assert websocket.closed_with == 1008
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_does_not_block_others():
+    stalled, healthy = StalledWebSocket(), StalledWebSocket()
+    healthy.release.set()
+    queues = [OutboundQueue(stalled), OutboundQueue(healthy)]
+    for queue in queues:
+        queue.start()
+
+    for queue in queues:
+        queue.put("frame")
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert healthy.sent == ["frame"]
+    assert stalled.sent == []
+    for queue in queues:
+        await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_conflated_key_keeps_only_newest_frame_in_its_original_position():
+    websocket = StalledWebSocket()
+    queue = OutboundQueue(websocket, maxsize=8)
+
+    queue.put_latest("distance", "d1")
+    queue.put("event")
+    queue.put_latest("distance", "d2")
+    queue.put_latest("distance", "d3")
+
+    assert queue.depth == 2
+    assert queue.stats()["conflated"] == 2
+    queue.start()
+    websocket.release.set()
+    for _ in range(4):
+        await asyncio.sleep(0)
+    assert websocket.sent == ["d3", "event"]
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_shrinking_the_queue_sheds_frames_by_policy():
+    kept = {}
+    for policy in (OverflowPolicy.DROP_OLDEST, OverflowPolicy.DROP_NEWEST):
+        queue = OutboundQueue(StalledWebSocket(), maxsize=8)
+        for frame in ("a", "b", "c", "d"):
+            queue.put(frame)
+        queue.put_latest("status", "e")
+        queue.resize(2, policy)
+        kept[policy] = [queue._popleft() for _ in range(queue.depth)]
+        assert queue.dropped == 3
+    assert kept == {OverflowPolicy.DROP_OLDEST: ["d", "e"], OverflowPolicy.DROP_NEWEST: ["a", "b"]}
+
+    websocket = StalledWebSocket()
+    queue = OutboundQueue(websocket, maxsize=8)
+    queue.put("a")
+    queue.put("b")
+    queue.resize(1, OverflowPolicy.DISCONNECT)
+    await asyncio.sleep(0)
+    assert queue.closed and websocket.closed_with == 1008
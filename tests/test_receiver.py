@@ -0,0 +1,38 @@
+import asyncio
+import json
+import pytest
+import websockets
+from messaging.codec import select_subprotocol
+from messaging.receiver import Receiver
+from tests.test_sender import wait_for
+
+
+@pytest.mark.asyncio
+async def test_a_bad_frame_is_skipped_without_dropping_the_connection():
+    connections = []
+
+    async def handler(websocket):
+        connections.append(websocket)
+        await websocket.send("not json")
+        await websocket.send(json.dumps([1, 2, 3]))
+        await websocket.send(json.dumps({"type": "batch", "messages": ["junk", {"topic": "sensor/a", "n": 1}]}))
+        await websocket.send(json.dumps({"topic": "sensor/a", "n": 2}))
+        await websocket.wait_closed()
+
+    server = await websockets.serve(handler, "127.0.0.1", 9187, select_subprotocol=select_subprotocol)
+    received = []
+
+    async def on_message(data):
+        received.append(data)
+
+    receiver = Receiver("ws://127.0.0.1:9187", on_message)
+    task = asyncio.create_task(receiver.run())
+    try:
+        await wait_for(lambda: len(received) == 2)
+        assert [m["n"] for m in received] == [1, 2]
+        assert len(connections) == 1
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        server.close()
+        await server.wait_closed()
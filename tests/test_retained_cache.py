@@ -0,0 +1,61 @@
+from messaging.retained_cache import RetainedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def heartbeat(sender, status="operational"):
+    return {"sender": sender, "topic": f"heartbeat/{sender}", "content": {"status": status}}
+
+
+def test_keeps_last_value_per_sender_and_topic():
+    cache = RetainedCache(clock=FakeClock())
+    cache.put(heartbeat("emitter", "booting"), 10)
+    cache.put(heartbeat("emitter", "operational"), 10)
+    cache.put(heartbeat("ultrasonic_sensor"), 10)
+
+    snapshot = cache.snapshot(["heartbeat/*"])
+
+    assert len(snapshot) == 2
+    assert snapshot[-1]["content"]["status"] == "operational"
+    assert cache.total_bytes == 20
+
+
+def test_snapshot_only_returns_matching_topics():
+    cache = RetainedCache(clock=FakeClock())
+    cache.put(heartbeat("emitter"), 10)
+    cache.put({"sender": "agent", "topic": "control/shutdown", "content": {}}, 10)
+
+    assert [m["topic"] for m in cache.snapshot(["control/#"])] == ["control/shutdown"]
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = RetainedCache(ttl=5, clock=clock)
+    cache.put(heartbeat("emitter"), 10)
+
+    clock.now = 6
+    assert cache.snapshot(["#"]) == []
+    assert cache.total_bytes == 0
+
+
+def test_memory_bound_evicts_least_recently_updated():
+    cache = RetainedCache(max_entries=2, clock=FakeClock())
+    cache.put(heartbeat("a"), 10)
+    cache.put(heartbeat("b"), 10)
+    cache.put(heartbeat("a"), 10)
+    cache.put(heartbeat("c"), 10)
+
+    assert sorted(m["sender"] for m in cache.snapshot(["#"])) == ["a", "c"]
+
+
+def test_messages_can_opt_out_of_retention():
+    cache = RetainedCache(clock=FakeClock())
+    cache.put(dict(heartbeat("emitter"), retain=False), 10)
+
+    assert len(cache) == 0
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+import websockets
+from messaging.codec import decode_frame, select_subprotocol
+from messaging.message import Message
+from messaging.sender import Sender
+
+
+async def start_server(port, received):
+    async def handler(websocket):
+        async for frame in websocket:
+            data = decode_frame(frame)
+            received.append(data)
+
+    return await websockets.serve(handler, "127.0.0.1", port, select_subprotocol=select_subprotocol)
+
+
+def published(received):
+    messages = []
+    for data in received:
+        messages.extend(data["messages"] if data.get("type") == "batch" else [data])
+    return [m for m in messages if m.get("type") not in ("subscribe", "unsubscribe")]
+
+
+async def wait_for(condition, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_messages_sent_while_disconnected_are_delivered_after_connecting():
+    received = []
+    sender = Sender("ws://127.0.0.1:9181")
+    await sender.send(Message(sender="test", content={"n": 1}))
+    assert sender.stats()["depth"] == 1
+
+    server = await start_server(9181, received)
+    try:
+        await wait_for(lambda: published(received))
+        assert [m["content"] for m in published(received)] == [{"n": 1}]
+    finally:
+        await sender.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_bursts_are_coalesced_into_batch_frames():
+    received = []
+    server = await start_server(9182, received)
+    sender = Sender("ws://127.0.0.1:9182", batch_size=10)
+    try:
+        assert await sender.connect()
+        for n in range(25):
+            await sender.send(Message(sender="test", content={"n": n}))
+        await wait_for(lambda: len(published(received)) == 25)
+
+        assert [m["content"]["n"] for m in published(received)] == list(range(25))
+        assert sender.stats()["frames_written"] == 3
+    finally:
+        await sender.close()
+        server.close()
+        await server.wait_closed()
+
+
+def test_full_queue_drops_oldest():
+    sender = Sender("ws://127.0.0.1:9", maxsize=2)
+    sender.start = lambda: None   # Keep the writer task from running
+    for n in range(3):
+        sender.publish_nowait("data/test", {"n": n})
+
+    assert [p["n"] for p in sender._payloads] == [1, 2]
+    assert sender.dropped == 1
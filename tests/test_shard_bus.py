@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+import pytest
+from tests.gcc_process import GCCProcess, connect, receive, publish
+
+
+def shards(port, count=2):
+    return [GCCProcess(port, "--workers", str(count), host=f"127.0.0.{n + 1}", shard_id=n) for n in range(count)]
+
+
+async def start(*processes):
+    await asyncio.gather(*(process.start() for process in processes))
+    await asyncio.sleep(0.2)  # Shard bus links come up and exchange interest
+
+
+async def stop(*processes):
+    await asyncio.gather(*(process.stop() for process in processes))
+
+
+@pytest.mark.asyncio
+async def test_publishes_reach_subscribers_on_another_shard():
+    a, b = shards(9201)
+    await start(a, b)
+    try:
+        subscriber = await connect(b.url, "sensor/distance")
+        publisher = await connect(a.url)
+        await asyncio.sleep(0.1)  # Shard B's interest reaches shard A
+        await publish(publisher, "sensor/distance", {"cm": 42})
+        await publish(publisher, "sensor/light", {"lux": 7})
+
+        messages = await receive(subscriber, timeout=0.5)
+        assert [(m["topic"], m["content"]) for m in messages] == [("sensor/distance", {"cm": 42})]
+    finally:
+        await stop(a, b)
+
+
+@pytest.mark.asyncio
+async def test_retained_values_of_every_shard_are_replayed_newest_first():
+    a, b = shards(9202)
+    await start(a, b)
+    try:
+        on_a, on_b = await connect(a.url), await connect(b.url)
+        now = time.time()
+        await publish(on_a, "sensor/distance", {"cm": 10}, sender="distance", timestamp=now - 1)
+        await publish(on_b, "sensor/distance", {"cm": 20}, sender="distance", timestamp=now)
+        await publish(on_a, "sensor/light", {"lux": 7}, sender="light", timestamp=now)
+        await asyncio.sleep(0.1)
+
+        # A late joiner on shard B gets one batch with shard A's values merged in
+        late = await connect(b.url, "sensor/#")
+        messages = await receive(late, timeout=0.5)
+        assert sorted((m["topic"], m["content"]) for m in messages) == [
+            ("sensor/distance", {"cm": 20}), ("sensor/light", {"lux": 7})]
+    finally:
+        await stop(a, b)
+
+
+@pytest.mark.asyncio
+async def test_a_shard_keeps_serving_its_clients_while_another_is_down():
+    a, b = shards(9203)
+    await start(a, b)
+    try:
+        on_a = await connect(a.url)
+        await publish(on_a, "sensor/distance", {"cm": 10})
+        await b.stop()
+        await asyncio.sleep(0.1)
+
+        # Subscribing collects the other shards' snapshots inline; a shard that is gone is not waited for
+        started = time.perf_counter()
+        subscriber = await connect(a.url, "sensor/#")
+        replay = json.loads(await asyncio.wait_for(subscriber.recv(), 1.0))
+        assert time.perf_counter() - started < 0.05
+        assert [m["content"] for m in replay["messages"]] == [{"cm": 10}]
+
+        await publish(on_a, "sensor/distance", {"cm": 11})
+        assert [m["content"] for m in await receive(subscriber, timeout=0.3)] == [{"cm": 11}]
+
+        # Once it is back, the shards link up again
+        await start(b)
+        on_b = await connect(b.url, "sensor/#")
+        await receive(on_b, timeout=0.2)  # Its (merged) retained replay
+        await publish(on_a, "sensor/distance", {"cm": 12})
+        assert [m["content"] for m in await receive(on_b, timeout=0.3)] == [{"cm": 12}]
+    finally:
+        await stop(a, b)
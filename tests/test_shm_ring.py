@@ -0,0 +1,84 @@
+import asyncio
+import os
+import pytest
+from messaging.shm_ring import ShmRingReader, ShmRingWriter, is_local_endpoint
+from messaging.module_link_client import ModuleLinkClient
+from messaging.module_link_server import ModuleLinkServer
+
+
+@pytest.fixture
+def writer():
+    ring = ShmRingWriter(f"catdog-test-{os.getpid()}", slot_count=4, slot_size=64)
+    yield ring
+    ring.close()
+
+
+def test_reader_receives_frames_in_order(writer):
+    reader = ShmRingReader(writer.name)
+    writer.write([b"one"])
+    writer.write([b"tw", b"o"])
+
+    assert reader.read_available() == [b"one", b"two"]
+    assert reader.read_available() == []
+    reader.close()
+
+
+def test_lapped_reader_counts_overrun_and_resumes_at_oldest_frame(writer):
+    reader = ShmRingReader(writer.name)
+    for i in range(10):
+        writer.write([str(i).encode()])
+
+    assert reader.read_available() == [b"6", b"7", b"8", b"9"]
+    assert reader.stats() == {"received": 4, "lost": 6, "overruns": 1}
+    reader.close()
+
+
+def test_oversized_frames_are_rejected(writer):
+    with pytest.raises(ValueError):
+        writer.write([b"x" * 65])
+
+
+@pytest.mark.asyncio
+async def test_loopback_is_local():
+    assert await is_local_endpoint("ws://127.0.0.1:9100")
+    assert await is_local_endpoint("ws://localhost:9100")
+    assert not await is_local_endpoint("ws://192.0.2.1:9100")
+
+
+@pytest.mark.asyncio
+async def test_local_link_switches_to_shared_memory():
+    server = ModuleLinkServer(host="127.0.0.1", port=9179, shm_slot_size=256)
+    await server.start()
+    received = []
+
+    async def on_message(payload):
+        received.append(payload)
+
+    client = ModuleLinkClient("ws://127.0.0.1:9179", on_message)
+    task = asyncio.create_task(client.run())
+    try:
+        for _ in range(100):
+            if server.shm_clients:
+                break
+            await asyncio.sleep(0.01)
+        assert server.shm_clients
+
+        # Frames too big for a slot go over the WebSocket, but keep their place in the stream
+        sent = [{"sensor_channel": "ultrasonic_data", "value": 1},
+                {"sensor_channel": "ultrasonic_data", "blob": b"x" * 1024},
+                {"sensor_channel": "ultrasonic_data", "value": 2},
+                {"sensor_channel": "ultrasonic_data", "blob": b"y" * 1024},
+                {"sensor_channel": "ultrasonic_data", "value": 3}]
+        for payload in sent:
+            await server.broadcast(dict(payload))
+        for _ in range(100):
+            if len(received) == len(sent):
+                break
+            await asyncio.sleep(0.01)
+
+        assert received == sent
+        assert (server.ring.sequence, server.spills) == (5, 2)  # Two of them are spill markers
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.stop()
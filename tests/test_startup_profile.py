@@ -0,0 +1,46 @@
+import sys
+import importlib
+
+import startup_profile
+from startup_profile import StartupProfile
+
+
+def test_import_timer_records_first_imports_with_nested_time(tmp_path, monkeypatch):
+    (tmp_path / "outer_mod.py").write_text("import inner_mod\n")
+    (tmp_path / "inner_mod.py").write_text("import time\ntime.sleep(0.02)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    profile = StartupProfile()
+    profile.imports.install()
+    try:
+        module = importlib.import_module("outer_mod")
+    finally:
+        profile.imports.uninstall()
+        sys.modules.pop("outer_mod", None)
+        sys.modules.pop("inner_mod", None)
+
+    records = {name: (cumulative, own) for name, cumulative, own in profile.imports.records}
+    assert records["inner_mod"][1] >= 0.02
+    assert records["outer_mod"][0] >= records["inner_mod"][0]
+    assert records["outer_mod"][1] < 0.02  # The sleep belongs to inner_mod
+    # The real loader is back in place once the module is imported
+    assert not isinstance(module.__loader__, startup_profile._TimedLoader)
+
+
+def test_phases_and_operational_are_no_ops_until_started(monkeypatch):
+    monkeypatch.setattr(startup_profile, "_profile", None)
+    with startup_profile.phase("x.Module", "boot"):
+        pass
+    startup_profile.operational("x.Module")
+    assert startup_profile.finish() == []
+
+    profile = startup_profile.start()
+    try:
+        with startup_profile.phase("x.Module", "boot"):
+            pass
+        startup_profile.operational("x.Module")
+        assert [(m, p) for m, p, _ in profile.phases] == [("x.Module", "boot")]
+        assert profile.operational["x.Module"] > 0
+        assert any("Module operational" in line for line in startup_profile.finish())
+    finally:
+        profile.imports.uninstall()
+        monkeypatch.setattr(startup_profile, "_profile", None)
@@ -0,0 +1,63 @@
+import time
+import pytest
+from modules.ticker import Ticker, SKIP, CATCH_UP
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+async def run(ticker, clock, work):
+    """Tick len(work) times, spending work[i] seconds in the body of tick i; returns the due times."""
+    dues = []
+    for seconds in work:
+        dues.append(await ticker.wait())
+        clock.now += seconds
+    return dues
+
+
+@pytest.mark.asyncio
+async def test_ticks_stay_on_the_grid_whatever_the_body_costs(clock):
+    ticker = Ticker(0.5, clock=clock, sleep=clock.sleep)
+    assert await run(ticker, clock, [0.1, 0.4, 0.05, 0.3]) == [0.0, 0.5, 1.0, 1.5]
+    assert clock.now == pytest.approx(1.8)   # sleep-after-work pacing would be at 2.85
+    assert ticker.stats()["overruns"] == 0 and ticker.stats()["jitter_max_ms"] == 0
+
+
+@pytest.mark.asyncio
+async def test_skip_drops_missed_ticks_and_rejoins_the_grid(clock):
+    ticker = Ticker(1.0, policy=SKIP, clock=clock, sleep=clock.sleep)
+    assert await run(ticker, clock, [0.1, 2.5, 0.1, 0.1]) == [0.0, 1.0, 3.0, 4.0]
+    stats = ticker.stats()
+    assert (stats["ticks"], stats["overruns"], stats["skipped"]) == (4, 1, 1)
+    assert stats["jitter_max_ms"] == pytest.approx(500)   # Tick 3.0 started at 3.5
+
+
+@pytest.mark.asyncio
+async def test_catch_up_runs_every_missed_tick(clock):
+    ticker = Ticker(1.0, policy=CATCH_UP, clock=clock, sleep=clock.sleep)
+    assert await run(ticker, clock, [0.1, 2.5, 0.1, 0.1, 0.1]) == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert ticker.stats()["skipped"] == 0
+    assert ticker.stats()["overruns"] == 2   # Ticks 2.0 and 3.0 were already due when asked for
+
+
+@pytest.mark.asyncio
+async def test_rate_holds_in_real_time():
+    ticker = Ticker(0.01)
+    began = time.monotonic()
+    for _ in range(20):
+        await ticker.wait()
+        time.sleep(0.004)   # Blocking work in the body
+    assert time.monotonic() - began < 0.25   # 20 ticks on a 10 ms grid; sleep-after-work would take ~0.28 s
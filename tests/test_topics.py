@@ -0,0 +1,49 @@
+from messaging.topics import TopicIndex, topic_matches
+
+
+def test_exact_and_wildcard_subscribers_are_matched():
+    index = TopicIndex()
+    index.subscribe("agent", "heartbeat/*")
+    index.subscribe("emitter", "control/shutdown")
+    index.subscribe("logger", "#")
+
+    assert index.match("heartbeat/ultrasonic_sensor") == {"agent", "logger"}
+    assert index.match("control/shutdown") == {"emitter", "logger"}
+    assert index.match("data/ultrasonic_sensor") == {"logger"}
+
+
+def test_single_wildcard_matches_exactly_one_level():
+    index = TopicIndex()
+    index.subscribe("agent", "heartbeat/*")
+
+    assert index.match("heartbeat") == set()
+    assert index.match("heartbeat/a/b") == set()
+
+
+def test_multi_wildcard_matches_trailing_levels():
+    index = TopicIndex()
+    index.subscribe("agent", "sensors/#")
+
+    assert index.match("sensors") == {"agent"}
+    assert index.match("sensors/ultrasonic/distance") == {"agent"}
+    assert index.match("actuators/sound") == set()
+
+
+def test_remove_drops_all_patterns_of_a_subscriber():
+    index = TopicIndex()
+    index.subscribe("agent", "heartbeat/*")
+    index.subscribe("agent", "control/shutdown")
+    index.subscribe("emitter", "heartbeat/*")
+
+    index.remove("agent")
+
+    assert index.match("heartbeat/x") == {"emitter"}
+    assert index.match("control/shutdown") == set()
+    assert not index.has_subscriber("agent")
+
+
+def test_topic_matches_agrees_with_index():
+    assert topic_matches("heartbeat/*", "heartbeat/emitter")
+    assert topic_matches("sensors/#", "sensors")
+    assert not topic_matches("heartbeat/*", "data/emitter")
+    assert not topic_matches("control/shutdown", "control")
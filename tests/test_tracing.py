@@ -0,0 +1,71 @@
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from launcher import follow_clock
+from messaging import tracing
+from messaging.message import Message
+from messaging.sender import Sender
+from tests.gcc_process import GCCProcess
+
+
+@pytest.fixture
+def always_sample():
+    tracing.configure(rate=1.0, device_name="pi")
+    tracing.collector.reset()
+    yield
+    tracing.configure(rate=0.0)
+    tracing.collector.reset()
+    tracing.collector.clock_offset = None
+
+
+def test_unsampled_payloads_stay_untouched():
+    tracing.configure(rate=0.0)
+    payload = tracing.begin({"value": 1}, "sensor")
+
+    assert tracing.stamp(payload, "link.send") == {"value": 1}
+
+
+def test_hops_are_recorded_per_path_and_segment(always_sample):
+    payload = tracing.begin({"value": 1}, "sensor")
+    tracing.stamp(payload, "link.send")
+    tracing.finish(payload, "handler")
+
+    summary = tracing.collector.summary()
+    assert summary["sensor > link.send > handler"]["count"] == 1
+    assert "sensor > link.send > handler | sensor > link.send" in summary
+    assert [hop[0] for hop in payload["trace"]["hops"]] == ["sensor", "link.send", "handler"]
+
+
+def test_clock_offsets_are_applied_to_remote_hops(always_sample):
+    collector = tracing.TraceCollector(clock_offset=lambda device: -2.0 if device == "pc" else 0.0)
+    collector.record({"id": "1", "hops": [["sensor", "pi", 100.0], ["handler", "pc", 102.010]]})
+
+    assert collector.summary()["sensor > handler"]["p50_ms"] == pytest.approx(10.0)
+
+
+@pytest.mark.asyncio
+async def test_module_processes_correct_remote_hops_with_the_offsets_their_agent_publishes(always_sample):
+    async with GCCProcess(9191) as gcc:
+        agent = Sender(gcc.url, tag="Agent")
+        content = {"device": "pi", "offsets": {"pc": -2.0}}  # The pc's clock is 2s ahead of ours
+        await agent.publish(tracing.clock_topic(), Message(sender="agent", content=content, msg_type="clock"))
+        await agent.close()
+
+        # A module launched later gets the retained offsets
+        follow_clock(SimpleNamespace(global_channel_url=gcc.url))
+        for _ in range(300):
+            if tracing.collector.clock_offset is not None:
+                break
+            await asyncio.sleep(0.01)
+        sent_on_pc = time.time() + 2.0 - 0.010
+        tracing.finish({"trace": {"id": "1", "hops": [["sensor", "pc", sent_on_pc]]}}, "handler")
+
+    assert tracing.collector.summary()["sensor > handler"]["p50_ms"] == pytest.approx(10.0, abs=5.0)
+
+
+def test_message_round_trips_its_trace():
+    message = Message(sender="s", content={}, trace={"id": "1", "hops": []})
+
+    assert Message.from_dict(message.to_dict()).trace == {"id": "1", "hops": []}
+    assert "trace" not in Message(sender="s", content={}).to_dict()
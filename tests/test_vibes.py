@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from vibes import (VibeSender, VibeListener, encode_vibe, decode_vibe, VibeError,
+                   KEYFRAME, DELTA, JOINED, CHANGED, LEFT)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_codec_round_trip_with_known_literal_and_removed_statuses():
+    entries = {"modules.sensors.Distance": "operational", "modules.x.Custom": "calibrating", "modules.y.Gone": None}
+    vibe = decode_vibe(encode_vibe(DELTA, 7, 42, 1234.5, 60.0, "pi", entries))
+
+    assert vibe["kind"] == DELTA and vibe["session"] == 7 and vibe["sequence"] == 42
+    assert vibe["device"] == "pi" and vibe["uptime"] == pytest.approx(60.0)
+    assert vibe["entries"] == entries
+    with pytest.raises(VibeError):
+        decode_vibe(b'{"device_name": "old json vibe"}')
+
+
+def test_sender_sends_only_changes_between_keyframes():
+    health = {"a": "booting", "b": "operational"}
+    sender = VibeSender("pc", lambda: health, keyframe_every=3)
+
+    assert decode_vibe(sender.next_vibe())["kind"] == KEYFRAME
+    health = {"a": "operational", "b": "operational"}
+    assert decode_vibe(sender.next_vibe())["entries"] == {"a": "operational"}
+    health = {"a": "operational"}
+    assert decode_vibe(sender.next_vibe())["entries"] == {"b": None}
+    keyframe = decode_vibe(sender.next_vibe())
+    assert keyframe["kind"] == KEYFRAME and keyframe["entries"] == {"a": "operational"}
+
+
+def test_listener_applies_deltas_waits_for_keyframe_after_a_gap_and_expires():
+    clock = FakeClock()
+    events = []
+    listener = VibeListener(ttl=15, clock=clock, on_change=lambda event, device, entry: events.append((event, device)))
+    vibe = lambda kind, sequence, entries: decode_vibe(encode_vibe(kind, 1, sequence, clock(), 5.0, "pi", entries))
+
+    listener.apply(vibe(KEYFRAME, 0, {"sensor": "booting"}), "10.0.0.2")
+    listener.apply(vibe(DELTA, 1, {"sensor": "operational"}), "10.0.0.2")
+    assert listener.get("pi")["health"] == {"sensor": "operational"}
+    assert events == [(JOINED, "pi"), (CHANGED, "pi")]
+
+    listener.apply(vibe(DELTA, 3, {"sensor": "error"}), "10.0.0.2")  # Sequence 2 was lost
+    assert listener.get("pi")["health"] == {"sensor": "operational"} and not listener.get("pi")["synced"]
+    listener.apply(vibe(KEYFRAME, 4, {"sensor": "error"}), "10.0.0.2")
+    assert listener.get("pi")["health"] == {"sensor": "error"} and listener.get("pi")["synced"]
+    assert listener.addresses == {"pi": "10.0.0.2"}
+
+    clock.now += 14
+    assert listener.expire() == []
+    clock.now += 2
+    assert listener.expire() == ["pi"]
+    assert events[-1] == (LEFT, "pi") and listener.snapshot() == {}
+
+
+@pytest.mark.asyncio
+async def test_wait_for_a_device_over_loopback():
+    listener = VibeListener(port=0)
+    listener_task = asyncio.create_task(listener.start())
+    while listener.transport is None:
+        await asyncio.sleep(0.01)
+    port = listener.transport.get_extra_info("sockname")[1]
+    sender = VibeSender("pc", lambda: {"sensor": "operational"}, port=port, interval=0.05, host="127.0.0.1")
+    sender_task = asyncio.create_task(sender.start())
+    try:
+        entry = await listener.wait_for("pc", lambda entry: entry["health"].get("sensor") == "operational", timeout=2)
+        assert entry["address"] == "127.0.0.1"
+        with pytest.raises(asyncio.TimeoutError):
+            await listener.wait_for("nobody", timeout=0.1)
+    finally:
+        sender_task.cancel()
+        listener_task.cancel()
+        await asyncio.gather(sender_task, listener_task, return_exceptions=True)
+
+
+def test_a_change_in_advertised_streams_is_sent_as_a_keyframe():
+    streams = {}
+    sender = VibeSender("pc", lambda: {"a": "operational"}, keyframe_every=6, get_streams_callback=lambda: streams)
+
+    assert decode_vibe(sender.next_vibe())["kind"] == KEYFRAME
+    assert decode_vibe(sender.next_vibe())["kind"] == DELTA
+    streams = {"ultrasonic": "ws://0.0.0.0:9100"}
+    keyframe = decode_vibe(sender.next_vibe())
+    assert keyframe["kind"] == KEYFRAME and keyframe["streams"] == streams
+    assert decode_vibe(sender.next_vibe())["kind"] == DELTA
+
+
+@pytest.mark.asyncio
+async def test_a_late_listener_asks_for_a_keyframe_instead_of_waiting_for_one():
+    listener = VibeListener(port=0, verbose=False)
+    sender = VibeSender("pc", lambda: {"sensor": "operational"}, interval=0.05, keyframe_every=1000,
+                        host="127.0.0.1", get_streams_callback=lambda: {"ultrasonic": "ws://0.0.0.0:9100"})
+    sender.next_vibe()  # The keyframe went out before the listener started
+    listener_task = asyncio.create_task(listener.start())
+    while listener.transport is None:
+        await asyncio.sleep(0.01)
+    sender.port = listener.transport.get_extra_info("sockname")[1]
+    sender_task = asyncio.create_task(sender.start())
+    try:
+        assert await listener.wait_for_stream("ultrasonic", timeout=1) == "ws://127.0.0.1:9100"
+        assert sender.sequence < 10  # Caught up from deltas plus one requested keyframe
+    finally:
+        sender_task.cancel()
+        listener_task.cancel()
+        await asyncio.gather(sender_task, listener_task, return_exceptions=True)
+
+
+def test_stream_cache_follows_endpoint_changes_and_expires_with_the_device():
+    clock = FakeClock()
+    listener = VibeListener(ttl=15, clock=clock, verbose=False)
+    vibe = lambda kind, sequence, streams: decode_vibe(encode_vibe(kind, 1, sequence, clock(), 5.0, "pi", {}, streams))
+
+    listener.apply(vibe(KEYFRAME, 0, {"ultrasonic": "ws://0.0.0.0:9100"}), "10.0.0.2")
+    assert listener.resolve("ultrasonic") == "ws://10.0.0.2:9100"
+    listener.apply(vibe(DELTA, 1, {"ultrasonic": "ws://0.0.0.0:41234"}), "10.0.0.2")
+    assert listener.resolve("ultrasonic") == "ws://10.0.0.2:41234"
+    listener.apply(vibe(DELTA, 2, {}), "10.0.0.7")  # Same device, new DHCP lease
+    assert listener.resolve("ultrasonic") == "ws://10.0.0.7:41234"
+
+    clock.now += 16
+    listener.expire()
+    assert listener.resolve("ultrasonic") is None
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import pytest
+import zygote
+from modules.module import Module
+
+pytestmark = pytest.mark.skipif(not zygote.SUPPORTED, reason="needs os.fork and Unix sockets")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC = os.path.join(ROOT, "src")
+ENV = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC, ROOT]))
+
+
+class Idle(Module):
+    async def start(self):
+        print("Idle ready", flush=True)
+
+
+@pytest.fixture(scope="module")
+def warm_zygote(tmp_path_factory):
+    socket_path = str(tmp_path_factory.mktemp("zygote") / "zygote.sock")
+    server = zygote.Zygote(path=socket_path, preload=["log", "launcher"], cwd=SRC, env=ENV).start()
+    yield server
+    server.stop()
+
+
+def spawn(server, module):
+    return server.spawn(["--module", module], cwd=SRC, env=ENV,
+                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def test_forked_module_runs_until_terminated(warm_zygote):
+    process = spawn(warm_zygote, f"{__name__}.Idle")
+
+    assert "Idle ready" in process.stdout.readline()
+    assert process.poll() is None
+    process.terminate()
+    assert process.wait(timeout=5) == -15
+
+
+def test_exit_status_of_a_crashing_module_is_reported(warm_zygote):
+    process = spawn(warm_zygote, "no.such.Module")
+
+    assert process.wait(timeout=5) == 1
+    assert "crashed" in process.stdout.read()
+
+
+def test_spawn_fails_cleanly_without_a_zygote(tmp_path):
+    with pytest.raises(zygote.ZygoteError):
+        zygote.Zygote(path=str(tmp_path / "missing.sock")).spawn(["--module", "x.Y"])